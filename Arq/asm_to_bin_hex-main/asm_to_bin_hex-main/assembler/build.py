@@ -0,0 +1,148 @@
+# ---------------------------
+# Batch mode: assemble many .asm files across a process pool
+# Each worker builds its lexer and parser once and reuses them for every
+# file it gets. A failing file is reported and the batch carries on; each
+# result carries the file's diagnostics report (for --error-report).
+# ---------------------------
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from assembler.cache import AsmCache, assemble_cached
+from assembler.diagnostics import Diagnostics
+from assembler.iohelpers import write_output
+from assembler.pipeline import make_front_end
+
+# output file extensions per --format
+OUTPUT_EXTS = {
+    'hexbin': ('.hex', '.bin'),
+    'raw': ('.img',),
+    'ihex': ('.ihex',),
+    'vmem': ('.vmem',),
+    'obj': ('.o',),
+}
+
+def expand_inputs(patterns):
+    # files, directories (every .asm below them) and glob patterns
+    files = []
+    for pat in patterns:
+        if os.path.isdir(pat):
+            files += sorted(glob.glob(os.path.join(pat, '**', '*.asm'), recursive=True))
+        elif os.path.exists(pat):
+            files.append(pat)
+        else:
+            matches = sorted(glob.glob(pat, recursive=True))
+            if not matches:
+                raise Exception(f"No input matches {pat}")
+            files += matches
+    # keep the first occurrence of each file
+    return list(dict.fromkeys(files))
+
+def output_paths(asmfile, fmt, outdir=None):
+    stem = os.path.splitext(asmfile)[0]
+    if outdir is not None:
+        stem = os.path.join(outdir, os.path.basename(stem))
+    return [stem + ext for ext in OUTPUT_EXTS[fmt]]
+
+# per-worker state, set up once by _init_worker
+_lexer = None
+_parser = None
+_cache = None
+_collect = False
+
+def _init_worker(cache_args=None, front_end='line', collect=False):
+    # cache_args: (directory, max_bytes), or None to run without the cache;
+    # collect: report every error of a file (--all-errors), not the first
+    global _lexer, _parser, _cache, _collect
+    _lexer, _parser = make_front_end(front_end)
+    _cache = AsmCache(*cache_args) if cache_args is not None else None
+    _collect = collect
+
+def assemble_file(asmfile, fmt, outputs, options=()):
+    # -> (asmfile, error or None, words, seconds, served from cache,
+    #     diagnostics report)
+    t0 = time.perf_counter()
+    diag = Diagnostics(asmfile, collect=_collect)
+    if fmt == 'obj':
+        return _object_file(asmfile, outputs[0], options, t0, diag)
+    hits = _cache.hits if _cache is not None else 0
+    try:
+        with open(asmfile, 'r') as f:
+            txt = f.read()
+        machine = assemble_cached(txt, _cache, _lexer, _parser, options, asmfile, diag)
+        write_output(machine, fmt, outputs)
+    except Exception as e:
+        return asmfile, str(e), 0, time.perf_counter() - t0, False, diag.report(e)
+    cached = _cache is not None and _cache.hits > hits
+    return asmfile, None, len(machine), time.perf_counter() - t0, cached, diag.report()
+
+def _object_file(asmfile, objfile, options, t0, diag):
+    # -f obj: an object newer than its source, built by this version with
+    # the same options, is kept as it is (reported as cached)
+    from assembler.objfile import assemble_object, current_header, write_object
+    try:
+        h = None
+        if os.path.exists(objfile) and os.path.getmtime(objfile) >= os.path.getmtime(asmfile):
+            h = current_header(objfile, options)
+        if h is not None:
+            return (asmfile, None, (h['text'] + h['data']) // 4, time.perf_counter() - t0, True,
+                    diag.report())
+        with open(asmfile, 'r') as f:
+            txt = f.read()
+        obj = assemble_object(txt, _lexer, _parser, dict(options).get('optimize', False),
+                              asmfile, diag)
+        write_object(obj, objfile)
+    except Exception as e:
+        return asmfile, str(e), 0, time.perf_counter() - t0, False, diag.report(e)
+    return (asmfile, None, (len(obj.text) + len(obj.data)) // 4, time.perf_counter() - t0, False,
+            diag.report())
+
+def assemble_many(files, fmt='hexbin', outdir=None, jobs=None, cache_args=None, report=print,
+                  front_end='line', options=(), collect=False):
+    # assemble every file, calling report() with one status line per file
+    # as results come in; returns the list of assemble_file results
+    jobs = jobs or os.cpu_count() or 1
+    tasks = [(f, fmt, output_paths(f, fmt, outdir), options) for f in files]
+    # with or without outdir, two inputs may share a stem (a.asm, a.s)
+    seen = {}
+    for f, _, outputs, _ in tasks:
+        key = os.path.abspath(outputs[0])
+        if key in seen:
+            raise Exception(f"{f} and {seen[key]} would both write {outputs[0]}")
+        seen[key] = f
+    if outdir is not None:
+        os.makedirs(outdir, exist_ok=True)
+    results = []
+    t0 = time.perf_counter()
+    if jobs == 1 or len(tasks) == 1:
+        _init_worker(cache_args, front_end, collect)
+        for task in tasks:
+            results.append(assemble_file(*task))
+            _report_file(results[-1], report)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(cache_args, front_end, collect)) as pool:
+            # chunk the task list so small files don't pay one IPC round trip each
+            chunksize = max(1, len(tasks) // (jobs * 8))
+            for result in pool.map(assemble_file, *zip(*tasks), chunksize=chunksize):
+                results.append(result)
+                _report_file(result, report)
+    elapsed = time.perf_counter() - t0
+    ok = [r for r in results if r[1] is None]
+    words = sum(r[2] for r in ok)
+    report(f"Assembled {len(ok)}/{len(results)} files, {words} words in {elapsed:.3f}s "
+           f"({len(results) / elapsed:.1f} files/s, {words / elapsed:,.0f} words/s, {jobs} jobs)")
+    if cache_args is not None:
+        hits = sum(1 for r in results if r[4])
+        report(f"Cache: {hits} hits, {len(results) - hits} misses")
+    return results
+
+def _report_file(result, report):
+    asmfile, error, words, seconds, cached, _ = result
+    if error is None:
+        note = ", cached" if cached else ""
+        report(f"ok    {asmfile}: {words} words ({seconds * 1000:.1f} ms{note})")
+    else:
+        report(f"FAIL  {asmfile}: {error}")
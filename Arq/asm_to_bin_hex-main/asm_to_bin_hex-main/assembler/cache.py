@@ -0,0 +1,145 @@
+# ---------------------------
+# Persistent assembly cache
+# Content-addressed: the key is a hash of the source text plus the
+# assembler version and any options that change the output words. Each
+# entry holds the (address, word) pairs as little-endian uint32 pairs.
+# The directory is kept under a size budget by evicting the least recently
+# used entries (a hit refreshes the entry's mtime).
+# ---------------------------
+
+import os
+import re
+import sys
+from array import array
+
+from assembler import __version__
+
+# bump when the entry layout changes
+CACHE_FORMAT = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'asm_to_bin_hex')
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024  # bytes
+
+# the key only covers the source text itself, so a source that .includes
+# other files is never served from (or stored in) the cache
+INCLUDE_LINE = re.compile(r'^[ \t]*(?:[A-Za-z_]\w*:[ \t]*)?\.include\b', re.MULTILINE | re.IGNORECASE)
+
+class AsmCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_SIZE):
+        self.directory = directory or os.environ.get('ASM_CACHE_DIR') or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total = None  # approximate bytes on disk, refreshed by evict()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, txt, options=()):
+        import hashlib  # deferred: --no-cache runs never need it
+        h = hashlib.sha256()
+        h.update(f"{__version__}\0{CACHE_FORMAT}\0{sorted(options)!r}\0".encode())
+        h.update(txt.encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.words')
+
+    def get(self, key):
+        # -> machine list of (address, word), or None on a miss
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # LRU: mark as recently used
+        except OSError:
+            self.misses += 1
+            return None
+        if len(data) % 8:
+            # truncated / foreign file: drop it
+            self._remove(path)
+            self.misses += 1
+            return None
+        pairs = array('I')
+        pairs.frombytes(data)
+        if sys.byteorder != 'little':
+            pairs.byteswap()
+        self.hits += 1
+        it = iter(pairs)
+        return list(zip(it, it))
+
+    def put(self, key, machine):
+        pairs = array('I')
+        for addr, word in machine:
+            pairs.append(addr)
+            pairs.append(word)
+        if sys.byteorder != 'little':
+            pairs.byteswap()
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(pairs.tobytes())
+        os.replace(tmp, path)  # atomic: readers never see half an entry
+        # only rescan the directory once the running total crosses the budget
+        if self._total is not None:
+            self._total += len(pairs) * 4
+        if self._total is None or self._total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # drop least recently used entries until the cache fits max_bytes
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if not e.name.endswith('.words'):
+                    continue
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+        if total > self.max_bytes:
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+        self._total = total
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # another process got there first
+
+def assemble_cached(txt, cache=None, lexer=None, parser=None, options=(), source=None, diag=None,
+                    jobs=None, profile=None):
+    # like pipeline.assemble, but served from the cache when possible; on a
+    # hit nothing is lexed, parsed or assembled (nor even imported).
+    # options: (name, value) pairs passed on to assemble(), e.g.
+    # (('optimize', True),); they are part of the cache key. source: the
+    # file txt was read from, for .include; diag: the Diagnostics for
+    # assemble() (not part of the key: only clean sources are cached);
+    # jobs: pass2 processes, for assemble() (the words don't depend on it);
+    # profile: an assembler.profiling.Profile, the lookup being its cache
+    # phase (count: words served from the cache)
+    if cache is not None and INCLUDE_LINE.search(txt):
+        cache = None
+    if cache is not None:
+        if profile is None:
+            key = cache.key(txt, options)
+            machine = cache.get(key)
+        else:
+            with profile.phase('cache') as ph:
+                key = cache.key(txt, options)
+                machine = cache.get(key)
+                ph.count += len(machine or ())
+        if machine is not None:
+            return machine
+    from assembler.pipeline import assemble
+    machine = assemble(txt, lexer, parser, source=source, diag=diag, jobs=jobs, profile=profile,
+                       **dict(options))
+    if cache is not None:
+        cache.put(key, machine)
+    return machine
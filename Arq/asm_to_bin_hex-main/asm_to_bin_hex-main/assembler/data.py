@@ -0,0 +1,131 @@
+# ---------------------------
+# Data section: .data directives -> one little-endian byte image
+#   .word/.half/.byte v, ...   numbers, or labels (their absolute address)
+#   .space n                   n zero bytes
+#   .align n                   pad to a multiple of 2**n bytes
+#   .asciz "s" (.string)       UTF-8 bytes and a terminating NUL
+#   .ascii "s"                 the bytes only
+# Each directive is packed with one array() conversion, so large tables
+# cost little beyond parsing them. pass1 places the image after the text;
+# its labels then get absolute addresses and pass2 emits it as words.
+# ---------------------------
+
+import sys
+from array import array
+from operator import itemgetter
+
+# directive -> (bytes per value, array typecode)
+VALUE_SIZES = {
+    '.word': (4, 'I'),
+    '.half': (2, 'H'),
+    '.byte': (1, 'B'),
+}
+STRING_DIRECTIVES = {'.asciz': b'\0', '.string': b'\0', '.ascii': b''}
+DATA_DIRECTIVES = set(VALUE_SIZES) | set(STRING_DIRECTIVES) | {'.space', '.align'}
+
+_kind = itemgetter(0)
+_val = itemgetter(1)
+
+def _pack(values, size, code, name):
+    try:
+        packed = array(code, values)  # all in 0..2**bits-1 (the usual case)
+    except OverflowError:
+        lo, hi = -(1 << (8 * size - 1)), (1 << (8 * size)) - 1
+        for v in values:
+            if not lo <= v <= hi:
+                raise Exception(f"Value out of range for {name}: {v}")
+        packed = array(code, [v & hi for v in values])
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+class DataImage:
+    def __init__(self):
+        self.image = bytearray()
+        self.labels = {}  # name -> offset in the image
+        self.fixups = []  # (offset, size, label): label addresses to fill in
+        self.align = 4    # the image base is aligned at least this much
+        self.base = None  # set by place()
+        self.pad = 0      # zero bytes between the text and base
+
+    def __bool__(self):
+        return bool(self.image) or bool(self.labels)
+
+    def label(self, name):
+        self.labels[name] = len(self.image)
+
+    def directive(self, name, args):
+        if name in VALUE_SIZES:
+            self._values(name, args)
+        elif name in STRING_DIRECTIVES:
+            if not args or set(map(_kind, args)) != {'str'}:
+                raise Exception(f"Expected strings for {name} but got {args}")
+            for op in args:
+                self.image += op[1].encode('utf-8') + STRING_DIRECTIVES[name]
+        elif name == '.space':
+            n = self._count(name, args)
+            self.image += bytes(n)
+        elif name == '.align':
+            n = self._count(name, args)
+            if n > 12:
+                raise Exception(f"Alignment too large: .align {n}")
+            self.pad_to(1 << n)
+
+    def pad_to(self, alignment):
+        self.align = max(self.align, alignment)
+        self.image += bytes(-len(self.image) % alignment)
+
+    def _count(self, name, args):
+        if len(args) != 1 or args[0][0] != 'imm' or args[0][1] < 0:
+            raise Exception(f"Expected a non-negative number for {name} but got {args}")
+        return args[0][1]
+
+    def _values(self, name, args):
+        size, code = VALUE_SIZES[name]
+        kinds = set(map(_kind, args))
+        if kinds == {'imm'}:
+            values = list(map(_val, args))
+        elif args and kinds <= {'imm', 'sym'}:
+            values = []
+            for op in args:
+                if op[0] == 'sym':
+                    self.fixups.append((len(self.image) + size * len(values), size, op[1]))
+                    values.append(0)
+                else:
+                    values.append(op[1])
+        else:
+            raise Exception(f"Expected numbers or labels for {name} but got {args}")
+        self.image += _pack(values, size, code, name)
+
+    def place(self, text_end, symtab):
+        # put the image after the text (text_end: first free byte) and add
+        # its labels to symtab
+        self.base = (text_end + self.align - 1) & -self.align
+        self.pad = self.base - text_end
+        for name, off in self.labels.items():
+            symtab[name] = self.base + off
+        return self.base
+
+    def words(self, symtab):
+        # -> array('I') of the image, label values filled in
+        for off, size, name in self.fixups:
+            if name not in symtab:
+                raise Exception(f"Undefined label in .data: {name}")
+            value = symtab[name]
+            if value >> (8 * size):
+                raise Exception(f"Address of {name} does not fit in {8 * size} bits")
+            self.image[off:off + size] = value.to_bytes(size, 'little')
+        self.image += bytes(-len(self.image) % 4)
+        words = array('I')
+        words.frombytes(self.image)
+        if sys.byteorder != 'little':
+            words.byteswap()
+        return words
+
+    def machine(self, symtab):
+        # -> (address, word) records from the end of the text on: zero words
+        # for the alignment gap, then the image
+        words = self.words(symtab)
+        start = self.base - self.pad
+        return list(zip(range(start, self.base + 4 * len(words), 4),
+                        array('I', bytes(self.pad)) + words))
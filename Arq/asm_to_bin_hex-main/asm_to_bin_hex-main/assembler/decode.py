@@ -0,0 +1,95 @@
+# ---------------------------
+# Instruction decoder: 32-bit word -> (spec, rd, rs1, rs2, imm)
+# The inverse of INSTR_TABLE. Every word is looked up by its opcode, funct3
+# and funct7 bits in one precomputed table; the operand layout of the spec
+# says which fields mean something and how the immediate is scattered.
+# ---------------------------
+
+from assembler.encode import sign_extend
+from assembler.instructions import INSTR_TABLE
+
+# opcode | funct3 | funct7
+KEY_MASK = 0xFE00707F
+
+# bits that identify an instruction, per operand layout
+LAYOUT_MASKS = {
+    'rrr': 0xFE00707F,
+    'shift': 0xFE00707F,
+    'rri': 0x0000707F,
+    'load': 0x0000707F,
+    'store': 0x0000707F,
+    'branch': 0x0000707F,
+    'upper': 0x0000007F,
+    'jump': 0x0000007F,
+}
+
+def _build_table():
+    # (word & KEY_MASK) -> spec, with every funct bit an instruction ignores
+    # filled in. Layout 'none' (fence, ecall, ebreak) is matched on the whole
+    # word, since ecall and ebreak only differ outside KEY_MASK.
+    keyed = {}
+    exact = {}
+    for spec in INSTR_TABLE.values():
+        if spec.layout == 'none':
+            exact[spec.base] = spec
+            continue
+        free = KEY_MASK & ~LAYOUT_MASKS[spec.layout]
+        # enumerate every value of the free bits (subsets of the mask)
+        sub = free
+        while True:
+            keyed[(spec.base & KEY_MASK) | sub] = spec
+            if sub == 0:
+                break
+            sub = (sub - 1) & free
+    return keyed, exact
+
+DECODE_TABLE, EXACT_TABLE = _build_table()
+
+# ---------------------------
+# Immediate extraction per layout (the inverse of encode.place_*)
+# ---------------------------
+
+def imm_i(w):
+    return sign_extend(w >> 20, 12)
+
+def imm_shamt(w):
+    return (w >> 20) & 0x1F
+
+def imm_s(w):
+    return sign_extend(((w >> 20) & 0xFE0) | ((w >> 7) & 0x1F), 12)
+
+def imm_b(w):
+    return sign_extend(((w >> 19) & 0x1000) | ((w << 4) & 0x800)
+                       | ((w >> 20) & 0x7E0) | ((w >> 7) & 0x1E), 13)
+
+def imm_u(w):
+    return w & 0xFFFFF000
+
+def imm_j(w):
+    return sign_extend(((w >> 11) & 0x100000) | (w & 0xFF000)
+                       | ((w >> 9) & 0x800) | ((w >> 20) & 0x7FE), 21)
+
+IMMEDIATES = {
+    'rri': imm_i,
+    'load': imm_i,
+    'shift': imm_shamt,
+    'store': imm_s,
+    'branch': imm_b,
+    'upper': imm_u,
+    'jump': imm_j,
+}
+
+def decode(word):
+    # -> (spec, rd, rs1, rs2, imm); fields a layout doesn't use are 0
+    spec = DECODE_TABLE.get(word & KEY_MASK)
+    if spec is None:
+        spec = EXACT_TABLE.get(word)
+        if spec is None:
+            raise Exception(f"Illegal instruction: 0x{word:08x}")
+        return spec, 0, 0, 0, 0
+    layout = spec.layout
+    imm = IMMEDIATES[layout](word) if layout != 'rrr' else 0
+    rd = (word >> 7) & 0x1F if layout not in ('store', 'branch') else 0
+    rs1 = (word >> 15) & 0x1F if layout not in ('upper', 'jump') else 0
+    rs2 = (word >> 20) & 0x1F if layout in ('rrr', 'store', 'branch') else 0
+    return spec, rd, rs1, rs2, imm
@@ -0,0 +1,143 @@
+# ---------------------------
+# Diagnostics: errors with their file, line and column
+# Statements keep the loc (line and index, packed as in assembler.nodes) of
+# their first token; expanded and relaxed instructions inherit it. Lines
+# that come from an included file or a macro expansion carry a virtual line
+# number (>= VIRTUAL_LINE) that indexes the preprocessor's line table:
+# (file, line, "in macro..." chain).
+#
+# Fail-fast (the default): the first error is raised, as an AssemblyError.
+# Collect-all (collect=True): every phase carries on past a bad line -- the
+# lexer skips the character, the parser the rest of the line, pass1 the
+# statement, pass2 encodes the instruction as 0 -- and check() raises one
+# AssemblyError with all of them. report() gives the JSON form for CI.
+# ---------------------------
+
+from assembler.nodes import LOC_SHIFT
+
+VIRTUAL_LINE = 1 << 30
+MAX_ERRORS = 1000  # collect-all stops here
+CHAIN_LINES = 8    # include/expansion lines shown in an error
+
+# phase -> how it is named in messages
+PHASES = {
+    'lex': 'Lex error',
+    'preprocess': 'Preprocess error',
+    'parse': 'Parse failed',
+    'pass1': 'Pass1 error',
+    'pass2': 'Pass2 error',
+}
+
+def short_chain(chain):
+    # an include/expansion chain cut to CHAIN_LINES lines
+    lines = chain.split('\n')[1:]
+    if len(lines) > CHAIN_LINES:
+        lines[CHAIN_LINES - 1:-1] = [f"  ... {len(lines) - CHAIN_LINES + 1} more"]
+    return ''.join('\n' + line for line in lines)
+
+class Diagnostic:
+    __slots__ = ('phase', 'message', 'file', 'line', 'column', 'context')
+
+    def __init__(self, phase, message, file, line=None, column=None, context=''):
+        self.phase = phase
+        self.message = message
+        self.file = file
+        self.line = line
+        self.column = column
+        self.context = context  # "\n  in macro m expanded at f:n" lines
+
+    def where(self):
+        parts = [self.file]
+        if self.line is not None:
+            parts.append(str(self.line))
+            if self.column is not None:
+                parts.append(str(self.column))
+        return ':'.join(parts)
+
+    def __str__(self):
+        return f"{self.where()}: {self.message}{self.context}"
+
+    def as_dict(self):
+        return {'file': self.file, 'line': self.line, 'column': self.column,
+                'phase': self.phase, 'message': self.message,
+                'context': [c.strip() for c in self.context.split('\n') if c.strip()]}
+
+class AssemblyError(Exception):
+    # .diagnostics: every error found (one in fail-fast mode)
+    def __init__(self, diagnostics):
+        self.diagnostics = diagnostics
+        if len(diagnostics) == 1:
+            d = diagnostics[0]
+            text = f"{PHASES[d.phase]}: {d}"
+        else:
+            text = f"{len(diagnostics)} errors:\n" + \
+                "\n".join(f"{d.where()}: {PHASES[d.phase]}: {d.message}{d.context}"
+                          for d in diagnostics)
+        super().__init__(text)
+
+class Diagnostics:
+    def __init__(self, source=None, text=None, collect=False, columns=True):
+        self.source = source or '<input>'
+        self.collect = collect
+        self.columns = columns   # False when token indexes aren't file offsets (--stream)
+        self.items = []
+        self.file = self.source  # the file plain line numbers refer to
+        self.lines = []          # the preprocessor's virtual line table
+        self._texts = {self.source: text} if text is not None else {}
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def error(self, phase, message, loc=None, within=None):
+        # loc: of the offending token or statement; within: that of the
+        # start of its statement, used when loc is a plain line of a
+        # statement that came from an include or macro
+        if loc is None:
+            self.add(Diagnostic(phase, message, self.source))
+            return
+        line, index = loc >> LOC_SHIFT, loc & ((1 << LOC_SHIFT) - 1)
+        if within is not None and line < VIRTUAL_LINE <= within >> LOC_SHIFT:
+            line, index = within >> LOC_SHIFT, within & ((1 << LOC_SHIFT) - 1)
+        if line >= VIRTUAL_LINE:
+            file, line, context = self.lines[line - VIRTUAL_LINE]
+            context = short_chain(context)
+        else:
+            file, context = self.file, ''
+        self.add(Diagnostic(phase, message, file, line, self._column(file, index), context))
+
+    def error_at(self, phase, message, file, line, index=None, context=''):
+        self.add(Diagnostic(phase, message, file, line, self._column(file, index), context))
+
+    def add(self, diagnostic):
+        self.items.append(diagnostic)
+        if not self.collect or len(self.items) >= MAX_ERRORS:
+            raise AssemblyError(self.items)
+
+    def check(self):
+        # collect-all: raise what was collected
+        if self.items:
+            raise AssemblyError(self.items)
+
+    def _column(self, file, index):
+        if index is None or not self.columns:
+            return None
+        text = self._texts.get(file)
+        if text is None:
+            try:
+                with open(file, 'r') as f:
+                    text = f.read()
+            except OSError:
+                text = ''
+            self._texts[file] = text
+        if index > len(text):
+            return None
+        return index - text.rfind('\n', 0, index)
+
+    def report(self, error=None):
+        # -> JSON-ready dict; error: the exception the run ended with, if it
+        # isn't an AssemblyError (the file can't be read, an output written)
+        errors = [d.as_dict() for d in self.items]
+        if error is not None and not isinstance(error, AssemblyError):
+            errors.append(Diagnostic(None, str(error), self.source).as_dict())
+        return {'source': self.source, 'ok': not errors, 'error_count': len(errors),
+                'errors': errors}
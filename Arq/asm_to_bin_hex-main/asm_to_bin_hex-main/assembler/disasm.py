@@ -0,0 +1,145 @@
+# ---------------------------
+# Disassembler: machine words -> assembly text the assembler accepts again
+# Words are decoded through decode.DECODE_TABLE (opcode/funct3/funct7
+# lookup). Large images are decoded in bulk: each distinct word is decoded
+# and formatted once, and with NumPy the branch/jump targets of the whole
+# image are computed in one vectorized pass so labels can be put back.
+#
+# Usage: python -m assembler.disasm program.{hex,img} [--symbols program.asm] [--asm]
+# ---------------------------
+
+import sys
+from array import array
+
+from assembler.decode import decode
+
+def format_parts(word):
+    # -> (head, tail, pc-relative offset or None); text = head + tail.
+    # For branches and jal the tail is the offset and may be swapped for a
+    # label name.
+    try:
+        spec, rd, rs1, rs2, imm = decode(word)
+    except Exception:
+        return '.word ', f"0x{word:08x}", None
+    m = spec.mnemonic
+    layout = spec.layout
+    if layout == 'rrr':
+        return f"{m} x{rd}, x{rs1}, ", f"x{rs2}", None
+    if layout in ('rri', 'shift'):
+        return f"{m} x{rd}, x{rs1}, ", str(imm), None
+    if layout == 'load':
+        return f"{m} x{rd}, ", f"{imm}(x{rs1})", None
+    if layout == 'store':
+        return f"{m} x{rs2}, ", f"{imm}(x{rs1})", None
+    if layout == 'branch':
+        return f"{m} x{rs1}, x{rs2}, ", str(imm), imm
+    if layout == 'upper':
+        return f"{m} x{rd}, ", f"0x{imm:08x}", None
+    if layout == 'jump':
+        return f"{m} x{rd}, ", str(imm), imm
+    return m, '', None
+
+def disassemble_word(word, pc=0, names=None):
+    head, tail, offset = format_parts(word)
+    if offset is not None and names:
+        tail = names.get((pc + offset) & 0xFFFFFFFF, tail)
+    return head + tail
+
+def disassemble_words(words, base=0, symtab=None):
+    # -> one instruction text per word; words is any sequence of uint32
+    # (list, array('I'), NumPy array). symtab (name -> address) turns
+    # branch/jump offsets back into label names.
+    names = {addr: name for name, addr in (symtab or {}).items()}
+    try:
+        import numpy as np
+    except ImportError:
+        return _disassemble_py(words, base, names)
+    w = np.asarray(words, dtype=np.uint32)
+    uniq, inverse = np.unique(w, return_inverse=True)
+    parts = [format_parts(int(x)) for x in uniq.tolist()]
+    texts = np.array([head + tail for head, tail, _ in parts], dtype=object)[inverse]
+    if names:
+        # vectorized: pc-relative targets of every branch and jal in the image
+        pcrel = np.array([off is not None for _, _, off in parts], dtype=bool)
+        offsets = np.array([off or 0 for _, _, off in parts], dtype=np.int64)
+        idx = np.flatnonzero(pcrel[inverse])
+        targets = (base + 4 * idx + offsets[inverse[idx]]) & 0xFFFFFFFF
+        for i, u, t in zip(idx.tolist(), inverse[idx].tolist(), targets.tolist()):
+            name = names.get(t)
+            if name is not None:
+                texts[i] = parts[u][0] + name
+    return texts.tolist()
+
+def _disassemble_py(words, base, names):
+    # no NumPy: same result, memoized per distinct word
+    memo = {}
+    texts = []
+    pc = base
+    for word in words:
+        parts = memo.get(word)
+        if parts is None:
+            parts = memo[word] = format_parts(word)
+        head, tail, offset = parts
+        if offset is not None and names:
+            tail = names.get((pc + offset) & 0xFFFFFFFF, tail)
+        texts.append(head + tail)
+        pc += 4
+    return texts
+
+def words_from_bytes(data):
+    # raw little-endian image -> array('I')
+    words = array('I')
+    words.frombytes(data[:len(data) - len(data) % 4])
+    if sys.byteorder != 'little':
+        words.byteswap()
+    return words
+
+def listing(words, base=0, symtab=None, source=False):
+    # -> text. source=True gives re-assemblable source (labels +
+    # instructions); otherwise address, word and instruction per line.
+    texts = disassemble_words(words, base, symtab)
+    labels = {}
+    for name, addr in (symtab or {}).items():
+        labels.setdefault(addr, []).append(name)
+    lines = []
+    for i, (word, text) in enumerate(zip(words, texts)):
+        addr = base + 4 * i
+        for name in labels.get(addr, ()):
+            lines.append(f"{name}:")
+        if source:
+            lines.append(f" {text}")
+        else:
+            lines.append(f"{addr:08x}:  {word:08x}  {text}")
+    return '\n'.join(lines) + '\n' if lines else ''
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog='assembler.disasm',
+                                 description="Disassemble a .hex (one word per line) or raw image")
+    ap.add_argument('image')
+    ap.add_argument('--symbols', default=None, metavar='ASM',
+                    help="recover label names from the source this image was assembled from")
+    ap.add_argument('--asm', action='store_true',
+                    help="print re-assemblable source instead of an address listing")
+    args = ap.parse_args(argv)
+    try:
+        if args.image.endswith('.hex'):
+            with open(args.image, 'r') as f:
+                words = array('I', (int(line, 16) for line in f if line.strip()))
+        else:
+            with open(args.image, 'rb') as f:
+                words = words_from_bytes(f.read())
+        symtab = None
+        if args.symbols:
+            from assembler.pipeline import parse_source
+            from assembler.passes import pass1
+            with open(args.symbols, 'r') as f:
+                symtab, _, _ = pass1(parse_source(f.read(), source=args.symbols))
+    except Exception as e:
+        print(e)
+        return 1
+    sys.stdout.write(listing(words, 0, symtab, args.asm))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -50,3 +50,20 @@ def encode_j(imm, rd, opcode):
     bits19_12 = (imm20 >> 12) & 0xFF
     instr = (bit20 << 31) | (bits19_12 << 12) | (bit11 << 20) | (bits10_1 << 21) | (rd << 7) | opcode
     return u32(instr)
+
+
+# ---------------------------
+# Immediate placement helpers: scatter an already-resolved immediate into
+# its bit positions, ready to be ORed with an instruction's base word
+# ---------------------------
+
+def place_s(imm):
+    return (((imm >> 5) & 0x7F) << 25) | ((imm & 0x1F) << 7)
+
+def place_b(imm):
+    # imm[12] | imm[10:5] | ... | imm[4:1] | imm[11]
+    return (((imm >> 12) & 0x1) << 31) | (((imm >> 5) & 0x3F) << 25) | (((imm >> 1) & 0xF) << 8) | (((imm >> 11) & 0x1) << 7)
+
+def place_j(imm):
+    # imm[20] | imm[10:1] | imm[11] | imm[19:12]
+    return (((imm >> 20) & 0x1) << 31) | (((imm >> 1) & 0x3FF) << 21) | (((imm >> 11) & 0x1) << 20) | (((imm >> 12) & 0xFF) << 12)
@@ -0,0 +1,215 @@
+# ---------------------------
+# Vectorized batch encoding (needs NumPy)
+# encode_batch turns column arrays of formats, base words, registers and
+# immediates into machine words with array bit operations. encode_program
+# feeds it from a pass1 program: instructions are grouped by mnemonic and
+# their operand columns are pulled out with C-level map/itemgetter, so there
+# is no per-instruction Python call on the way. Words are bit-identical to
+# the scalar path.
+# ---------------------------
+
+import time
+from operator import attrgetter, itemgetter
+
+import numpy as np
+
+from assembler.instructions import (INSTR_TABLE, FMT_I, FMT_S, FMT_B, FMT_U, FMT_J,
+                                    AsmContext, resolve_imm_or_sym)
+
+def encode_batch(fmt, base, rd, rs1, rs2, imm):
+    # fmt: format IDs (FMT_* from assembler.instructions)
+    # base: opcode/funct3/funct7 bits already in place (InstrSpec.base)
+    # rd, rs1, rs2: register numbers (0 where the format has no such field)
+    # imm: resolved immediates / byte offsets, signed
+    # returns a uint32 array of machine words
+    # any argument may also be a scalar shared by every instruction
+    fmt = np.asarray(fmt, dtype=np.int8)
+    imm = np.broadcast_to(np.asarray(imm, dtype=np.int64), fmt.shape) & 0xFFFFFFFF
+    word = (np.asarray(base, dtype=np.int64)
+            | (np.asarray(rd, dtype=np.int64) << 7)
+            | (np.asarray(rs1, dtype=np.int64) << 15)
+            | (np.asarray(rs2, dtype=np.int64) << 20))
+    placed = np.zeros_like(imm)
+
+    sel = fmt == FMT_I
+    i = imm[sel]
+    placed[sel] = (i & 0xFFF) << 20
+
+    sel = fmt == FMT_S
+    i = imm[sel]
+    placed[sel] = (((i >> 5) & 0x7F) << 25) | ((i & 0x1F) << 7)
+
+    sel = fmt == FMT_B
+    i = imm[sel]
+    placed[sel] = ((((i >> 12) & 0x1) << 31) | (((i >> 5) & 0x3F) << 25)
+                   | (((i >> 1) & 0xF) << 8) | (((i >> 11) & 0x1) << 7))
+
+    sel = fmt == FMT_U
+    placed[sel] = imm[sel] & 0xFFFFF000
+
+    sel = fmt == FMT_J
+    i = imm[sel]
+    placed[sel] = ((((i >> 20) & 0x1) << 31) | (((i >> 1) & 0x3FF) << 21)
+                   | (((i >> 11) & 0x1) << 20) | (((i >> 12) & 0xFF) << 12))
+
+    return ((word | placed) & 0xFFFFFFFF).astype(np.uint32)
+
+# ---------------------------
+# Operand columns
+# Any operand the scalar encoder would reject raises Unbatchable; the caller
+# then re-runs the scalar path, which reports the exact error.
+# ---------------------------
+
+class Unbatchable(Exception):
+    pass
+
+_kind = itemgetter(0)
+_val = itemgetter(1)
+_reg_of_mem = itemgetter(2)
+_OPERAND = [itemgetter(k) for k in range(3)]
+
+def _ints(values, n):
+    return np.fromiter(values, dtype=np.int64, count=n)
+
+def _regs(col):
+    if set(map(_kind, col)) != {'reg'}:
+        raise Unbatchable()
+    return _ints(map(_val, col), len(col))
+
+def _imms(col):
+    if set(map(_kind, col)) != {'imm'}:
+        raise Unbatchable()
+    return _ints(map(_val, col), len(col))
+
+def _targets(col, pcs, symtab):
+    # labels or immediates -> pc-relative offsets, like resolve_imm_or_sym
+    kinds = set(map(_kind, col))
+    if kinds == {'imm'}:
+        return _ints(map(_val, col), len(col))
+    if not kinds <= {'imm', 'sym', 'pcrel_hi', 'pcrel_lo'}:
+        raise Unbatchable()
+    try:
+        if kinds == {'sym'}:
+            return _ints(map(symtab.__getitem__, map(_val, col)), len(col)) - pcs
+        if kinds <= {'imm', 'sym'}:
+            return _ints((symtab[op[1]] - pc if op[0] == 'sym' else op[1]
+                          for op, pc in zip(col, pcs.tolist())), len(col))
+        ctx = AsmContext(symtab, 0)
+        return _ints((_resolve_at(op, pc, ctx) for op, pc in zip(col, pcs.tolist())), len(col))
+    except KeyError:
+        raise Unbatchable()
+
+def _resolve_at(op, pc, ctx):
+    ctx.pc = pc
+    try:
+        return resolve_imm_or_sym(op, ctx)
+    except Exception:
+        raise KeyError(op)  # undefined label
+
+def _mem(col, pcs, symtab):
+    # offset(rs1) or %pcrel_lo(label)(rs1) -> (offsets, rs1)
+    kinds = set(map(_kind, col))
+    if kinds == {'memoff'}:
+        return _ints(map(_val, col), len(col)), _ints(map(_reg_of_mem, col), len(col))
+    if not kinds <= {'memoff', 'pcrel_lo'} or not all(len(op) == 3 for op in col):
+        raise Unbatchable()
+    rs1 = _ints(map(_reg_of_mem, col), len(col))
+    ctx = AsmContext(symtab, 0)
+    try:
+        return _ints((op[1] if op[0] == 'memoff' else _resolve_at(op, pc, ctx)
+                      for op, pc in zip(col, pcs.tolist())), len(col)), rs1
+    except KeyError:
+        raise Unbatchable()
+
+def _in_range(values, lo, hi):
+    if len(values) and (values.min() < lo or values.max() > hi):
+        raise Unbatchable()
+    return values
+
+def _even(values):
+    if len(values) and (values & 1).any():
+        raise Unbatchable()
+    return values
+
+# layout -> columns(operand columns, pcs, symtab) -> (rd, rs1, rs2, imm)
+def _cols_rrr(c, pcs, symtab):
+    return _regs(c[0]), _regs(c[1]), _regs(c[2]), 0
+
+def _cols_rri(c, pcs, symtab):
+    return _regs(c[0]), _regs(c[1]), 0, _in_range(_targets(c[2], pcs, symtab), -2048, 2047)
+
+def _cols_shift(c, pcs, symtab):
+    return _regs(c[0]), _regs(c[1]), 0, _in_range(_imms(c[2]), 0, 31)
+
+def _cols_load(c, pcs, symtab):
+    imm, rs1 = _mem(c[1], pcs, symtab)
+    return _regs(c[0]), rs1, 0, _in_range(imm, -2048, 2047)
+
+def _cols_store(c, pcs, symtab):
+    imm, rs1 = _mem(c[1], pcs, symtab)
+    return 0, rs1, _regs(c[0]), _in_range(imm, -2048, 2047)
+
+def _cols_branch(c, pcs, symtab):
+    return 0, _regs(c[0]), _regs(c[1]), _even(_in_range(_targets(c[2], pcs, symtab), -4096, 4094))
+
+def _cols_upper(c, pcs, symtab):
+    kinds = set(map(_kind, c[1]))
+    if kinds == {'imm'}:
+        return _regs(c[0]), 0, 0, _imms(c[1])
+    if not kinds <= {'imm', 'pcrel_hi'}:
+        raise Unbatchable()
+    return _regs(c[0]), 0, 0, _targets(c[1], pcs, symtab)
+
+def _cols_jump(c, pcs, symtab):
+    return _regs(c[0]), 0, 0, _even(_in_range(_targets(c[1], pcs, symtab), -(1 << 20), (1 << 20) - 2))
+
+def _cols_none(c, pcs, symtab):
+    return 0, 0, 0, 0
+
+COLUMNS = {
+    'rrr': _cols_rrr,
+    'rri': _cols_rri,
+    'shift': _cols_shift,
+    'load': _cols_load,
+    'store': _cols_store,
+    'branch': _cols_branch,
+    'upper': _cols_upper,
+    'jump': _cols_jump,
+    'none': _cols_none,
+}
+
+_MNEMONICS = list(INSTR_TABLE)
+_MNEMONIC_ID = {m: i for i, m in enumerate(_MNEMONICS)}
+
+def encode_program(program, symtab, profile=None):
+    # program: pass1 records (address, Instr); returns a uint32 word array.
+    # profile (assembler.profiling.Profile) gets the time per mnemonic group
+    n = len(program)
+    pcs = _ints(map(itemgetter(0), program), n)
+    instrs = list(map(itemgetter(1), program))
+    try:
+        ids = _ints(map(_MNEMONIC_ID.__getitem__, map(attrgetter('mnemonic'), instrs)), n)
+    except KeyError:
+        raise Unbatchable()
+    operands = list(map(attrgetter('operands'), instrs))
+
+    words = np.zeros(n, dtype=np.uint32)
+    order = np.argsort(ids, kind='stable')
+    bounds = np.flatnonzero(np.diff(ids[order])) + 1
+    for idx in np.split(order, bounds):
+        if not len(idx):
+            continue
+        mnemonic = _MNEMONICS[ids[idx[0]]]
+        if profile is not None:
+            t0 = time.perf_counter()
+        spec = INSTR_TABLE[mnemonic]
+        ops = list(map(operands.__getitem__, idx.tolist()))
+        nslots = len(spec.slots)
+        if set(map(len, ops)) != {nslots}:
+            raise Unbatchable()
+        cols = [list(map(_OPERAND[k], ops)) for k in range(nslots)]
+        rd, rs1, rs2, imm = COLUMNS[spec.layout](cols, pcs[idx], symtab)
+        words[idx] = encode_batch(np.full(len(idx), spec.fmt), spec.base, rd, rs1, rs2, imm)
+        if profile is not None:
+            profile.add_mnemonic(mnemonic, len(idx), time.perf_counter() - t0)
+    return words
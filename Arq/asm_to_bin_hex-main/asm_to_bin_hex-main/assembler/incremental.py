@@ -0,0 +1,126 @@
+# ---------------------------
+# Incremental re-assembly
+# The source is split into chunks at label and directive lines. Each chunk
+# is lexed, parsed and laid out (pass1) on its own, relative to its start,
+# and cached by its text. The encoded words of a chunk depend only on its
+# text and on how far each symbol it references lies from the chunk start,
+# so those are the key of the word cache. An edit re-parses just the chunks
+# whose text changed and re-encodes those plus any chunk whose branch/jump
+# targets moved relative to it. Branch relaxation only sees the labels of
+# a chunk itself, so when a chunk fails to encode (a branch or jump to
+# another chunk out of reach, or any other error) the source is assembled
+# whole, which relaxes it (or reports the error) exactly as a cold build
+# does. Sources with a .data section are assembled whole
+# (chunks can't tell which section they are in), and so are sources that
+# need the preprocessor (a chunk may use a macro defined in another).
+# ---------------------------
+
+import re
+
+from assembler.instructions import SYMBOL_KINDS
+from assembler.nodes import Directive
+from assembler.passes import pass1, pass2
+from assembler.pipeline import assemble, make_front_end
+from assembler.preprocess import needs_preprocessing
+
+# a new chunk starts at every line that begins with a label or directive
+CHUNK_START = re.compile(r'\s*(?:[A-Za-z_]\w*:|\.[A-Za-z]+)')
+DATA_SECTION = re.compile(r'^\s*\.data\b', re.MULTILINE | re.IGNORECASE)
+
+def split_chunks(txt):
+    chunks = []
+    current = []
+    for line in txt.splitlines(keepends=True):
+        if current and CHUNK_START.match(line):
+            chunks.append(''.join(current))
+            current = []
+        current.append(line)
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+class Chunk:
+    # one parsed and locally laid out piece of source
+    def __init__(self, statements):
+        # a chunk that opens with .text restarts the address counter
+        self.resets_pc = bool(statements) and isinstance(statements[0], Directive) \
+            and statements[0].name == '.text'
+        self.labels, self.program, _ = pass1(statements)  # offsets from chunk start
+        self.size = 4 * len(self.program)
+        self.refs = sorted({op[1] for _, ins in self.program for op in ins.operands
+                            if op[0] in SYMBOL_KINDS})
+
+class IncrementalAssembler:
+    def __init__(self, lexer=None, parser=None):
+        if lexer is None or parser is None:
+            lexer, parser = make_front_end()
+        self.lexer = lexer
+        self.parser = parser
+        self._chunks = {}  # chunk text -> Chunk
+        self._words = {}   # (chunk text, symbol displacements) -> [word, ...]
+        # what the last assemble() call had to redo
+        self.stats = {'chunks': 0, 'parsed': 0, 'encoded': 0}
+
+    def _chunk(self, text):
+        chunk = self._chunks.get(text)
+        if chunk is None:
+            try:
+                statements = self.parser.parse(iter(list(self.lexer.tokenize(text))))
+            except Exception as e:
+                raise Exception(f"Parse failed: {e}")
+            statements = [s for s in statements or [] if s is not None]
+            try:
+                chunk = Chunk(statements)
+            except Exception as e:
+                raise Exception(f"Pass1 error: {e}")
+            self.stats['parsed'] += 1
+        return chunk
+
+    def assemble(self, txt, source=None):
+        # -> machine list of (address, word), same as pipeline.assemble;
+        # source is the file txt came from (for .include)
+        self.stats = {'chunks': 0, 'parsed': 0, 'encoded': 0}
+        if DATA_SECTION.search(txt) or needs_preprocessing(txt):
+            self._chunks = {}
+            self._words = {}
+            self.stats.update(chunks=1, parsed=1, encoded=1)
+            return assemble(txt, self.lexer, self.parser, source=source)
+        chunks = {}
+        layout = []  # (text, chunk, base address)
+        symtab = {}
+        pc = 0
+        for text in split_chunks(txt):
+            chunk = chunks[text] = self._chunk(text)
+            if chunk.resets_pc:
+                pc = 0
+            for name, off in chunk.labels.items():
+                if name in symtab:
+                    raise Exception(f"Pass1 error: Label redefined: {name}")
+                symtab[name] = pc + off
+            layout.append((text, chunk, pc))
+            pc += chunk.size
+        self.stats['chunks'] = len(layout)
+
+        words = {}
+        machine = []
+        for text, chunk, base in layout:
+            # undefined symbols key as None; pass2 reports them
+            key = (text, tuple(symtab[s] - base if s in symtab else None for s in chunk.refs))
+            cw = self._words.get(key)
+            if cw is None:
+                program = [(base + off, ins) for off, ins in chunk.program]
+                try:
+                    cw = [w for _, w in pass2(program, symtab)]
+                except Exception:
+                    # keep the parsed chunks and the words encoded so far
+                    self._chunks = chunks
+                    self._words = words
+                    self.stats['encoded'] = len(layout)
+                    return assemble(txt, self.lexer, self.parser, source=source)
+                self.stats['encoded'] += 1
+            words[key] = cw
+            machine.extend(zip(range(base, base + chunk.size, 4), cw))
+        # keep only what the current source uses
+        self._chunks = chunks
+        self._words = words
+        return machine
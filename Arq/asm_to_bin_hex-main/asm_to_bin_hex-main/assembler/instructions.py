@@ -1,14 +1,20 @@
 # ---------------------------
-# Instruction table (subset). Extend as needed.
-# Each mnemonic mapped to a lambda that takes operands and context and returns 32-bit word
-# Context contains: pc, symtab, expand_pseudo -> may be used
+# Instruction table (RV32IM). Extend by adding rows.
+# Each mnemonic maps to an InstrSpec: a base word with opcode and funct bits
+# already shifted into place, and an operand layout (which fixes the format)
+# that checks the parsed operands and ORs the register/immediate fields in.
+# INSTR_TABLE[mnemonic](operands, ctx) returns the 32-bit word.
+# Context contains: pc, symtab
 # ---------------------------
 
-from assembler.encode import *
+from functools import partial
+
+from assembler.encode import place_s, place_b, place_j
 
 OPCODES = {
     # opcode constants
     'LOAD': 0b0000011,
+    'MISC_MEM': 0b0001111,
     'STORE':0b0100011,
     'OP_IMM':0b0010011,
     'OP':0b0110011,
@@ -32,14 +38,29 @@ FUNCTS = {
     'sra': (0b0100000, 0b101),
     'or':  (0b0000000, 0b110),
     'and': (0b0000000, 0b111),
+    # RV32M
+    'mul':   (0b0000001, 0b000),
+    'mulh':  (0b0000001, 0b001),
+    'mulhsu':(0b0000001, 0b010),
+    'mulhu': (0b0000001, 0b011),
+    'div':   (0b0000001, 0b100),
+    'divu':  (0b0000001, 0b101),
+    'rem':   (0b0000001, 0b110),
+    'remu':  (0b0000001, 0b111),
 }
 
+# instruction formats
+FMT_R, FMT_I, FMT_S, FMT_B, FMT_U, FMT_J = range(6)
+
 # assembler context helpers
 class AsmContext:
     def __init__(self, symtab, pc):
         self.symtab = symtab
         self.pc = pc
 
+# operand kinds that name a symbol
+SYMBOL_KINDS = ('sym', 'pcrel_hi', 'pcrel_lo')
+
 # helper to resolve immediate or symbol
 def resolve_imm_or_sym(op, ctx):
     typ = op[0]
@@ -50,248 +71,197 @@ def resolve_imm_or_sym(op, ctx):
         if sym not in ctx.symtab:
             raise Exception(f"Undefined label: {sym}")
         return ctx.symtab[sym] - ctx.pc
+    elif typ in ('pcrel_hi', 'pcrel_lo'):
+        return resolve_pcrel(op, ctx)
     else:
         raise Exception(f"Expected immediate/label but got {op}")
 
-# encoding functions for common mnemonics (subset)
-def assemble_add(operands, ctx):
-    # add rd, rs1, rs2
-    rd = operands[0][1]
-    rs1 = operands[1][1]
-    rs2 = operands[2][1]
-    funct7, funct3 = FUNCTS['add']
-    return encode_r(funct7, rs2, rs1, funct3, rd, OPCODES['OP'])
-
-def assemble_sub(operands, ctx):
-    rd = operands[0][1]
-    rs1 = operands[1][1]
-    rs2 = operands[2][1]
-    funct7, funct3 = FUNCTS['sub']
-    return encode_r(funct7, rs2, rs1, funct3, rd, OPCODES['OP'])
-
-def assemble_addi(operands, ctx):
-    rd = operands[0][1]
-    rs1 = operands[1][1]
-    imm = operands[2][1]
+def resolve_pcrel(op, ctx):
+    # auipc/jalr (addi, load, store) pairs reaching any 32-bit offset:
+    #   ('pcrel_hi', sym): upper part of sym - pc, for the auipc
+    #   ('pcrel_lo', sym): the rest, for the instruction right after that
+    #                      auipc (so relative to pc - 4); as a load/store
+    #                      address it is ('pcrel_lo', sym, rs1)
+    typ, sym = op[0], op[1]
+    if sym not in ctx.symtab:
+        raise Exception(f"Undefined label: {sym}")
+    if typ == 'pcrel_hi':
+        return (ctx.symtab[sym] - ctx.pc + 0x800) & ~0xFFF
+    off = ctx.symtab[sym] - (ctx.pc - 4)
+    return off - ((off + 0x800) & ~0xFFF)
+
+def check_offset(offset, lo, hi, what):
+    # place_b/place_j keep only the low bits; catch what they would lose
+    if not lo <= offset <= hi:
+        raise Exception(f"{what} target out of range: {offset} (reach is {lo}..{hi})")
+    if offset & 1:
+        raise Exception(f"{what} offset must be even: {offset}")
+    return offset
+
+# ---------------------------
+# Operand layouts. Each encoder takes the row's base word and the parsed
+# operands, checks them and ORs the register and immediate fields in.
+# ---------------------------
+
+def _bad(ops, expected):
+    return Exception(f"Expected {expected} but got {ops}")
+
+def encode_rrr(base, ops, ctx):
+    # op rd, rs1, rs2
+    rd, rs1, rs2 = ops
+    if rd[0] != 'reg' or rs1[0] != 'reg' or rs2[0] != 'reg':
+        raise _bad(ops, "rd, rs1, rs2")
+    return base | (rd[1] << 7) | (rs1[1] << 15) | (rs2[1] << 20)
+
+def encode_rri(base, ops, ctx):
+    # op rd, rs1, imm
+    rd, rs1, imm = ops
+    if rd[0] != 'reg' or rs1[0] != 'reg':
+        raise _bad(ops, "rd, rs1, imm")
+    imm = imm[1] if imm[0] == 'imm' else resolve_imm_or_sym(imm, ctx)
     # check range -2048..2047
     if imm < -2048 or imm > 2047:
-        raise Exception(f"Immediate out of range for addi: {imm}")
-    return encode_i(imm & 0xfff, rs1, 0b000, rd, OPCODES['OP_IMM'])
+        raise Exception(f"Immediate out of range: {imm}")
+    return base | (rd[1] << 7) | (rs1[1] << 15) | ((imm & 0xFFF) << 20)
 
-def assemble_lui(operands, ctx):
-    rd = operands[0][1]
-    imm = operands[1][1]
-    # LUI takes upper 20 bits: imm << 12 typically passed as immediate
-    return encode_u(imm, rd, OPCODES['LUI'])
+def encode_shift(base, ops, ctx):
+    # op rd, rs1, shamt
+    rd, rs1, shamt = ops
+    if rd[0] != 'reg' or rs1[0] != 'reg' or shamt[0] != 'imm':
+        raise _bad(ops, "rd, rs1, shamt")
+    if shamt[1] < 0 or shamt[1] > 31:
+        raise Exception(f"Shift amount out of range: {shamt[1]}")
+    return base | (rd[1] << 7) | (rs1[1] << 15) | (shamt[1] << 20)
 
-def assemble_auipc(operands, ctx):
-    rd = operands[0][1]
-    imm = operands[1][1]
-    return encode_u(imm, rd, OPCODES['AUIPC'])
+MEM_KINDS = ('memoff', 'pcrel_lo')
 
-def assemble_jal(operands, ctx):
-    # jal rd, label_or_imm
-    rd = operands[0][1]
-    target = operands[1]
-    if target[0] == 'sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    elif target[0] == 'imm':
-        imm = target[1]
-    else:
-        raise Exception("Invalid jal operand")
-    # imm must be multiple of 1? JAL offset in bytes, range +/- 1MiB
-    return encode_j(imm, rd, OPCODES['JAL'])
-
-def assemble_beq(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0] == 'sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    elif target[0] == 'imm':
-        imm = target[1]
-    else:
-        raise Exception("Invalid branch operand")
-    return encode_b(imm, rs2, rs1, 0b000, OPCODES['BRANCH'])
-
-def assemble_bne(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0]=='sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    else:
-        imm = target[1]
-    return encode_b(imm, rs2, rs1, 0b001, OPCODES['BRANCH'])
-
-def assemble_blt(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0]=='sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    else:
-        imm = target[1]
-    return encode_b(imm, rs2, rs1, 0b100, OPCODES['BRANCH'])
-
-def assemble_bge(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0]=='sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    else:
-        imm = target[1]
-    return encode_b(imm, rs2, rs1, 0b101, OPCODES['BRANCH'])
-
-def assemble_bne(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0]=='sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    else:
-        imm = target[1]
-    return encode_b(imm, rs2, rs1, 0b001, OPCODES['BRANCH'])
-
-def assemble_blt(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0]=='sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    else:
-        imm = target[1]
-    return encode_b(imm, rs2, rs1, 0b100, OPCODES['BRANCH'])
-
-def assemble_bge(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0]=='sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    else:
-        imm = target[1]
-    return encode_b(imm, rs2, rs1, 0b101, OPCODES['BRANCH'])
-
-def assemble_bltu(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0]=='sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    else:
-        imm = target[1]
-    return encode_b(imm, rs2, rs1, 0b110, OPCODES['BRANCH'])
-
-def assemble_bgeu(operands, ctx):
-    rs1 = operands[0][1]
-    rs2 = operands[1][1]
-    target = operands[2]
-    if target[0]=='sym':
-        if target[1] not in ctx.symtab:
-            raise Exception(f"Undefined label: {target[1]}")
-        imm = ctx.symtab[target[1]] - ctx.pc
-    else:
-        imm = target[1]
-    return encode_b(imm, rs2, rs1, 0b111, OPCODES['BRANCH'])
-
-def assemble_lb(operands, ctx):
-    rd = operands[0][1]
-    # mem operands like imm(reg)
-    if operands[1][0] == 'memoff':
-        imm = operands[1][1]
-        rs1 = operands[1][2]
-    else:
-        raise Exception("Invalid lb operand")
-    return encode_i(imm & 0xfff, rs1, 0b000, rd, OPCODES['LOAD'])
-
-def assemble_sb(operands, ctx):
-    # sb rs2, offset(rs1)
-    if operands[0][0] != 'reg' or operands[1][0] != 'memoff':
-        raise Exception("Invalid sb operand")
-    rs2 = operands[0][1]
-    imm = operands[1][1]
-    rs1 = operands[1][2]
-    return encode_s(imm, rs2, rs1, 0b000, OPCODES['STORE'])
-
-def assemble_jalr(operands, ctx):
-    # jalr rd, rs1, imm
-    rd = operands[0][1]
-    rs1 = operands[1][1]
-    imm = operands[2][1]
+def mem_offset(mem, ctx):
+    # ('memoff', imm, rs1), or ('pcrel_lo', sym, rs1) after an auipc
+    return mem[1] if mem[0] == 'memoff' else resolve_pcrel(mem, ctx)
+
+def encode_load(base, ops, ctx):
+    # op rd, imm(rs1)
+    rd, mem = ops
+    if rd[0] != 'reg' or mem[0] not in MEM_KINDS or len(mem) != 3:
+        raise _bad(ops, "rd, offset(rs1)")
+    imm = mem_offset(mem, ctx)
     if imm < -2048 or imm > 2047:
-        raise Exception(f"Immediate out of range for jalr: {imm}")
-    return encode_i(imm & 0xfff, rs1, 0b000, rd, OPCODES['JALR'])
+        raise Exception(f"Offset out of range: {imm}")
+    return base | (rd[1] << 7) | (mem[2] << 15) | ((imm & 0xFFF) << 20)
 
-def assemble_xori(operands, ctx):
-    rd = operands[0][1]
-    rs1 = operands[1][1]
-    imm = operands[2][1]
+def encode_store(base, ops, ctx):
+    # op rs2, imm(rs1)
+    rs2, mem = ops
+    if rs2[0] != 'reg' or mem[0] not in MEM_KINDS or len(mem) != 3:
+        raise _bad(ops, "rs2, offset(rs1)")
+    imm = mem_offset(mem, ctx)
     if imm < -2048 or imm > 2047:
-        raise Exception(f"Immediate out of range for xori: {imm}")
-    return encode_i(imm & 0xfff, rs1, 0b100, rd, OPCODES['OP_IMM'])
-
-def assemble_sltiu(operands, ctx):
-    rd = operands[0][1]
-    rs1 = operands[1][1]
-    imm = operands[2][1]
-    return encode_i(imm & 0xfff, rs1, 0b011, rd, OPCODES['OP_IMM'])
-
-def assemble_sltu(operands, ctx):
-    rd = operands[0][1]
-    rs1 = operands[1][1]
-    rs2 = operands[2][1]
-    funct7, funct3 = FUNCTS['sltu']
-    return encode_r(funct7, rs2, rs1, funct3, rd, OPCODES['OP'])
-
-def assemble_slt(operands, ctx):
-    rd = operands[0][1]
-    rs1 = operands[1][1]
-    rs2 = operands[2][1]
-    funct7, funct3 = FUNCTS['slt']
-    return encode_r(funct7, rs2, rs1, funct3, rd, OPCODES['OP'])
-
-# map mnemonics to assembler functions or to pseudo-expansion
-INSTR_TABLE = {
-    'add': assemble_add,
-    'sub': assemble_sub,
-    'addi': assemble_addi,
-    'lui': assemble_lui,
-    'auipc': assemble_auipc,
-    'jal': assemble_jal,
-    'beq': assemble_beq,
-    'bne': assemble_bne,
-    'blt': assemble_blt,
-    'bge': assemble_bge,
-    'bne': assemble_bne,
-    'blt': assemble_blt,
-    'bge': assemble_bge,
-    'bltu': assemble_bltu,
-    'bgeu': assemble_bgeu,
-    'lb': assemble_lb,
-    'sb': assemble_sb,
-    'jalr': assemble_jalr,
-    'xori': assemble_xori,
-    'sltiu': assemble_sltiu,
-    'sltu': assemble_sltu,
-    'slt': assemble_slt,
-}
\ No newline at end of file
+        raise Exception(f"Offset out of range: {imm}")
+    return base | (rs2[1] << 20) | (mem[2] << 15) | place_s(imm)
+
+def encode_branch(base, ops, ctx):
+    # op rs1, rs2, label_or_imm
+    rs1, rs2, target = ops
+    if rs1[0] != 'reg' or rs2[0] != 'reg':
+        raise _bad(ops, "rs1, rs2, label")
+    offset = check_offset(resolve_imm_or_sym(target, ctx), -4096, 4094, "Branch")
+    return base | (rs1[1] << 15) | (rs2[1] << 20) | place_b(offset)
+
+def encode_upper(base, ops, ctx):
+    # op rd, imm (imm is the full value; its upper 20 bits are kept)
+    rd, imm = ops
+    if rd[0] != 'reg' or imm[0] not in ('imm', 'pcrel_hi'):
+        raise _bad(ops, "rd, imm")
+    imm = imm[1] if imm[0] == 'imm' else resolve_pcrel(imm, ctx)
+    return base | (rd[1] << 7) | (imm & 0xFFFFF000)
+
+def encode_jump(base, ops, ctx):
+    # jal rd, label_or_imm
+    rd, target = ops
+    if rd[0] != 'reg':
+        raise _bad(ops, "rd, label")
+    offset = check_offset(resolve_imm_or_sym(target, ctx), -(1 << 20), (1 << 20) - 2, "Jump")
+    return base | (rd[1] << 7) | place_j(offset)
+
+def encode_none(base, ops, ctx):
+    if ops:
+        raise _bad(ops, "no operands")
+    return base
+
+# layout name -> (format, operand slot names, encoder)
+LAYOUTS = {
+    'rrr':    (FMT_R, ('rd', 'rs1', 'rs2'), encode_rrr),
+    'rri':    (FMT_I, ('rd', 'rs1', 'imm'), encode_rri),
+    'shift':  (FMT_I, ('rd', 'rs1', 'shamt'), encode_shift),
+    'load':   (FMT_I, ('rd', 'mem'), encode_load),
+    'store':  (FMT_S, ('rs2', 'mem'), encode_store),
+    'branch': (FMT_B, ('rs1', 'rs2', 'target'), encode_branch),
+    'upper':  (FMT_U, ('rd', 'imm'), encode_upper),
+    'jump':   (FMT_J, ('rd', 'target'), encode_jump),
+    'none':   (FMT_I, (), encode_none),
+}
+
+class InstrSpec:
+    __slots__ = ('mnemonic', 'fmt', 'base', 'layout', 'slots', 'encode')
+
+    def __init__(self, mnemonic, base, layout):
+        self.mnemonic = mnemonic
+        self.base = base
+        self.layout = layout
+        self.fmt, self.slots, encoder = LAYOUTS[layout]
+        # encode(operands, ctx) -> 32-bit word, with the base word bound in
+        self.encode = partial(encoder, base)
+
+    def __call__(self, operands, ctx):
+        if len(operands) != len(self.slots):
+            raise Exception(f"Expected {len(self.slots)} operands but got {len(operands)}")
+        return self.encode(operands, ctx)
+
+    def __repr__(self):
+        return f"InstrSpec({self.mnemonic} base=0x{self.base:08x} {self.layout})"
+
+# ---------------------------
+# Table rows
+# ---------------------------
+
+def _base(opcode, funct3=0, funct7=0):
+    return (funct7 << 25) | (funct3 << 12) | OPCODES[opcode]
+
+_ROWS = [
+    # mnemonic, base word, operand layout (which also fixes the format)
+    ('lui',   _base('LUI'), 'upper'),
+    ('auipc', _base('AUIPC'), 'upper'),
+    ('jal',   _base('JAL'), 'jump'),
+    ('jalr',  _base('JALR', 0b000), 'rri'),
+    ('beq',   _base('BRANCH', 0b000), 'branch'),
+    ('bne',   _base('BRANCH', 0b001), 'branch'),
+    ('blt',   _base('BRANCH', 0b100), 'branch'),
+    ('bge',   _base('BRANCH', 0b101), 'branch'),
+    ('bltu',  _base('BRANCH', 0b110), 'branch'),
+    ('bgeu',  _base('BRANCH', 0b111), 'branch'),
+    ('lb',    _base('LOAD', 0b000), 'load'),
+    ('lh',    _base('LOAD', 0b001), 'load'),
+    ('lw',    _base('LOAD', 0b010), 'load'),
+    ('lbu',   _base('LOAD', 0b100), 'load'),
+    ('lhu',   _base('LOAD', 0b101), 'load'),
+    ('sb',    _base('STORE', 0b000), 'store'),
+    ('sh',    _base('STORE', 0b001), 'store'),
+    ('sw',    _base('STORE', 0b010), 'store'),
+    ('addi',  _base('OP_IMM', 0b000), 'rri'),
+    ('slti',  _base('OP_IMM', 0b010), 'rri'),
+    ('sltiu', _base('OP_IMM', 0b011), 'rri'),
+    ('xori',  _base('OP_IMM', 0b100), 'rri'),
+    ('ori',   _base('OP_IMM', 0b110), 'rri'),
+    ('andi',  _base('OP_IMM', 0b111), 'rri'),
+    ('slli',  _base('OP_IMM', 0b001, 0b0000000), 'shift'),
+    ('srli',  _base('OP_IMM', 0b101, 0b0000000), 'shift'),
+    ('srai',  _base('OP_IMM', 0b101, 0b0100000), 'shift'),
+    ('fence', 0x0ff00000 | OPCODES['MISC_MEM'], 'none'),  # fence iorw, iorw
+    ('ecall', _base('SYSTEM'), 'none'),
+    ('ebreak', (1 << 20) | OPCODES['SYSTEM'], 'none'),
+]
+# register-register ops (RV32I base + RV32M) come straight from FUNCTS
+_ROWS += [(m, _base('OP', f3, f7), 'rrr') for m, (f7, f3) in FUNCTS.items()]
+
+# map mnemonics to their encoding spec (pseudo-instructions are expanded before lookup)
+INSTR_TABLE = {m: InstrSpec(m, base, layout) for m, base, layout in _ROWS}
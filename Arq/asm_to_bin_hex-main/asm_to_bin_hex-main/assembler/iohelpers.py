@@ -1,9 +1,214 @@
 # ---------------------------
 # I/O helpers: read assembly, write hex/bin
+# The whole-program writers build their output in memory and write it at
+# once; the streaming writers at the end write it chunk by chunk.
 # ---------------------------
 
+import os
+import sys
+from array import array
+from operator import itemgetter
+
 def write_hex_bin(machine, hexfile, binfile):
-    with open(hexfile, 'w') as hf, open(binfile, 'w') as bf:
-        for addr, word in machine:
-            hf.write(f"{word:08x}\n")
-            bf.write(f"{word:032b}\n")
\ No newline at end of file
+    # text formats: one 8-digit hex word / one 32-char binary word per line
+    words = list(map(itemgetter(1), machine))
+    with open(hexfile, 'w') as hf:
+        hf.write(''.join(map('{:08x}\n'.format, words)))
+    with open(binfile, 'w') as bf:
+        bf.write(''.join(map('{:032b}\n'.format, words)))
+
+def machine_image(machine):
+    # flat array of 32-bit words covering address 0 up to the last word;
+    # holes between words are zero-filled
+    words = array('I', map(itemgetter(1), machine))
+    addrs = list(map(itemgetter(0), machine))
+    if addrs == list(range(0, 4 * len(addrs), 4)):
+        return words
+    image = array('I', bytes(4 * (max(addrs) // 4 + 1)) if addrs else b'')
+    for addr, word in machine:
+        image[addr // 4] = word
+    return image
+
+def image_bytes(machine):
+    # raw little-endian memory image
+    image = machine_image(machine)
+    if sys.byteorder != 'little':
+        image.byteswap()
+    return image.tobytes()
+
+def write_raw(machine, path):
+    with open(path, 'wb') as f:
+        f.write(image_bytes(machine))
+
+def write_ihex(machine, path):
+    # Intel HEX: 16-byte data records, extended linear address records for
+    # images above 64 KiB, then the EOF record
+    data = image_bytes(machine)
+    lines = []
+    upper = 0
+    for offset in range(0, len(data), 16):
+        if offset >> 16 != upper:
+            upper = offset >> 16
+            lines.append(_ihex_record(0, 0x04, upper.to_bytes(2, 'big')))
+        lines.append(_ihex_record(offset & 0xFFFF, 0x00, data[offset:offset + 16]))
+    lines.append(_ihex_record(0, 0x01, b''))
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def _ihex_record(addr, rectype, payload):
+    rec = bytes((len(payload), addr >> 8, addr & 0xFF, rectype)) + payload
+    return ':' + (rec + bytes(((-sum(rec)) & 0xFF,))).hex().upper()
+
+def write_vmem(machine, path):
+    # Verilog $readmemh: word-addressed, one 32-bit word per line
+    words = machine_image(machine)
+    with open(path, 'w') as f:
+        f.write('@00000000\n' + ''.join(map('{:08x}\n'.format, words)))
+
+# --format name -> writer(machine, path); 'hexbin' (write_hex_bin) takes two paths
+WRITERS = {
+    'raw': write_raw,
+    'ihex': write_ihex,
+    'vmem': write_vmem,
+}
+
+def write_output(machine, fmt, outputs):
+    if fmt == 'hexbin':
+        write_hex_bin(machine, *outputs)
+    else:
+        WRITERS[fmt](machine, outputs[0])
+
+# ---------------------------
+# Streaming writers: output is written chunk by chunk as words are encoded
+# (--stream). write() takes a machine chunk of (address, word); the image
+# formats need the addresses to run contiguously from 0.
+# ---------------------------
+
+class _StreamWriter:
+    def __init__(self, paths):
+        self.paths = paths
+        self.files = []
+        self.next_addr = 0
+
+    def _open(self, path, mode):
+        f = open(path, mode)
+        self.files.append(f)
+        return f
+
+    def _words(self, chunk):
+        # words of a chunk that continues the image at next_addr
+        first, last = chunk[0][0], chunk[-1][0]
+        if first != self.next_addr or last - first != 4 * (len(chunk) - 1):
+            expected = self.next_addr
+            for addr, _ in chunk:
+                if addr != expected:
+                    break
+                expected += 4
+            raise Exception(f"{self.name} output in streaming mode needs contiguous "
+                            f"addresses from 0 (expected 0x{expected:08x}, got 0x{addr:08x})")
+        self.next_addr = last + 4
+        return array('I', map(itemgetter(1), chunk))
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+    def discard(self):
+        # failed run: don't leave half-written outputs behind
+        self.close()
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class HexBinStream(_StreamWriter):
+    name = 'hexbin'
+
+    def __init__(self, hexfile, binfile):
+        super().__init__([hexfile, binfile])
+        self.hf = self._open(hexfile, 'w')
+        self.bf = self._open(binfile, 'w')
+
+    def write(self, chunk):
+        # text formats list the words in order, whatever their addresses
+        words = list(map(itemgetter(1), chunk))
+        self.hf.write(''.join(map('{:08x}\n'.format, words)))
+        self.bf.write(''.join(map('{:032b}\n'.format, words)))
+
+class RawStream(_StreamWriter):
+    name = 'raw'
+
+    def __init__(self, path):
+        super().__init__([path])
+        self.f = self._open(path, 'wb')
+
+    def write(self, chunk):
+        words = self._words(chunk)
+        if sys.byteorder != 'little':
+            words.byteswap()
+        self.f.write(words.tobytes())
+
+class VmemStream(_StreamWriter):
+    name = 'vmem'
+
+    def __init__(self, path):
+        super().__init__([path])
+        self.f = self._open(path, 'w')
+        self.f.write('@00000000\n')
+
+    def write(self, chunk):
+        self.f.write(''.join(map('{:08x}\n'.format, self._words(chunk))))
+
+class IhexStream(_StreamWriter):
+    name = 'ihex'
+
+    def __init__(self, path):
+        super().__init__([path])
+        self.f = self._open(path, 'w')
+        self.pending = b''  # bytes not yet filling a whole 16-byte record
+        self.offset = 0
+        self.upper = 0
+
+    def write(self, chunk):
+        words = self._words(chunk)
+        if sys.byteorder != 'little':
+            words.byteswap()
+        data = self.pending + words.tobytes()
+        whole = len(data) - len(data) % 16
+        self._records(data[:whole])
+        self.pending = data[whole:]
+
+    def _records(self, data):
+        lines = []
+        for i in range(0, len(data), 16):
+            offset = self.offset + i
+            if offset >> 16 != self.upper:
+                self.upper = offset >> 16
+                lines.append(_ihex_record(0, 0x04, self.upper.to_bytes(2, 'big')))
+            lines.append(_ihex_record(offset & 0xFFFF, 0x00, data[i:i + 16]))
+        self.offset += len(data)
+        if lines:
+            self.f.write('\n'.join(lines) + '\n')
+
+    def close(self):
+        if not self.f.closed:
+            self._records(self.pending)
+            self.pending = b''
+            self.f.write(_ihex_record(0, 0x01, b'') + '\n')
+        super().close()
+
+    def discard(self):
+        self.pending = b''
+        self.f.close()
+        super().discard()
+
+STREAM_WRITERS = {
+    'hexbin': HexBinStream,
+    'raw': RawStream,
+    'ihex': IhexStream,
+    'vmem': VmemStream,
+}
+
+def open_stream(fmt, outputs):
+    return STREAM_WRITERS[fmt](*outputs)
@@ -3,17 +3,19 @@
 # ---------------------------
 
 from sly import Lexer
+from assembler.lineparser import parse_number, parse_string
+from assembler.nodes import LOC_SHIFT
 
 class AsmLexer(Lexer):
     # Define los nombres de los tokens en un set de strings
     tokens = {
         'IDENT', 'MNEMONIC', 'REGISTER', 'NUMBER',
         'DIRECTIVE', 'LABEL', 'COMMA', 'LPAREN',
-        'RPAREN', 'COLON', 'NEWLINE'
+        'RPAREN', 'COLON', 'NEWLINE', 'STRING', 'MACROARG'
     }
 
     # Caracteres ignorados y comentarios
-    ignore = ' \t'
+    ignore = ' \t\r'
     ignore_comment = r'\#.*'
 
     # Definición de símbolos simples
@@ -21,7 +23,23 @@ class AsmLexer(Lexer):
     LPAREN = r'\('
     RPAREN = r'\)'
     COLON  = r':'
-    NEWLINE = r'\n+'
+
+    # string literals for .asciz
+    @_(r'"(?:[^"\\\n]|\\.)*"')
+    def STRING(self, t):
+        t.value = parse_string(t.value)
+        return t
+
+    # \param inside a .macro body (assembler.preprocess)
+    @_(r'\\[A-Za-z_]\w*')
+    def MACROARG(self, t):
+        t.value = t.value[1:].lower()
+        return t
+
+    @_(r'\n+')
+    def NEWLINE(self, t):
+        self.lineno += len(t.value)
+        return t
 
     # directives like .text .data
     @_(r'\.[A-Za-z]+')
@@ -51,23 +69,20 @@ class AsmLexer(Lexer):
         return t
 
     # numbers: decimal, hex 0x..., binary 0b...
-    @_(r'0x[0-9A-Fa-f]+')
+    # (one rule: sly keeps only the last of several same-named functions)
+    @_(r'0x[0-9A-Fa-f]+', r'0b[01]+', r'-?\d+')
     def NUMBER(self, t):
-        t.value = int(t.value, 16)
+        t.value = parse_number(t.value)
         return t
 
-    @_(r'0b[01]+')
-    def NUMBER(self, t):
-        t.value = int(t.value, 2)
-        return t
-
-    @_(r'-?\d+')
-    def NUMBER(self, t):
-        t.value = int(t.value, 10)
-        return t
+    # error: reported to diag (a Diagnostics) when set, else printed
+    diag = None
 
-    # error
     def error(self, t):
-        print(f'Lexer: illegal character {t.value[0]!r} at line {self.lineno}')
+        if self.diag is not None:
+            self.diag.error('lex', f"Illegal character {t.value[0]!r}",
+                            self.lineno << LOC_SHIFT | self.index)
+        else:
+            print(f'Lexer: illegal character {t.value[0]!r} at line {self.lineno}')
         self.index += 1
         
\ No newline at end of file
@@ -0,0 +1,234 @@
+# ---------------------------
+# Hand-written lexer and parser (default front end)
+# Same tokens and the same Label/Directive/Instr statements as the sly
+# AsmLexer/AsmParser, but nothing is generated at import time: one master
+# regex for the tokens and a small recursive-descent parser for the grammar
+#   line     : LABEL | NEWLINE | DIRECTIVE [operands] | MNEMONIC [operands]
+#   operands : operand {COMMA operand}
+#   operand  : REGISTER | NUMBER | MNEMONIC | STRING | LPAREN REGISTER RPAREN
+#            | NUMBER LPAREN REGISTER RPAREN
+# The parser takes the tokens a line at a time, so a token stream straight
+# from the lexer is never held whole; names are interned and equal operand
+# tuples shared, so a big source's statements don't hold a copy of each.
+# ---------------------------
+
+import re
+import sys
+
+from assembler.nodes import Label, Directive, Instr, LOC_SHIFT
+
+# alternatives in the same order sly tries them; the first match wins
+TOKEN_RE = re.compile(r'''
+    (?P<ignore>[ \t\r]+|\#.*)
+  | (?P<COMMA>,)
+  | (?P<LPAREN>\()
+  | (?P<RPAREN>\))
+  | (?P<COLON>:)
+  | (?P<STRING>"(?:[^"\\\n]|\\.)*")
+  | (?P<MACROARG>\\[A-Za-z_]\w*)
+  | (?P<NEWLINE>\n+)
+  | (?P<DIRECTIVE>\.[A-Za-z]+)
+  | (?P<LABEL>[A-Za-z_]\w*:)
+  | (?P<REGISTER>x(?:[0-2]?\d|3[01])\b)
+  | (?P<MNEMONIC>[A-Za-z][A-Za-z0-9_\.]*)
+  | (?P<NUMBER>0x[0-9A-Fa-f]+|0b[01]+|-?\d+)
+''', re.VERBOSE)
+
+class Tok:
+    # same fields as a sly token
+    __slots__ = ('type', 'value', 'lineno', 'index')
+
+    def __init__(self, type, value, lineno, index):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.index = index
+
+    def __repr__(self):
+        return f"Token(type={self.type!r}, value={self.value!r}, lineno={self.lineno}, index={self.index})"
+
+def parse_number(text):
+    if text.startswith('0x'):
+        return int(text, 16)
+    if text.startswith('0b'):
+        return int(text, 2)
+    return int(text, 10)
+
+def parse_string(text):
+    # "..." with C escapes (\n, \t, \0, \x41, \\, \") -> str
+    body = text[1:-1]
+    if '\\' not in body:
+        return body
+    return body.encode('latin-1', 'backslashreplace').decode('unicode_escape')
+
+# token type -> value conversion, same as the sly token rules
+CONVERT = {
+    'NUMBER': parse_number,
+    'STRING': parse_string,
+    'REGISTER': lambda text: int(text[1:]),
+    'LABEL': lambda text: sys.intern(text[:-1]),
+    'DIRECTIVE': lambda text: sys.intern(text.lower()),
+    'MNEMONIC': lambda text: sys.intern(text.lower()),
+    'MACROARG': lambda text: text[1:].lower(),
+}
+
+class LineLexer:
+    diag = None  # a Diagnostics to report errors to; printed when None
+
+    def tokenize(self, txt, lineno=1):
+        match = TOKEN_RE.match
+        convert = CONVERT.get
+        index = 0
+        end = len(txt)
+        while index < end:
+            m = match(txt, index)
+            if m is None:
+                if self.diag is not None:
+                    self.diag.error('lex', f"Illegal character {txt[index]!r}",
+                                    lineno << LOC_SHIFT | index)
+                else:
+                    print(f'Lexer: illegal character {txt[index]!r} at line {lineno}')
+                index += 1
+                continue
+            kind = m.lastgroup
+            if kind != 'ignore':
+                text = m.group()
+                conv = convert(kind)
+                yield Tok(kind, conv(text) if conv else text, lineno, index)
+                if kind == 'NEWLINE':
+                    lineno += len(text)
+            index = m.end()
+
+# tokens an operand can start with
+OPERAND_START = {'REGISTER', 'NUMBER', 'MNEMONIC', 'STRING', 'LPAREN'}
+# tokens that may follow a complete instruction
+LINE_START = {'NEWLINE', 'LABEL', 'DIRECTIVE', 'MNEMONIC'}
+
+class LineParser:
+    diag = None  # as LineLexer.diag
+
+    def parse(self, tokens):
+        # tokens: any iterable of tokens -> list of statements
+        statements = []
+        self._shared = {}  # operand tuple -> the first one equal to it
+        line = []
+        try:
+            for tok in tokens:
+                if tok.type != 'NEWLINE':
+                    line.append(tok)
+                elif line:
+                    line.append(tok)  # errors at the end of the line name it
+                    self._line(line, statements)
+                    line = []
+            if line:
+                self._line(line, statements)
+        finally:
+            self._toks = self._shared = None
+        return statements
+
+    def _line(self, toks, statements):
+        # the statements of one line (a label may share it with another)
+        self._toks = toks
+        self._pos = 0
+        while self._pos < len(toks):
+            tok = toks[self._pos]
+            self._pos += 1
+            kind = tok.type
+            if kind == 'NEWLINE':
+                continue
+            self._start = tok
+            loc = tok.lineno << LOC_SHIFT | tok.index
+            if kind == 'LABEL':
+                statements.append(Label(tok.value, loc))
+            elif kind in ('MNEMONIC', 'DIRECTIVE'):
+                try:
+                    operands = self._operands()
+                    nxt = self._peek()
+                    if nxt is not None and nxt.type not in LINE_START:
+                        self._expect('NEWLINE')
+                except SyntaxError:
+                    self._recover()
+                    continue
+                if kind == 'MNEMONIC':
+                    statements.append(Instr(tok.value, operands, loc))
+                else:
+                    statements.append(Directive(tok.value, operands, loc))
+            else:
+                self.error(tok)
+                self._recover()
+
+    def _recover(self):
+        # a malformed line is dropped: skip to the end of it
+        self._pos = len(self._toks)
+
+    def _peek(self):
+        if self._pos < len(self._toks):
+            return self._toks[self._pos]
+        return None
+
+    def _expect(self, kind):
+        tok = self._peek()
+        if tok is None or tok.type != kind:
+            self.error(tok)
+            raise SyntaxError(kind)
+        self._pos += 1
+        return tok.value
+
+    def _operands(self):
+        operands = []
+        tok = self._peek()
+        if tok is None or tok.type not in OPERAND_START:
+            return operands  # bare mnemonic (ecall, ret, ...)
+        operands.append(self._operand())
+        while True:
+            tok = self._peek()
+            if tok is None or tok.type != 'COMMA':
+                return operands
+            self._pos += 1
+            operands.append(self._operand())
+
+    def _operand(self):
+        op = self._parse_operand()
+        return self._shared.setdefault(op, op)
+
+    def _parse_operand(self):
+        tok = self._peek()
+        kind = tok.type if tok is not None else None
+        if kind == 'REGISTER':
+            self._pos += 1
+            return ('reg', tok.value)
+        if kind == 'MNEMONIC':  # used as identifier operand (label)
+            self._pos += 1
+            return ('sym', tok.value)
+        if kind == 'STRING':  # .asciz "text"
+            self._pos += 1
+            return ('str', tok.value)
+        if kind == 'LPAREN':
+            self._pos += 1
+            reg = self._expect('REGISTER')
+            self._expect('RPAREN')
+            return ('paren_reg', reg)
+        if kind == 'NUMBER':
+            self._pos += 1
+            nxt = self._peek()
+            if nxt is None or nxt.type != 'LPAREN':
+                return ('imm', tok.value)
+            self._pos += 1
+            reg = self._expect('REGISTER')
+            self._expect('RPAREN')
+            return ('memoff', tok.value, reg)
+        self._expect('operand')
+
+    def error(self, tok):
+        if self.diag is not None:
+            start = self._start.lineno << LOC_SHIFT | self._start.index
+            if tok is not None:
+                near = 'end of line' if tok.type == 'NEWLINE' else f"{tok.type}({tok.value})"
+                self.diag.error('parse', f"Parse error near {near}",
+                                tok.lineno << LOC_SHIFT | tok.index, start)
+            else:
+                self.diag.error('parse', "Parse error at EOF", start)
+        elif tok is not None:
+            print(f"Parse error near {tok.type}({tok.value})")
+        else:
+            print("Parse error at EOF")
@@ -0,0 +1,148 @@
+# ---------------------------
+# Linker: object files (-f obj) -> one program image
+# The texts of all modules are laid out from address 0 in the order given
+# (so the first module holds the entry point), then their .data images,
+# each aligned as its module asks. The whole image is one bytearray; every
+# relocation is patched into it in place and it is written out with the
+# usual writers.
+# Branches and jal to other modules keep their short reach (use call/tail
+# or la+jalr across modules that may end up far apart); an out-of-range
+# relocation is reported, not truncated.
+#
+# Usage: python -m assembler.link [-f FORMAT] -o OUTPUT [-o OUTPUT] a.o b.o ...
+#        (.asm inputs are assembled on the fly)
+# ---------------------------
+
+import struct
+import sys
+from array import array
+
+from assembler.encode import place_s, place_b, place_j
+from assembler.instructions import check_offset
+
+_word = struct.Struct('<I')
+
+def _pcrel_lo(value):
+    return value - ((value + 0x800) & ~0xFFF)
+
+def _check_i(value):
+    if not -2048 <= value <= 2047:
+        raise Exception(f"Immediate out of range: {value}")
+    return value
+
+# kind -> (field mask, value(S, P) -> field bits); P is the address of the
+# patched instruction, pcrel_lo is relative to the auipc just before it
+TEXT_RELOCS = {
+    'branch': (0xFE000F80, lambda s, p: place_b(check_offset(s - p, -4096, 4094, "Branch"))),
+    'jal': (0xFFFFF000, lambda s, p: place_j(check_offset(s - p, -(1 << 20), (1 << 20) - 2, "Jump"))),
+    'pcrel_i': (0xFFF00000, lambda s, p: (_check_i(s - p) & 0xFFF) << 20),
+    'pcrel_hi': (0xFFFFF000, lambda s, p: (s - p + 0x800) & 0xFFFFF000),
+    'pcrel_lo_i': (0xFFF00000, lambda s, p: (_pcrel_lo(s - (p - 4)) & 0xFFF) << 20),
+    'pcrel_lo_s': (0xFE000F80, lambda s, p: place_s(_pcrel_lo(s - (p - 4)))),
+}
+
+# kind -> bytes written (label address, little-endian)
+DATA_RELOCS = {'abs32': 4, 'abs16': 2, 'abs8': 1}
+
+def layout(modules):
+    # -> (image size, [(text base, data base) per module])
+    pc = 0
+    text_bases = []
+    for m in modules:
+        text_bases.append(pc)
+        pc += len(m.text)
+    data_bases = []
+    for m in modules:
+        pc = (pc + m.data_align - 1) & -m.data_align
+        data_bases.append(pc)
+        pc += len(m.data)
+    return pc, list(zip(text_bases, data_bases))
+
+def link(modules):
+    # -> (bytearray image, symtab of the exported labels)
+    size, bases = layout(modules)
+    image = bytearray(size)
+    exported = {}
+    owner = {}
+    for m, (tb, db) in zip(modules, bases):
+        image[tb:tb + len(m.text)] = m.text
+        image[db:db + len(m.data)] = m.data
+        for name in m.globals:
+            if name in exported:
+                raise Exception(f"Symbol {name} defined in both {owner[name]} and {m.name}")
+            section, off = m.symbols[name]
+            exported[name] = (tb if section == 'text' else db) + off
+            owner[name] = m.name
+    for m, (tb, db) in zip(modules, bases):
+        for section, off, kind, sym in m.relocs:
+            if sym in m.symbols:
+                sec, soff = m.symbols[sym]
+                value = (tb if sec == 'text' else db) + soff
+            elif sym in exported:
+                value = exported[sym]
+            else:
+                raise Exception(f"Undefined symbol {sym} (referenced from {m.name})")
+            addr = (tb if section == 'text' else db) + off
+            try:
+                _patch(image, addr, kind, value)
+            except Exception as e:
+                raise Exception(f"{m.name}: {kind} relocation to {sym} at 0x{addr:08x}: {e}")
+    return image, exported
+
+def _patch(image, addr, kind, value):
+    if kind in TEXT_RELOCS:
+        mask, field = TEXT_RELOCS[kind]
+        word = _word.unpack_from(image, addr)[0]
+        _word.pack_into(image, addr, (word & ~mask & 0xFFFFFFFF) | (field(value, addr) & mask))
+        return
+    size = DATA_RELOCS[kind]
+    if value >> (8 * size):
+        raise Exception(f"address 0x{value:x} does not fit in {8 * size} bits")
+    image[addr:addr + size] = value.to_bytes(size, 'little')
+
+def image_machine(image):
+    # bytearray image -> machine list of (address, word) for the writers
+    words = array('I')
+    words.frombytes(bytes(image) + bytes(-len(image) % 4))
+    if sys.byteorder != 'little':
+        words.byteswap()
+    return list(zip(range(0, 4 * len(words), 4), words))
+
+def load_module(path, lexer=None, parser=None):
+    from assembler.objfile import read_object, assemble_object
+    if path.endswith('.asm'):
+        with open(path, 'r') as f:
+            try:
+                obj = assemble_object(f.read(), lexer, parser, source=path)
+            except Exception as e:
+                raise Exception(f"{path}: {e}")
+        obj.name = path
+        return obj
+    return read_object(path)
+
+def main(argv=None):
+    import argparse
+    from assembler.iohelpers import WRITERS, write_output
+    ap = argparse.ArgumentParser(prog='assembler.link',
+                                 description="Link object files (assembler -f obj) into one image")
+    ap.add_argument('inputs', nargs='+', metavar='MODULE')
+    ap.add_argument('-o', '--output', action='append', required=True,
+                    help="output file (hexbin takes two: -o program.hex -o program.bin)")
+    ap.add_argument('-f', '--format', default='hexbin', choices=['hexbin'] + sorted(WRITERS))
+    args = ap.parse_args(argv)
+    expected = 2 if args.format == 'hexbin' else 1
+    if len(args.output) != expected:
+        ap.error(f"format {args.format} takes {expected} output file(s)")
+    try:
+        modules = [load_module(path) for path in args.inputs]
+        image, _ = link(modules)
+    except Exception as e:
+        print(e)
+        return 1
+    machine = image_machine(image)
+    write_output(machine, args.format, args.output)
+    print(f"Linked {len(modules)} modules, {len(machine)} words to {' and '.join(args.output)}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
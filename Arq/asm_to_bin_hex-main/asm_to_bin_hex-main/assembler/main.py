@@ -2,41 +2,218 @@
 # Main
 # ---------------------------
 
+import argparse
+import json
 import sys
-from assembler.lexer import AsmLexer
-from assembler.parser import AsmParser
-from assembler.passes import pass1, pass2
-from assembler.iohelpers import write_hex_bin
+from assembler.cache import AsmCache, assemble_cached, DEFAULT_CACHE_SIZE
+from assembler.diagnostics import Diagnostics
+from assembler.iohelpers import WRITERS, write_output
+
+USAGE = """assembler [options] program.asm program.hex program.bin
+       assembler [options] -f {raw,ihex,vmem} program.asm OUTPUT
+       assembler [options] -f obj module.asm module.o
+       assembler [options] --batch [-j N] [-o OUTDIR] INPUT [INPUT ...]
+       assembler [options] --watch program.asm OUTPUT [OUTPUT]
+       assembler --serve [--port PORT]"""
+
+def parse_args(argv):
+    ap = argparse.ArgumentParser(
+        prog='assembler', usage=USAGE,
+        description="RISC-V assembler: .asm -> .hex/.bin",
+        epilog="hexbin (default) takes two outputs, program.hex program.bin; "
+               "raw, ihex and vmem take a single output file. In batch mode "
+               "every INPUT is a file, a directory (all .asm below it) or a glob.")
+    ap.add_argument('paths', nargs='*', metavar='FILE', help=argparse.SUPPRESS)
+    ap.add_argument('-f', '--format', default='hexbin', choices=['hexbin', 'obj'] + sorted(WRITERS),
+                    help="hexbin: hex and ASCII-binary text (default); raw: little-endian "
+                         "binary image; ihex: Intel HEX; vmem: Verilog $readmemh; obj: "
+                         "relocatable object for python -m assembler.link")
+    ap.add_argument('--batch', action='store_true',
+                    help="assemble many inputs in parallel; outputs go next to each "
+                         "input (or into OUTDIR) named after it")
+    ap.add_argument('-j', '--jobs', type=int, default=None,
+                    help="worker processes for --batch (default: CPU count); for a single "
+                         "big program, processes to encode it with (default: 1, and never "
+                         "more than the CPU count)")
+    ap.add_argument('-o', '--outdir', default=None, help="output directory for --batch")
+    ap.add_argument('--watch', action='store_true',
+                    help="stay running and re-assemble whenever the input changes")
+    ap.add_argument('--serve', action='store_true',
+                    help="stay running and assemble JSON requests sent to a local socket")
+    ap.add_argument('--port', type=int, default=None, help="port for --serve (default: 8765)")
+    ap.add_argument('-O', '--optimize', action='store_true',
+                    help="drop no-op instructions, use the shortest constant loads and "
+                         "relax call/tail to jal where the target is in reach")
+    ap.add_argument('--stream', action='store_true',
+                    help="read the input twice in blocks and write output as it is "
+                         "encoded, so memory stays flat for huge sources (no cache)")
+    ap.add_argument('--parser', default='line', choices=['line', 'sly'],
+                    help="front end: line (hand-written, default) or sly (the LALR "
+                         "grammar; builds its tables at startup)")
+    ap.add_argument('--all-errors', action='store_true',
+                    help="carry on past errors and report all of them (default: stop "
+                         "at the first)")
+    ap.add_argument('--error-report', default=None, metavar='FILE',
+                    help="also write the errors (or that there were none) to FILE as JSON")
+    ap.add_argument('--stats', action='store_true',
+                    help="print the time and item count of each phase (lex, parse, pass1, "
+                         "pass2 per mnemonic, write) and the process's peak RSS so far "
+                         "at its end")
+    ap.add_argument('--profile', action='store_true',
+                    help="--stats plus the peak Python allocations of each phase "
+                         "(traced, so several times slower)")
+    ap.add_argument('--stats-json', default=None, metavar='FILE',
+                    help="also write the phase stats to FILE as JSON (implies --stats)")
+    ap.add_argument('--no-cache', action='store_true',
+                    help="always assemble; don't read or write the assembly cache")
+    ap.add_argument('--cache-dir', default=None,
+                    help="cache directory (default: $ASM_CACHE_DIR or ~/.cache/asm_to_bin_hex)")
+    ap.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                    help="cache size limit in MiB; least recently used entries are evicted")
+    args = ap.parse_args(argv)
+    if args.optimize and (args.stream or args.watch or args.serve):
+        ap.error("-O lays out the whole program at once; it can't be combined "
+                 "with --stream, --watch or --serve")
+    if args.format == 'obj' and (args.stream or args.watch or args.serve):
+        ap.error("-f obj can't be combined with --stream, --watch or --serve")
+    if (args.all_errors or args.error_report) and (args.stream or args.watch or args.serve):
+        ap.error("--all-errors and --error-report can't be combined with --stream, --watch or --serve")
+    if (args.stats or args.profile or args.stats_json) and \
+            (args.stream or args.watch or args.serve or args.batch or args.format == 'obj'):
+        ap.error("--stats, --profile and --stats-json profile a single-file assembly; they "
+                 "can't be combined with --stream, --watch, --serve, --batch or -f obj")
+    if args.serve:
+        if args.paths:
+            ap.error("--serve takes no files")
+    elif args.batch:
+        if not args.paths:
+            ap.error("--batch needs at least one input")
+    else:
+        expected = 2 if args.format == 'hexbin' else 1
+        if len(args.paths) != 1 + expected:
+            ap.error(f"format {args.format} takes one input and {expected} output file(s)")
+    return args
+
+def assemble_options(args):
+    # options that change the output words: passed to assemble() and part
+    # of the cache key
+    return (('optimize', True),) if args.optimize else ()
+
+def cache_args(args):
+    # (directory, max_bytes) for AsmCache, or None with --no-cache
+    if args.no_cache:
+        return None
+    return args.cache_dir, args.cache_size * 1024 * 1024
+
+def write_report(path, report):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
 
 def main():
-    if len(sys.argv) != 4:
-        print("Usage: python assembler.py program.asm program.hex program.bin")
-        sys.exit(1)
-    asmfile, hexfile, binfile = sys.argv[1:4]
+    args = parse_args(sys.argv[1:])
+    if args.batch:
+        sys.exit(main_batch(args))
+    if args.serve:
+        from assembler.server import serve, DEFAULT_PORT
+        serve(args.port or DEFAULT_PORT, front_end=args.parser)
+        return
+    asmfile, outputs = args.paths[0], args.paths[1:]
+    if args.watch:
+        from assembler.server import watch
+        watch(asmfile, args.format, outputs, front_end=args.parser)
+        return
+    if args.stream:
+        sys.exit(main_stream(args, asmfile, outputs))
+    if args.format == 'obj':
+        sys.exit(main_object(args, asmfile, outputs[0]))
     txt = open(asmfile, 'r').read()
-    lexer = AsmLexer()
-    parser = AsmParser()
-    tokens = list(lexer.tokenize(txt))
-    # parse
+    cache = AsmCache(*cache_args(args)) if not args.no_cache else None
+    lexer = parser = None
+    if args.parser != 'line':
+        from assembler.pipeline import make_front_end
+        lexer, parser = make_front_end(args.parser)
+    diag = Diagnostics(asmfile, txt, collect=args.all_errors)
+    profile = None
+    if args.stats or args.profile or args.stats_json:
+        from assembler.profiling import Profile
+        profile = Profile(memory=args.profile)
     try:
-        statements = parser.parse(iter(tokens))
+        machine = assemble_cached(txt, cache, lexer, parser, assemble_options(args), asmfile, diag,
+                                  args.jobs, profile)
     except Exception as e:
-        print("Parse failed:", e)
+        print(e)
+        if args.error_report:
+            write_report(args.error_report, diag.report(e))
         sys.exit(1)
-    # filter out None lines
-    statements = [s for s in statements if s is not None]
+    if args.error_report:
+        write_report(args.error_report, diag.report())
+    if profile is None:
+        write_output(machine, args.format, outputs)
+    else:
+        with profile.phase('write') as ph:
+            write_output(machine, args.format, outputs)
+            ph.count += len(machine)
+        profile.close()
+    print(f"Wrote {len(machine)} words to {' and '.join(outputs)}")
+    if cache is not None:
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses")
+    if profile is not None:
+        print(profile.format())
+        if args.stats_json:
+            write_report(args.stats_json, profile.as_dict())
+
+def main_stream(args, asmfile, outputs):
+    from assembler.pipeline import make_front_end
+    from assembler.stream import assemble_stream
     try:
-        symtab = pass1(statements)
+        count = assemble_stream(asmfile, args.format, outputs, *make_front_end(args.parser))
     except Exception as e:
-        print("Pass1 error:", e)
-        sys.exit(1)
+        print(e)
+        return 1
+    print(f"Wrote {count} words to {' and '.join(outputs)}")
+    return 0
+
+def main_object(args, asmfile, objfile):
+    from assembler.objfile import assemble_object, write_object
+    lexer = parser = None
+    if args.parser != 'line':
+        from assembler.pipeline import make_front_end
+        lexer, parser = make_front_end(args.parser)
+    diag = Diagnostics(asmfile, collect=args.all_errors)
     try:
-        machine = pass2(statements, symtab)
+        with open(asmfile, 'r') as f:
+            obj = assemble_object(f.read(), lexer, parser, args.optimize, asmfile, diag)
     except Exception as e:
-        print("Pass2 error:", e)
-        sys.exit(1)
-    write_hex_bin(machine, hexfile, binfile)
-    print(f"Wrote {len(machine)} words to {hexfile} and {binfile}")
+        print(e)
+        if args.error_report:
+            write_report(args.error_report, diag.report(e))
+        return 1
+    if args.error_report:
+        write_report(args.error_report, diag.report())
+    write_object(obj, objfile)
+    print(f"Wrote {len(obj.text) // 4} text words, {len(obj.data)} data bytes, "
+          f"{len(obj.relocs)} relocations to {objfile}")
+    return 0
+
+def main_batch(args):
+    from assembler.build import expand_inputs, assemble_many
+    try:
+        files = expand_inputs(args.paths)
+        results = assemble_many(files, args.format, args.outdir, args.jobs, cache_args(args),
+                                front_end=args.parser, options=assemble_options(args),
+                                collect=args.all_errors)
+    except Exception as e:
+        print(e)
+        return 1
+    if args.error_report:
+        reports = [r[5] for r in results]
+        write_report(args.error_report, {
+            'ok': all(r['ok'] for r in reports),
+            'error_count': sum(r['error_count'] for r in reports),
+            'files': reports,
+        })
+    return 0 if all(r[1] is None for r in results) else 1
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,44 @@
+# ---------------------------
+# AST nodes produced by the parsers
+# Kept apart from parser.py so the passes can use them without importing sly.
+# There is one node per source line (and per expanded instruction), so they
+# have __slots__: no per-instance __dict__.
+# ---------------------------
+
+# loc: where the first token of a statement is, for diagnostics, as one
+# int (a tuple would be three objects per statement): line << LOC_SHIFT | index
+LOC_SHIFT = 32
+
+class AST:
+    __slots__ = ('loc',)
+
+class Label(AST):
+    __slots__ = ('name',)
+
+    def __init__(self, name, loc=None):
+        self.name = name
+        self.loc = loc
+    def __repr__(self):
+        return f"Label({self.name})"
+
+class Directive(AST):
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name, args=None, loc=None):
+        self.name = name
+        self.args = args or []  # operands, as for Instr (.word 1, 2)
+        self.loc = loc
+    def __repr__(self):
+        if self.args:
+            return f"Directive({self.name} {self.args})"
+        return f"Directive({self.name})"
+
+class Instr(AST):
+    __slots__ = ('mnemonic', 'operands')
+
+    def __init__(self, mnemonic, operands, loc=None):
+        self.mnemonic = mnemonic
+        self.operands = operands  # list
+        self.loc = loc
+    def __repr__(self):
+        return f"Instr({self.mnemonic} {self.operands})"
@@ -0,0 +1,164 @@
+# ---------------------------
+# Relocatable object files (-f obj) for separately assembled modules
+# An object holds the module's encoded text and its .data image, each
+# starting at offset 0, plus
+#   symbols: every label, as (section, offset); .globl ones are exported
+#   relocs:  (section, offset, kind, symbol) for each place whose value is
+#            only known once the modules are laid out: references to
+#            labels of other modules and to .data, and label values
+#            stored in .data. Branches and jumps within the module's text
+#            are already resolved.
+# The referring field is encoded as 0 and filled in by assembler.link.
+#
+# File layout: a magic line, one JSON header line, the text bytes, then
+# the data bytes.
+# ---------------------------
+
+import json
+import sys
+from array import array
+
+from assembler import __version__
+from assembler.diagnostics import AssemblyError, Diagnostics
+from assembler.instructions import INSTR_TABLE, SYMBOL_KINDS
+from assembler.nodes import Directive, Instr
+from assembler.passes import pass1, pass2
+from assembler.pipeline import parse_source
+
+MAGIC = b'RVOBJ\n'
+
+GLOBAL_DIRECTIVES = ('.globl', '.global')
+
+# .data value size -> relocation kind
+DATA_RELOCS = {4: 'abs32', 2: 'abs16', 1: 'abs8'}
+
+class ObjectModule:
+    def __init__(self, text, data, data_align, symbols, globals_, relocs, options=()):
+        self.text = text              # bytes, little-endian words
+        self.data = data              # bytes, padded to whole words
+        self.data_align = data_align
+        self.symbols = symbols        # name -> (section, offset)
+        self.globals = globals_       # exported names
+        self.relocs = relocs          # [(section, offset, kind, symbol), ...]
+        self.options = options        # assembler options it was built with
+        self.name = '<module>'
+
+    def header(self):
+        return {
+            'version': __version__,
+            'options': [list(o) for o in self.options],
+            'text': len(self.text),
+            'data': len(self.data),
+            'data_align': self.data_align,
+            'symbols': self.symbols,
+            'globals': sorted(self.globals),
+            'relocs': self.relocs,
+        }
+
+def assemble_object(txt, lexer=None, parser=None, optimize=False, source=None, diag=None):
+    # -> ObjectModule; errors are raised like pipeline.assemble's
+    if diag is None:
+        diag = Diagnostics(source, txt)
+    statements = parse_source(txt, lexer, parser, source, diag)
+    try:
+        symtab, program, data = pass1(statements, optimize, diag)
+        if program and program[-1][0] != 4 * (len(program) - 1):
+            raise Exception("object output needs one contiguous .text (no .text restarts)")
+    except AssemblyError:
+        raise
+    except Exception as e:
+        diag.error('pass1', str(e))
+        diag.check()  # collect mode: no way to go on
+    text_syms = {name: addr for name, addr in symtab.items() if name not in data.labels}
+    relocs = []
+    local = []
+    try:
+        for pc, ins in program:
+            reloc = relocation(ins, text_syms)
+            if reloc is not None:
+                kind, sym, ins = reloc
+                relocs.append(('text', pc, kind, sym))
+            local.append((pc, ins))
+        machine = pass2(local, text_syms, None, diag)
+    except AssemblyError:
+        raise
+    except Exception as e:
+        diag.error('pass2', str(e))
+        diag.check()  # collect mode: no way to go on
+    diag.check()
+    words = array('I', [w for _, w in machine])
+    if sys.byteorder != 'little':
+        words.byteswap()
+    image = bytes(data.image) + bytes(-len(data.image) % 4)
+    relocs += [('data', off, DATA_RELOCS[size], name) for off, size, name in data.fixups]
+    symbols = {name: ('text', addr) for name, addr in text_syms.items()}
+    symbols.update((name, ('data', off)) for name, off in data.labels.items())
+    exported = {op[1] for st in statements
+                if isinstance(st, Directive) and st.name in GLOBAL_DIRECTIVES
+                for op in st.args if op[0] == 'sym'}
+    options = (('optimize', True),) if optimize else ()
+    return ObjectModule(words.tobytes(), image, data.align, symbols,
+                        exported & set(symbols), relocs, options)
+
+def relocation(ins, text_syms):
+    # -> (kind, symbol, ins with the symbol operand zeroed) when ins refers
+    # to a label outside this module's text, else None
+    spec = INSTR_TABLE.get(ins.mnemonic)
+    if spec is None:
+        return None  # pass2 reports it
+    for i, op in enumerate(ins.operands):
+        if op[0] in SYMBOL_KINDS and op[1] not in text_syms:
+            break
+    else:
+        return None
+    typ, sym = op[0], op[1]
+    layout = spec.layout
+    if typ == 'sym':
+        kind = {'branch': 'branch', 'jump': 'jal', 'rri': 'pcrel_i'}.get(layout)
+    elif typ == 'pcrel_hi':
+        kind = 'pcrel_hi' if layout == 'upper' else None
+    else:
+        kind = {'rri': 'pcrel_lo_i', 'load': 'pcrel_lo_i', 'store': 'pcrel_lo_s'}.get(layout)
+    if kind is None:
+        raise Exception(f"Can't relocate {ins.mnemonic} {sym}")
+    zero = ('memoff', 0, op[2]) if len(op) == 3 else ('imm', 0)
+    operands = list(ins.operands)
+    operands[i] = zero
+    return kind, sym, Instr(ins.mnemonic, operands)
+
+def write_object(obj, path):
+    header = json.dumps(obj.header(), separators=(',', ':')).encode()
+    with open(path, 'wb') as f:
+        f.write(MAGIC + header + b'\n' + obj.text + obj.data)
+
+def read_header(f, path):
+    if f.readline() != MAGIC:
+        raise Exception(f"{path} is not an object file")
+    return json.loads(f.readline())
+
+def read_object(path):
+    with open(path, 'rb') as f:
+        h = read_header(f, path)
+        text = f.read(h['text'])
+        data = f.read(h['data'])
+    if len(text) != h['text'] or len(data) != h['data']:
+        raise Exception(f"{path} is truncated")
+    obj = ObjectModule(text, data, h['data_align'],
+                       {name: tuple(v) for name, v in h['symbols'].items()},
+                       set(h['globals']), [tuple(r) for r in h['relocs']],
+                       tuple(tuple(o) for o in h['options']))
+    obj.name = path
+    return obj
+
+def current_header(path, options=()):
+    # -> the object's header if it was built by this assembler version with
+    # these options, else None
+    try:
+        with open(path, 'rb') as f:
+            h = read_header(f, path)
+    except Exception:
+        return None
+    if h.get('version') != __version__ or \
+            sorted(map(tuple, h.get('options', []))) != sorted(options):
+        return None
+    return h
@@ -0,0 +1,73 @@
+# ---------------------------
+# Optimizing expansion (-O): replaces pass1's plain pseudo expansion
+# On top of pseudo-instruction expansion it
+#  - drops instructions that do nothing (nop, mv x5, x5, ALU ops writing x0)
+#  - builds constants with the shortest sequence (li -> addi, lui or lui+addi)
+#  - emits call/tail as a single jal; pass1's relaxation keeps auipc+jalr
+#    only where the target is out of reach. Removing instructions moves
+#    addresses, so a target can come back into reach that way.
+# Numeric pc-relative offsets written in the source (beq x1, x2, 8) are
+# not adjusted; use labels in code built with -O.
+# ---------------------------
+
+from assembler.instructions import INSTR_TABLE
+from assembler.nodes import Instr
+from assembler.pseudo import expand_pseudo
+
+X0 = ('reg', 0)
+
+def short_call(ins):
+    # call/tail label -> jal; pass1's relaxation (assembler.relax) turns it
+    # back into auipc+jalr where the label is out of jal's +-1 MiB
+    target = ins.operands[0] if len(ins.operands) == 1 else None
+    if target is None or target[0] != 'sym':
+        return None
+    link = ('reg', 1) if ins.mnemonic == 'call' else X0
+    return [Instr('jal', [link, target])]
+
+def load_constant(rd, value):
+    # shortest sequence that puts value in rd. Registers hold 32 bits, so
+    # the value is taken as signed first: 0xFFFFFFFF is -1, a single addi.
+    value = (value + (1 << 31)) % (1 << 32) - (1 << 31)
+    hi = (value + (1 << 11)) & ~0xfff
+    lo = value - hi
+    if not hi:
+        return [Instr('addi', [rd, X0, ('imm', lo)])]
+    seq = [Instr('lui', [rd, ('imm', hi)])]
+    if lo:
+        seq.append(Instr('addi', [rd, rd, ('imm', lo)]))
+    return seq
+
+# layouts whose only effect is writing rd (jalr is 'rri' but jumps)
+_PURE_LAYOUTS = ('rrr', 'rri', 'shift', 'upper')
+# op rd, rd, <identity operand>
+_IDENTITY_IMM = {'addi': 0, 'ori': 0, 'xori': 0, 'slli': 0, 'srli': 0, 'srai': 0, 'andi': -1}
+_IDENTITY_REG = ('add', 'sub', 'or', 'xor', 'sll', 'srl', 'sra')
+
+def is_noop(ins):
+    spec = INSTR_TABLE.get(ins.mnemonic)
+    if spec is None or spec.layout not in _PURE_LAYOUTS or ins.mnemonic == 'jalr':
+        return False
+    ops = ins.operands
+    if not ops or ops[0][0] != 'reg':
+        return False
+    if ops[0] == X0:
+        return True  # result thrown away
+    if len(ops) != 3 or ops[1] != ops[0]:
+        return False
+    if ins.mnemonic in _IDENTITY_IMM:
+        return ops[2] == ('imm', _IDENTITY_IMM[ins.mnemonic])
+    if ins.mnemonic in _IDENTITY_REG:
+        return ops[2] == X0
+    return ins.mnemonic in ('and', 'or') and ops[2] == ops[0]
+
+def expand_optimized(ins):
+    # used by pass1 in place of expand_pseudo
+    seq = None
+    if ins.mnemonic == 'li' and len(ins.operands) == 2 and ins.operands[1][0] == 'imm':
+        seq = load_constant(ins.operands[0], ins.operands[1][1])
+    elif ins.mnemonic in ('call', 'tail'):
+        seq = short_call(ins)
+    if seq is None:
+        seq = expand_pseudo(ins)
+    return [i for i in seq if not is_noop(i)]
@@ -4,31 +4,11 @@
 
 from sly import Parser
 from assembler.lexer import AsmLexer
-
-class AST:
-    pass
-
-class Label(AST):
-    def __init__(self, name):
-        self.name = name
-    def __repr__(self):
-        return f"Label({self.name})"
-
-class Directive(AST):
-    def __init__(self, name):
-        self.name = name
-    def __repr__(self):
-        return f"Directive({self.name})"
-
-class Instr(AST):
-    def __init__(self, mnemonic, operands):
-        self.mnemonic = mnemonic
-        self.operands = operands  # list
-    def __repr__(self):
-        return f"Instr({self.mnemonic} {self.operands})"
+from assembler.nodes import Label, Directive, Instr, LOC_SHIFT
 
 class AsmParser(Parser):
-    tokens = AsmLexer.tokens
+    # MACROARG never gets here: the preprocessor substitutes it
+    tokens = AsmLexer.tokens - {'MACROARG'}
 
     # grammar
     @_('lines')
@@ -41,23 +21,30 @@ class AsmParser(Parser):
 
     @_('lines line')
     def lines(self, p):
-        return p.lines + [p.line]
+        # append in place: rebuilding the list on every reduction is quadratic
+        lines = p.lines
+        lines.append(p.line)
+        return lines
 
     @_('LABEL')
     def line(self, p):
-        return Label(p.LABEL)
+        return Label(p.LABEL, p.lineno << LOC_SHIFT | p.index)
 
     @_('DIRECTIVE')
     def line(self, p):
-        return Directive(p.DIRECTIVE)
+        return Directive(p.DIRECTIVE, None, p.lineno << LOC_SHIFT | p.index)
+
+    @_('DIRECTIVE operands')
+    def line(self, p):
+        return Directive(p.DIRECTIVE, p.operands, p.lineno << LOC_SHIFT | p.index)
 
     @_('MNEMONIC operands')
     def line(self, p):
-        return Instr(p.MNEMONIC, p.operands)
+        return Instr(p.MNEMONIC, p.operands, p.lineno << LOC_SHIFT | p.index)
 
     @_('MNEMONIC')
     def line(self, p):
-        return Instr(p.MNEMONIC, [])
+        return Instr(p.MNEMONIC, [], p.lineno << LOC_SHIFT | p.index)
 
     # operands variants: comma-separated, parentheses, registers, numbers, idents
     @_('operand')
@@ -66,7 +53,9 @@ class AsmParser(Parser):
 
     @_('operands COMMA operand')
     def operands(self, p):
-        return p.operands + [p.operand]
+        operands = p.operands
+        operands.append(p.operand)
+        return operands
 
     @_('REGISTER')
     def operand(self, p):
@@ -80,6 +69,10 @@ class AsmParser(Parser):
     def operand(self, p):
         return ('sym', p.MNEMONIC)
 
+    @_('STRING')
+    def operand(self, p):
+        return ('str', p.STRING)
+
     @_('LPAREN REGISTER RPAREN')
     def operand(self, p):
         # used for offsets like 0(x1)
@@ -94,8 +87,20 @@ class AsmParser(Parser):
         # blank line -> ignore
         return None
 
+    # errors go to diag (a Diagnostics) when set, else are printed
+    diag = None
+    _error_at = None
+
     def error(self, p):
-        if p:
+        if self.diag is not None:
+            # recovery calls back for the rest of the line: report it once
+            if p and p.type != 'error' and (self.diag, p.lineno) != self._error_at:
+                self._error_at = (self.diag, p.lineno)
+                near = 'end of line' if p.type == 'NEWLINE' else f"{p.type}({p.value})"
+                self.diag.error('parse', f"Parse error near {near}", p.lineno << LOC_SHIFT | p.index)
+            elif not p:
+                self.diag.error('parse', "Parse error at EOF")
+        elif p:
             print(f"Parse error near {p.type}({p.value})")
         else:
             print("Parse error at EOF")
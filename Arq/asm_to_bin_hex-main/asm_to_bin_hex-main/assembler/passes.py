@@ -1,66 +1,181 @@
 # ---------------------------
 # Assembler main logic: two passes
 # ---------------------------
+# pass1 lays out the program: it expands pseudo-instructions once, assigns
+# addresses and builds the symbol table. Its output is a flat list of
+# (address, concrete instruction) records, so pass2 only has to resolve
+# symbols and encode. Branches and jumps whose label is out of their reach
+# are rewritten into longer forms at the end of pass1 (assembler.relax).
+# .data directives build a separate byte image (assembler.data) that is
+# placed after the text and emitted by pass2 after the instructions.
 
-from assembler.parser import Directive, Label, Instr
+import os
+from operator import itemgetter
+
+from assembler.data import DataImage, DATA_DIRECTIVES
+from assembler.nodes import Directive, Label, Instr
 from assembler.pseudo import expand_pseudo
 from assembler.instructions import AsmContext, INSTR_TABLE
+from assembler.relax import relax
 
-def pass1(statements):
-    symtab = {}
+def layout(statements, symtab, labels=None, expand=expand_pseudo, data=None, diag=None):
+    # generator of (address, Instr) with pseudo-instructions expanded;
+    # labels are added to symtab as they are reached (and to labels, if
+    # given, as the index of the instruction they point at). What is in
+    # .data goes to data (a DataImage; its labels stay relative to it).
+    # A statement that fails is reported to diag (a Diagnostics) and
+    # skipped, or raised as is without one.
+    if data is None:
+        data = DataImage()
     pc = 0
-    in_text = False
+    n = 0
+    in_data = False
     for st in statements:
         if st is None:
             continue
-        if isinstance(st, Directive):
-            if st.name == '.text':
-                in_text = True
-                pc = 0  # start text at 0x0
-            elif st.name == '.data':
-                in_text = False
-                # Not implemented: data handling
-            continue
-        if isinstance(st, Label):
-            if st.name in symtab:
-                raise Exception(f"Label redefined: {st.name}")
-            symtab[st.name] = pc
-            continue
-        if isinstance(st, Instr):
-            # expand pseudoinstr to count instructions
-            ex = expand_pseudo(st)
-            # every resulting instruction increments pc by 4
-            pc += 4 * len(ex)
-    return symtab
+        try:
+            if isinstance(st, Directive):
+                name = st.name
+                if name == '.text':
+                    if not in_data:
+                        pc = 0  # start text at 0x0
+                    in_data = False  # coming back from .data the text continues
+                elif name == '.data':
+                    in_data = True
+                elif name in DATA_DIRECTIVES:
+                    if in_data:
+                        data.directive(name, st.args)
+                    elif name != '.align' or st.args not in TEXT_ALIGNS:
+                        raise Exception(f"{name} is only supported in .data")
+                continue
+            if isinstance(st, Label):
+                if st.name in symtab or st.name in data.labels:
+                    raise Exception(f"Label redefined: {st.name}")
+                if in_data:
+                    data.label(st.name)
+                    continue
+                symtab[st.name] = pc
+                if labels is not None:
+                    labels[st.name] = n
+                continue
+            if isinstance(st, Instr):
+                if in_data:
+                    raise Exception(f"Instruction in .data: {st.mnemonic}")
+                # every resulting instruction takes 4 bytes
+                for einstr in expand(st):
+                    if einstr is not st:
+                        einstr.loc = st.loc
+                    yield pc, einstr
+                    pc += 4
+                    n += 1
+        except Exception as e:
+            if diag is None:
+                raise
+            diag.error('pass1', str(e), st.loc)
 
-def pass2(statements, symtab):
-    pc = 0
-    in_text = False
-    machine = []  # list of (address, word)
-    for st in statements:
-        if st is None:
-            continue
-        if isinstance(st, Directive):
-            if st.name == '.text':
-                in_text = True
-                pc = 0
-            elif st.name == '.data':
-                in_text = False
-            continue
-        if isinstance(st, Label):
-            continue
-        if isinstance(st, Instr):
-            expanded = expand_pseudo(st)
-            for einstr in expanded:
-                ctx = AsmContext(symtab, pc)
-                mnem = einstr.mnemonic
-                if mnem in INSTR_TABLE:
-                    try:
-                        word = INSTR_TABLE[mnem](einstr.operands, ctx)
-                    except Exception as e:
-                        raise Exception(f"Error assembling {mnem} at 0x{pc:08x}: {e}")
-                else:
-                    raise Exception(f"Unsupported mnemonic: {mnem}")
-                machine.append((pc, word))
-                pc += 4
-    return machine
\ No newline at end of file
+def _expanded(out, st):
+    # 1 for a statement expand() did not pass through as it is
+    return 0 if len(out) == 1 and out[0] is st else 1
+
+# .align that instructions already satisfy (2**n <= 4)
+TEXT_ALIGNS = ([('imm', 0)], [('imm', 1)], [('imm', 2)])
+
+def pass1(statements, optimize=False, diag=None, profile=None):
+    # -> (symtab, program, data); diag as for layout(); profile: an
+    # assembler.profiling.Profile to time expansion and relaxation in
+    expand = expand_pseudo
+    if optimize:
+        from assembler.optimize import expand_optimized as expand
+    if profile is not None:
+        expand = profile.timed('pseudo', expand, _expanded)
+    symtab = {}
+    labels = {}
+    data = DataImage()
+    program = list(layout(statements, symtab, labels, expand, data, diag))  # list of (address, Instr)
+    if profile is None:
+        symtab, program = relax(program, symtab, labels)
+    else:
+        with profile.phase('relax') as ph:
+            laid_out = len(program)
+            symtab, program = relax(program, symtab, labels)
+            ph.count += len(program) - laid_out
+    if data:
+        data.place(max(map(itemgetter(0), program)) + 4 if program else 0, symtab)
+    return symtab, program, data
+
+# at or above this many instructions pass2 encodes with NumPy when available;
+# below it the ~0.1s NumPy import costs more than the batch path saves
+BATCH_THRESHOLD = 250000
+
+# at or above this many instructions pass2 is split across jobs processes
+# (assembler.shard) when more than one is asked for, up to one per CPU;
+# below it starting the pool costs more than it saves
+SHARD_THRESHOLD = 200000
+
+def pass2(program, symtab, data=None, diag=None, jobs=None, profile=None):
+    # -> list of (address, word): the instructions, then the data image.
+    # With diag (a Diagnostics) a bad instruction is reported and encoded
+    # as 0; without one the first is raised. profile: an
+    # assembler.profiling.Profile to time the encoding per mnemonic in
+    # (not done for the sharded path: the work is in other processes).
+    machine = None
+    if jobs is not None:
+        jobs = min(jobs, os.cpu_count() or 1)
+    if jobs is not None and jobs > 1 and len(program) >= SHARD_THRESHOLD:
+        from assembler.shard import encode_sharded
+        words = encode_sharded(program, symtab, jobs)
+        if words is not None:
+            machine = list(zip(map(itemgetter(0), program), words))
+    if machine is None and len(program) >= BATCH_THRESHOLD:
+        machine = pass2_batch(program, symtab, profile)
+    if machine is None:
+        table = INSTR_TABLE if profile is None else profile.instr_table(INSTR_TABLE)
+        machine = list(encode_stream(program, symtab, diag, table))
+    if data:
+        try:
+            machine += data.machine(symtab)
+        except Exception as e:
+            if diag is None:
+                raise
+            diag.error('pass2', str(e))
+    return machine
+
+def encode_stream(program, symtab, diag=None, table=INSTR_TABLE):
+    # generator of (address, word) for any iterable of (address, Instr)
+    ctx = AsmContext(symtab, 0)
+    for pc, einstr in program:
+        ctx.pc = pc
+        spec = table.get(einstr.mnemonic)
+        try:
+            if spec is None:
+                raise Exception(f"Unsupported mnemonic: {einstr.mnemonic}")
+            word = spec.encode(einstr.operands, ctx)
+        except Exception as e:
+            if spec is None:
+                message = str(e)
+            elif isinstance(e, ValueError):
+                # operand tuple unpacking in the layout encoder
+                message = (f"Error assembling {einstr.mnemonic} at 0x{pc:08x}: "
+                           f"expected {len(spec.slots)} operands but got {len(einstr.operands)}")
+            else:
+                message = f"Error assembling {einstr.mnemonic} at 0x{pc:08x}: {e}"
+            if diag is None:
+                raise Exception(message)
+            diag.error('pass2', message, einstr.loc)
+            word = 0
+        yield pc, word
+
+def pass2_batch(program, symtab, profile=None):
+    # vectorized pass2; None when NumPy is missing or some instruction needs
+    # the scalar path (which also produces the error message)
+    try:
+        from assembler.encode_batch import encode_program, Unbatchable
+    except ImportError:
+        return None
+    try:
+        words = encode_program(program, symtab, profile)
+    except Unbatchable:
+        if profile is not None:
+            profile.mnemonics.clear()  # the scalar path times them again
+        return None
+    return list(zip(map(itemgetter(0), program), words.tolist()))
@@ -0,0 +1,109 @@
+# ---------------------------
+# Pipeline: source text -> machine words
+# Shared by the single-file CLI and batch mode. Errors are raised as
+# AssemblyError (assembler.diagnostics), with the failing phase and the
+# file:line:column in the message; pass a Diagnostics(collect=True) to get
+# all of them at once. Pass a Profile (assembler.profiling) to get the time,
+# item count and memory of each phase.
+# ---------------------------
+
+from contextlib import nullcontext
+
+from assembler.diagnostics import AssemblyError, Diagnostics
+from assembler.passes import pass1, pass2
+from assembler.preprocess import Preprocessor, needs_preprocessing
+
+# front end names for --parser; 'line' is the default
+FRONT_ENDS = ('line', 'sly')
+
+def make_front_end(name='line'):
+    # -> (lexer, parser). The sly grammar builds its LALR tables when
+    # assembler.parser is imported, so it is only imported when asked for.
+    if name == 'sly':
+        from assembler.lexer import AsmLexer
+        from assembler.parser import AsmParser
+        return AsmLexer(), AsmParser()
+    if name == 'line':
+        from assembler.lineparser import LineLexer, LineParser
+        return LineLexer(), LineParser()
+    raise Exception(f"Unknown parser: {name}")
+
+def _phase(profile, name):
+    return nullcontext() if profile is None else profile.phase(name)
+
+def parse_source(txt, lexer=None, parser=None, source=None, diag=None, profile=None):
+    # -> list of statements; source is the file txt was read from (where
+    # .include looks first, and the name in error messages); diag is the
+    # Diagnostics errors go to (a fail-fast one when None)
+    if lexer is None or parser is None:
+        lexer, parser = make_front_end()
+    if diag is None:
+        diag = Diagnostics(source, txt)
+    lexer.diag = parser.diag = diag
+    try:
+        if needs_preprocessing(txt):
+            try:
+                with _phase(profile, 'preprocess') as ph:
+                    tokens = Preprocessor(lexer, diag).tokenize(txt, source)
+                    if ph is not None:
+                        ph.count += len(tokens)
+            except AssemblyError:
+                raise
+            except Exception as e:
+                diag.error('preprocess', str(e))
+                diag.check()  # collect mode: no way to go on
+        elif profile is None:
+            tokens = lexer.tokenize(txt)  # consumed as it is parsed
+        else:
+            # lexed up front, to time it apart from parsing
+            with profile.phase('lex') as ph:
+                tokens = list(lexer.tokenize(txt))
+                ph.count += len(tokens)
+        # parse
+        try:
+            with _phase(profile, 'parse') as ph:
+                statements = parser.parse(iter(tokens))
+                if ph is not None:
+                    ph.count += sum(s is not None for s in statements or [])
+        except AssemblyError:
+            raise
+        except Exception as e:
+            diag.error('parse', str(e))
+            diag.check()  # collect mode: no way to go on
+    finally:
+        lexer.diag = parser.diag = None
+    # filter out None lines (an empty source parses to None)
+    return [s for s in statements or [] if s is not None]
+
+def assemble(txt, lexer=None, parser=None, optimize=False, source=None, diag=None, jobs=None,
+             profile=None):
+    # lexer/parser may be passed in to reuse instances across files;
+    # optimize uses the -O expansion (assembler.optimize) in pass1. With a
+    # collecting diag every error in the source is raised at the end.
+    # jobs > 1 encodes a big program's pass2 in that many processes.
+    # profile: a Profile the phases are recorded in.
+    if diag is None:
+        diag = Diagnostics(source, txt)
+    statements = parse_source(txt, lexer, parser, source, diag, profile)
+    try:
+        with _phase(profile, 'pass1') as ph:
+            symtab, program, data = pass1(statements, optimize, diag, profile)
+            if ph is not None:
+                ph.count += len(program)
+    except AssemblyError:
+        raise
+    except Exception as e:
+        diag.error('pass1', str(e))
+        diag.check()  # collect mode: no way to go on
+    try:
+        with _phase(profile, 'pass2') as ph:
+            machine = pass2(program, symtab, data, diag, jobs, profile)
+            if ph is not None:
+                ph.count += len(machine)
+    except AssemblyError:
+        raise
+    except Exception as e:
+        diag.error('pass2', str(e))
+        diag.check()  # collect mode: no way to go on
+    diag.check()
+    return machine
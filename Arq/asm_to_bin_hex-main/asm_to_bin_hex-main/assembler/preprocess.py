@@ -0,0 +1,398 @@
+# ---------------------------
+# Preprocessor: .include, .macro/.endm, .rept/.endr, .equ/.set
+# Runs on the token stream between the lexer and the parser, so no text is
+# lexed twice: an included file is tokenized once and its tokens are kept
+# (keyed by path, checked against its mtime and size), a macro body is
+# kept as the tokens it was defined with, and an expansion substitutes the
+# argument tokens for its \params. Expansions are memoized by macro and
+# argument tokens.
+#   .include "file"             relative to the including file, then the cwd
+#   .macro name [p1[, p2 ...]]  ... .endm; invoked as  name a1, a2
+#                               (\p1 in the body stands for the argument)
+#   .rept n                     ... .endr; the body n times
+#   .equ name, value            (or .set) name in an operand is the number
+# Errors name the file and line, and for lines coming from a macro, where
+# it was expanded. So that later phases can do the same, the first token
+# of every line taken from an included file or a macro gets a virtual line
+# number indexing self.lines (see assembler.diagnostics). Sources without
+# any of these directives skip this stage entirely (needs_preprocessing).
+# ---------------------------
+
+import os
+import re
+from collections import OrderedDict
+from copy import copy
+
+from assembler.diagnostics import VIRTUAL_LINE, short_chain
+
+# a line opening with one of the directives (after an optional label)
+PREPROCESS_LINE = re.compile(r'^[ \t]*(?:[A-Za-z_]\w*:[ \t]*)?\.(?:include|macro|endm|rept|endr|equ|set)\b',
+                             re.MULTILINE | re.IGNORECASE)
+
+MAX_DEPTH = 64           # nested includes and macro expansions
+TOKEN_CACHE_FILES = 256  # included files whose tokens are kept
+
+# (lexer class, absolute path) -> (mtime_ns, size, tokens)
+_file_tokens = OrderedDict()
+
+def needs_preprocessing(txt):
+    return PREPROCESS_LINE.search(txt) is not None
+
+class _Error(Exception):
+    # a preprocessor error and where it is
+    def __init__(self, message, file, line, index, chain):
+        super().__init__(f"{file}:{line if line is not None else '?'}: {message}{chain}")
+        self.message = message
+        self.file = file
+        self.line = line
+        self.index = index
+        self.chain = chain
+
+def _at_line(tok, lineno):
+    # a copy of tok at another line (sly tokens also have .end); copy()
+    # is several times slower and this runs once per stamped line
+    new = object.__new__(type(tok))
+    new.type = tok.type
+    new.value = tok.value
+    new.lineno = lineno
+    new.index = tok.index
+    if hasattr(tok, 'end'):
+        new.end = tok.end
+    return new
+
+def _number(tok, value):
+    # a NUMBER token in tok's place (a copy: sly and LineLexer tokens differ)
+    tok = copy(tok)
+    tok.type = 'NUMBER'
+    tok.value = value
+    return tok
+
+class Macro:
+    __slots__ = ('params', 'pieces', 'frame')
+
+    def __init__(self, params, body, frame):
+        self.params = params  # parameter names, lowercase
+        self.frame = frame    # where it was defined (for error messages)
+        # the body (tokens between .macro and .endm) cut at its \params:
+        # [tokens, param index, tokens, param index, ..., tokens]. A \name
+        # that is not a parameter stays (it may belong to a macro defined
+        # inside this one).
+        index = {p: k for k, p in enumerate(params)}
+        self.pieces = pieces = [[]]
+        for t in body:
+            if t.type == 'MACROARG' and t.value in index:
+                pieces += [index[t.value], []]
+            else:
+                pieces[-1].append(t)
+
+    def body(self, args):
+        pieces = self.pieces
+        body = list(pieces[0])
+        for k in range(1, len(pieces), 2):
+            body += args[pieces[k]]
+            body += pieces[k + 1]
+        return body
+
+class Frame:
+    # where the tokens being processed come from
+    __slots__ = ('file', 'chain', 'depth')
+
+    def __init__(self, file, chain='', depth=0):
+        self.file = file
+        self.chain = chain  # "in macro m expanded at" / "included from" lines
+        self.depth = depth
+
+class Preprocessor:
+    def __init__(self, lexer, diag=None):
+        self.lexer = lexer
+        self.diag = diag  # a Diagnostics: errors are reported to it (and a
+                          # bad line skipped in collect mode) instead of raised
+
+    def tokenize(self, txt, source=None):
+        # -> list of tokens with every directive above carried out
+        self.lines = self.diag.lines if self.diag is not None else []
+        self.macros = {}
+        self.equs = {}
+        self._generation = 0  # bumped by every definition; part of the memo key
+        self._memo = {}
+        self._numbers = {}    # name token -> the NUMBER token last put in its place
+        self._including = []
+        self._out = []
+        if source:
+            self._including.append(os.path.abspath(source))
+        source = source or '<input>'
+        self._run(list(self.lexer.tokenize(txt)), Frame(source))
+        return self._out
+
+    def _error(self, tok, frame, msg):
+        if tok is None:
+            return _Error(msg, frame.file, None, None, short_chain(frame.chain))
+        return _Error(msg, frame.file, tok.lineno, tok.index, short_chain(frame.chain))
+
+    def _stamp(self, tok, frame):
+        # tok with a virtual line number standing for (file, line, chain)
+        lines = self.lines
+        lines.append((frame.file, tok.lineno, frame.chain))
+        return _at_line(tok, VIRTUAL_LINE + len(lines) - 1)
+
+    def _run(self, toks, frame):
+        i = 0
+        n = len(toks)
+        out = self._out
+        stamp = frame.depth > 0
+        while i < n:
+            j = i
+            while j < n and toks[j].type != 'NEWLINE':
+                j += 1
+            while i < j and toks[i].type == 'LABEL':
+                out.append(self._stamp(toks[i], frame) if stamp else toks[i])
+                i += 1
+            if i < j:
+                first = toks[i]
+                try:
+                    if first.type == 'DIRECTIVE' and first.value in DIRECTIVES:
+                        j = DIRECTIVES[first.value](self, toks, i, j, frame)
+                    elif first.type == 'MNEMONIC' and first.value in self.macros:
+                        self._expand(first, toks[i + 1:j], frame)
+                    else:
+                        self._emit(toks, i, j, frame, stamp)
+                except _Error as e:
+                    if self.diag is None:
+                        raise
+                    self.diag.error_at('preprocess', e.message, e.file, e.line, e.index, e.chain)
+                    # collect mode: skip the line, or the whole block it opens
+                    j = self._skip(toks, i, j, frame)
+                out = self._out
+            if j < n:
+                out.append(toks[j])  # the NEWLINE
+            i = j + 1
+
+    def _skip(self, toks, i, j, frame):
+        if toks[i].value in ('.macro', '.rept'):
+            closer = '.endm' if toks[i].value == '.macro' else '.endr'
+            try:
+                return self._block(toks, i, j, frame, toks[i].value, closer)[1]
+            except _Error:
+                pass
+        return j
+
+    def _emit(self, toks, i, j, frame, stamp=False):
+        # an ordinary line: .equ names in its operands become numbers
+        out = self._out
+        start = len(out)
+        out.append(self._stamp(toks[i], frame) if stamp else toks[i])
+        equs = self.equs
+        for k in range(i + 1, j):
+            t = toks[k]
+            if t.type == 'MNEMONIC' and t.value in equs:
+                value = equs[t.value]
+                num = self._numbers.get(t)
+                if num is None or num.value != value:
+                    num = self._numbers[t] = _number(t, value)
+                out.append(num)
+            elif t.type == 'MACROARG':
+                del out[start:]
+                raise self._error(t, frame, f"Unknown macro parameter \\{t.value}")
+            else:
+                out.append(t)
+
+    def _operands(self, toks, i, j):
+        # tokens i..j split at commas
+        groups = [[]]
+        for k in range(i, j):
+            if toks[k].type == 'COMMA':
+                groups.append([])
+            else:
+                groups[-1].append(toks[k])
+        return groups if groups != [[]] else []
+
+    def _number(self, toks, frame, what):
+        if len(toks) == 1 and toks[0].type == 'NUMBER':
+            return toks[0].value
+        if len(toks) == 1 and toks[0].type == 'MNEMONIC' and toks[0].value in self.equs:
+            return self.equs[toks[0].value]
+        raise self._error(toks[0] if toks else None, frame,
+                          f"Expected a number or .equ name for {what}")
+
+    def _block(self, toks, i, j, frame, opener, closer):
+        # -> (end of the body, end of the closing line); nested openers count
+        depth = 1
+        n = len(toks)
+        k = j + 1
+        while k < n:
+            start = k
+            while k < n and toks[k].type == 'LABEL':
+                k += 1
+            if k < n and toks[k].type == 'DIRECTIVE':
+                if toks[k].value == opener:
+                    depth += 1
+                elif toks[k].value == closer:
+                    depth -= 1
+                    if depth == 0:
+                        end = k
+                        while end < n and toks[end].type != 'NEWLINE':
+                            end += 1
+                        return start, end
+            while k < n and toks[k].type != 'NEWLINE':
+                k += 1
+            k += 1
+        raise self._error(toks[i], frame, f"{opener} without {closer}")
+
+    # ---------------------------
+    # Directives: each gets the tokens and the line i..j it opens and
+    # returns where the line (or its block) ends
+    # ---------------------------
+
+    def _include(self, toks, i, j, frame):
+        args = toks[i + 1:j]
+        if len(args) != 1 or args[0].type != 'STRING':
+            raise self._error(toks[i], frame, ".include expects a \"file\" name")
+        path = self._resolve(args[0].value, frame)
+        if path is None:
+            raise self._error(toks[i], frame, f"Can't find include file {args[0].value!r}")
+        if path in self._including:
+            raise self._error(toks[i], frame, f"{args[0].value} includes itself")
+        if frame.depth >= MAX_DEPTH:
+            raise self._error(toks[i], frame, "Includes nested too deep")
+        self._including.append(path)
+        self._run(self._file_tokens(path),
+                  Frame(path, f"\n  included from {frame.file}:{toks[i].lineno}{frame.chain}",
+                        frame.depth + 1))
+        self._including.pop()
+        return j
+
+    def _resolve(self, name, frame):
+        here = os.path.dirname(frame.file)  # '' for <input>: the cwd
+        for path in (os.path.join(here, name), name):
+            if os.path.isfile(path):
+                return os.path.abspath(path)
+        return None
+
+    def _file_tokens(self, path):
+        st = os.stat(path)
+        key = (type(self.lexer), path)
+        hit = _file_tokens.get(key)
+        if hit is not None and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+            _file_tokens.move_to_end(key)
+            return hit[2]
+        diag = self.diag
+        if diag is None:
+            with open(path, 'r') as f:
+                tokens = list(self.lexer.tokenize(f.read()))
+        else:
+            # lex errors are in this file; a file that had some isn't kept
+            errors, outer, diag.file = len(diag.items), diag.file, path
+            try:
+                with open(path, 'r') as f:
+                    tokens = list(self.lexer.tokenize(f.read()))
+            finally:
+                diag.file = outer
+            if len(diag.items) != errors:
+                return tokens
+        _file_tokens[key] = (st.st_mtime_ns, st.st_size, tokens)
+        if len(_file_tokens) > TOKEN_CACHE_FILES:
+            _file_tokens.popitem(last=False)
+        return tokens
+
+    def _macro(self, toks, i, j, frame):
+        names = self._operands(toks, i + 1, j)
+        # no comma is needed after the name (nor between parameters)
+        if names:
+            names[:1] = [[t] for t in names[0]]
+        if not names or any(len(g) != 1 or g[0].type != 'MNEMONIC' for g in names):
+            raise self._error(toks[i], frame, ".macro expects a name and parameter names")
+        name = names[0][0].value
+        params = [g[0].value for g in names[1:]]
+        if len(set(params)) != len(params):
+            raise self._error(toks[i], frame, f"Repeated parameter in macro {name}")
+        body_end, end = self._block(toks, i, j, frame, '.macro', '.endm')
+        self.macros[name] = Macro(params, toks[j + 1:body_end], frame)
+        self._generation += 1
+        return end
+
+    def _expand(self, call, arg_toks, frame):
+        macro = self.macros[call.value]
+        args = self._operands(arg_toks, 0, len(arg_toks))
+        if len(args) != len(macro.params):
+            raise self._error(call, frame, f"Macro {call.value} takes {len(macro.params)} "
+                                           f"argument(s) but got {len(args)}")
+        key = (call.value, tuple(tuple((t.type, t.value) for t in a) for a in args),
+               self._generation)
+        chain = f"\n  in macro {call.value} expanded at {frame.file}:{call.lineno}{frame.chain}"
+        memo = self._memo.get(key)
+        if memo is None:
+            if frame.depth >= MAX_DEPTH:
+                raise self._error(call, frame, f"Macro {call.value} nested too deep (recursive?)")
+            inner = Frame(macro.frame.file, chain, frame.depth + 1)
+            body = macro.body(args)
+            generation = self._generation
+            errors = len(self.diag.items) if self.diag is not None else 0
+            outer, self._out = self._out, []
+            try:
+                self._run(body, inner)
+                tokens = self._out
+            finally:
+                self._out = outer
+            # an expansion that defines something (or had errors, which
+            # are reported once) isn't replayed
+            if self._generation == generation and \
+                    (self.diag is None or len(self.diag.items) == errors):
+                self._memo[key] = (tokens, chain)
+            self._out += tokens
+            return
+        tokens, expanded_at = memo
+        if expanded_at != chain:
+            tokens = self._restamp(tokens, expanded_at, chain)
+        self._out += tokens
+
+    def _restamp(self, tokens, old, new):
+        # a memoized expansion replayed from another place: its virtual
+        # lines get chains ending at the new call instead of the old one
+        lines = self.lines
+        chains = {}
+        tokens = list(tokens)
+        for k, t in enumerate(tokens):
+            if t.lineno >= VIRTUAL_LINE:
+                file, line, chain = lines[t.lineno - VIRTUAL_LINE]
+                moved = chains.get(chain)
+                if moved is None:
+                    moved = chains[chain] = chain[:len(chain) - len(old)] + new
+                lines.append((file, line, moved))
+                tokens[k] = _at_line(t, VIRTUAL_LINE + len(lines) - 1)
+        return tokens
+
+    def _rept(self, toks, i, j, frame):
+        count = self._number(toks[i + 1:j], frame, '.rept')
+        if count < 0:
+            raise self._error(toks[i], frame, f".rept count must not be negative: {count}")
+        body_end, end = self._block(toks, i, j, frame, '.rept', '.endr')
+        outer, self._out = self._out, []
+        try:
+            self._run(toks[j + 1:body_end], frame)
+            body = self._out
+        finally:
+            self._out = outer
+        self._out += body * count
+        return end
+
+    def _equ(self, toks, i, j, frame):
+        args = self._operands(toks, i + 1, j)
+        if len(args) != 2 or len(args[0]) != 1 or args[0][0].type != 'MNEMONIC':
+            raise self._error(toks[i], frame, f"{toks[i].value} expects a name and a value")
+        self.equs[args[0][0].value] = self._number(args[1], frame, toks[i].value)
+        self._generation += 1
+        return j
+
+    def _stray(self, toks, i, j, frame):
+        raise self._error(toks[i], frame, f"{toks[i].value} without "
+                                          f"{'.macro' if toks[i].value == '.endm' else '.rept'}")
+
+DIRECTIVES = {
+    '.include': Preprocessor._include,
+    '.macro': Preprocessor._macro,
+    '.endm': Preprocessor._stray,
+    '.rept': Preprocessor._rept,
+    '.endr': Preprocessor._stray,
+    '.equ': Preprocessor._equ,
+    '.set': Preprocessor._equ,
+}
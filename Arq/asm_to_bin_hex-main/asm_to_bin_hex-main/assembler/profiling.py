@@ -0,0 +1,189 @@
+# ---------------------------
+# Phase profiling (--stats, --profile)
+# A Profile passed to pipeline.assemble (or assemble_cached) records, for
+# each phase, the wall time, the items it produced and the memory it took:
+#   cache   looking the source up in the assembly cache (a hit ends there)
+#   lex     tokens (with .include/.macro sources: preprocess, which lexes)
+#   parse   statements
+#   pass1   instructions laid out, of which
+#     pseudo  pseudo-instruction expansion (count: pseudo statements)
+#     relax   branch/jump relaxation (count: words added)
+#   pass2   words encoded, with the time and count per mnemonic
+#   write   writing the output files (main only)
+# Memory is the process's peak RSS when the phase ended (or, for pseudo,
+# its last call did): cumulative, the most the process has held since it
+# started, so a phase only shows its own use where it raised the peak; with
+# memory=True (--profile) also the peak of Python allocations within the
+# phase, traced with tracemalloc, which makes everything several times
+# slower. Without a Profile none of this runs: the passes only check for
+# None once per phase (and per mnemonic group in the batch encoder).
+#
+# Build systems: p = Profile(); assemble(txt, profile=p); p.as_dict()
+# ---------------------------
+
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+def _max_rss():
+    # peak RSS of this process in bytes, or None where unknown
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+class Phase:
+    __slots__ = ('name', 'seconds', 'count', 'max_rss', 'peak_alloc')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.count = 0
+        self.max_rss = None
+        self.peak_alloc = None
+
+    def as_dict(self):
+        return {'seconds': self.seconds, 'count': self.count,
+                'max_rss': self.max_rss, 'peak_alloc': self.peak_alloc}
+
+class _TimedSpec:
+    # an INSTR_TABLE entry whose encode() adds to a per-mnemonic total
+    __slots__ = ('spec', 'slots', 'totals')
+
+    def __init__(self, spec, totals):
+        self.spec = spec
+        self.slots = spec.slots
+        self.totals = totals  # [count, seconds]
+
+    def encode(self, operands, ctx):
+        t0 = time.perf_counter()
+        try:
+            return self.spec.encode(operands, ctx)
+        finally:
+            totals = self.totals
+            totals[0] += 1
+            totals[1] += time.perf_counter() - t0
+
+class Profile:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.phases = {}     # name -> Phase, in the order they ran
+        self.mnemonics = {}  # mnemonic -> [count, seconds] in pass2
+        self._names = []     # open phases
+        self._stack = []     # tracemalloc: [allocated at start, peak so far] per open phase
+        self._started = False
+
+    def _phase(self, name):
+        ph = self.phases.get(name)
+        if ph is None:
+            ph = self.phases[name] = Phase(name)
+        return ph
+
+    @contextmanager
+    def phase(self, name):
+        # times the with block as phase name; nested phases get dotted names
+        # (pass1.relax). Yields the Phase, to set .count.
+        if self._names:
+            name = self._names[-1] + '.' + name
+        ph = self._phase(name)
+        self._names.append(name)
+        if self.memory:
+            self._open_alloc()
+        t0 = time.perf_counter()
+        try:
+            yield ph
+        finally:
+            ph.seconds += time.perf_counter() - t0
+            if self.memory:
+                peak = self._close_alloc()
+                ph.peak_alloc = max(ph.peak_alloc or 0, peak)
+            ph.max_rss = _max_rss()
+            self._names.pop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def _open_alloc(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            outer = self._stack[-1]
+            outer[1] = max(outer[1], peak)
+        self._stack.append([current, current])
+        tracemalloc.reset_peak()
+
+    def _close_alloc(self):
+        start, peak = self._stack.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        if self._stack:
+            outer = self._stack[-1]
+            outer[1] = max(outer[1], peak)
+        tracemalloc.reset_peak()
+        return peak - start
+
+    def timed(self, name, fn, counted):
+        # fn wrapped so its calls add to phase name (nested in the open
+        # one); counted(result, *args) is added to the count
+        ph = self._phase(self._names[-1] + '.' + name if self._names else name)
+        def wrapper(*args):
+            t0 = time.perf_counter()
+            result = fn(*args)
+            ph.seconds += time.perf_counter() - t0
+            ph.count += counted(result, *args)
+            ph.max_rss = _max_rss()
+            return result
+        return wrapper
+
+    def instr_table(self, table):
+        # table with every encoder timed per mnemonic (the scalar pass2)
+        return {m: _TimedSpec(spec, self.mnemonics.setdefault(m, [0, 0.0]))
+                for m, spec in table.items()}
+
+    def add_mnemonic(self, mnemonic, count, seconds):
+        totals = self.mnemonics.setdefault(mnemonic, [0, 0.0])
+        totals[0] += count
+        totals[1] += seconds
+
+    def as_dict(self):
+        # -> JSON-ready dict
+        return {
+            'phases': {name: ph.as_dict() for name, ph in self.phases.items()},
+            'mnemonics': {m: {'count': c, 'seconds': s}
+                          for m, (c, s) in sorted(self.mnemonics.items()) if c},
+        }
+
+    def format(self, top=10):
+        # -> the table --stats prints
+        lines = [f"{'phase':14} {'seconds':>9} {'count':>11} {'peak RSS so far':>15}"
+                 + (f" {'peak alloc':>11}" if self.memory else "")]
+        for name, ph in self.phases.items():
+            indent = '  ' * name.count('.')
+            label = indent + name.rsplit('.', 1)[-1]
+            rss = f"{ph.max_rss / 2**20:13.1f}MB" if ph.max_rss is not None else f"{'-':>15}"
+            line = f"{label:14} {ph.seconds:9.4f} {ph.count:11,} {rss}"
+            if self.memory:
+                alloc = ph.peak_alloc
+                line += f" {alloc / 2**20:9.1f}MB" if alloc is not None else f" {'-':>11}"
+            lines.append(line)
+        used = sorted(((s, c, m) for m, (c, s) in self.mnemonics.items() if c), reverse=True)
+        if used:
+            lines.append(f"pass2 by mnemonic (top {min(top, len(used))} of {len(used)}):")
+            for s, c, m in used[:top]:
+                lines.append(f"  {m:12} {s:9.4f} {c:11,}  {1e9 * s / c:8.0f} ns/instr")
+        return '\n'.join(lines)
@@ -2,7 +2,7 @@
 # pseudoinstructions expansion
 # ---------------------------
 
-from assembler.parser import Instr
+from assembler.nodes import Instr
 
 def expand_pseudo(instr):
     m = instr.mnemonic
@@ -35,10 +35,9 @@ def expand_pseudo(instr):
     elif m == 'ret':
         # ret -> jalr x0, x1, 0
         expanded.append(Instr('jalr', [('reg',0), ('reg',1), ('imm',0)]))
-    elif m == 'jalr':  
+    elif m == 'jalr' and len(ops)==1:
         # pseudoinstrucción jalr rs -> jalr x1, rs, 0
-        if len(ops)==1:
-            expanded.append(Instr('jalr', [('reg',1), ops[0], ('imm',0)]))
+        expanded.append(Instr('jalr', [('reg',1), ops[0], ('imm',0)]))
     elif m == 'beqz':
         # beqz rs, label -> beq rs, x0, label
         expanded.append(Instr('beq', [ops[0], ('reg',0), ops[1]]))
@@ -50,15 +49,26 @@ def expand_pseudo(instr):
         expanded.append(Instr('blt', [ops[0], ('reg',0), ops[1]]))
     elif m == 'bgtz':
         expanded.append(Instr('blt', [('reg',0), ops[0], ops[1]]))
+    elif m == 'la' and ops[1][0] == 'sym':
+        # la rd, symbol -> auipc rd, %pcrel_hi(symbol); addi rd, rd, %pcrel_lo(symbol)
+        expanded.append(Instr('auipc', [ops[0], ('pcrel_hi', ops[1][1])]))
+        expanded.append(Instr('addi', [ops[0], ops[0], ('pcrel_lo', ops[1][1])]))
     elif m == 'la':
-        # la rd, symbol -> addi rd, rd, symbol[11:0]
-        expanded.append(Instr('addi', [ops[0], ops[0], ('sym', ops[1][1])]))
-    elif m in ('lb','lh','lw'):
-        # l{b,h,w} rd, symbol -> rd = symbol[11:0](x0)
-        expanded.append(Instr(m, [ops[0], ('memoff', 0, 0)]))  # simplificado
-    elif m in ('sb','sh','sw'):
-        # s{b,h,w} rd, symbol
-        expanded.append(Instr(m, [ops[0], ('memoff', 0, 0)]))
+        # la rd, address -> li rd, address
+        return expand_pseudo(Instr('li', ops))
+    elif m in ('lb','lh','lw','lbu','lhu') and len(ops)==2 and ops[1][0]=='sym':
+        # l{b,h,w} rd, symbol -> auipc rd, %pcrel_hi(symbol); l{b,h,w} rd, %pcrel_lo(symbol)(rd)
+        expanded.append(Instr('auipc', [ops[0], ('pcrel_hi', ops[1][1])]))
+        expanded.append(Instr(m, [ops[0], ('pcrel_lo', ops[1][1], ops[0][1])]))
+    elif m in ('sb','sh','sw') and len(ops) in (2, 3) and ops[1][0]=='sym':
+        # s{b,h,w} rs, symbol, rt -> auipc rt, %pcrel_hi(symbol); s{b,h,w} rs, %pcrel_lo(symbol)(rt)
+        # without rt the address is built in x6, like tail
+        scratch = ops[2] if len(ops) == 3 else ('reg', 6)
+        if scratch == ops[0]:
+            raise Exception(f"{m} x{scratch[1]}, {ops[1][1]} needs another scratch register: "
+                            f"{m} x{scratch[1]}, {ops[1][1]}, rt")
+        expanded.append(Instr('auipc', [scratch, ('pcrel_hi', ops[1][1])]))
+        expanded.append(Instr(m, [ops[0], ('pcrel_lo', ops[1][1], scratch[1])]))
     elif m == 'not':
         # not rd, rs -> xori rd, rs, -1
         expanded.append(Instr('xori', [ops[0], ops[1], ('imm', -1)]))
@@ -104,11 +114,13 @@ def expand_pseudo(instr):
     elif m == 'ret':
         expanded.append(Instr('jalr', [('reg',0), ('reg',1), ('imm',0)]))
     elif m == 'call':
-        # call offset -> jalr x1,x1,offset[11:0]
-        expanded.append(Instr('jalr', [('reg',1), ('reg',1), ops[0]]))
+        # call label -> auipc x1, %pcrel_hi(label); jalr x1, x1, %pcrel_lo(label)
+        expanded.append(Instr('auipc', [('reg',1), ('pcrel_hi', ops[0][1])]))
+        expanded.append(Instr('jalr', [('reg',1), ('reg',1), ('pcrel_lo', ops[0][1])]))
     elif m == 'tail':
-        # tail offset -> jalr x0,x6,offset[11:0]
-        expanded.append(Instr('jalr', [('reg',0), ('reg',6), ops[0]]))
+        # tail label -> auipc x6, %pcrel_hi(label); jalr x0, x6, %pcrel_lo(label)
+        expanded.append(Instr('auipc', [('reg',6), ('pcrel_hi', ops[0][1])]))
+        expanded.append(Instr('jalr', [('reg',0), ('reg',6), ('pcrel_lo', ops[0][1])]))
     else:
         return [instr]
     return expanded
\ No newline at end of file
@@ -0,0 +1,221 @@
+# ---------------------------
+# Branch/jump relaxation (end of pass1)
+# A branch reaches -4096..+4094 bytes and jal +-1 MiB. When a label is
+# further away the instruction is rewritten into a longer form that does
+# reach it:
+#   beq  a, b, far  ->  bne a, b, +8  ;  jal x0, far
+#                   ->  bne a, b, +12 ;  auipc x6, far ; jalr x0, x6, far
+#   jal  rd, far    ->  auipc rd, far ;  jalr rd, rd, far  (x6 for rd = x0)
+# (the same scratch register as the tail pseudo-instruction). Growing one
+# instruction moves everything after it, which can push other targets out of
+# reach, so this repeats until no form changes.
+#
+# The layout is not redone for that: addresses are kept as the plain layout
+# gave them plus the growth of the relaxable instructions in front of them
+# (a prefix sum over those instructions only). Each round re-checks just the
+# instructions that growth elsewhere may have pushed out of reach; an
+# instruction only ever grows, so this always converges. Programs where
+# everything is in reach (the usual case) only pay for one range check per
+# branch/jump.
+# Numeric pc-relative offsets written in the source (beq x1, x2, 8) are not
+# relaxed; pass2 reports them when out of range.
+# ---------------------------
+
+from bisect import bisect_left, bisect_right
+
+from assembler.nodes import Instr
+
+BRANCH_REACH = (-4096, 4094)
+JAL_REACH = (-(1 << 20), (1 << 20) - 2)
+
+# branch -> the branch taken in the opposite case
+INVERSE = {
+    'beq': 'bne', 'bne': 'beq',
+    'blt': 'bge', 'bge': 'blt',
+    'bltu': 'bgeu', 'bgeu': 'bltu',
+}
+
+# mnemonics that may need relaxing
+RELAXABLE = set(INVERSE) | {'jal'}
+
+X0 = ('reg', 0)
+SCRATCH = ('reg', 6)
+
+def _in_reach(off, reach):
+    return reach[0] <= off <= reach[1]
+
+def _relaxable(ins, symtab):
+    # -> largest size in words this instruction may grow to (0: never relaxed)
+    ops = ins.operands
+    if not ops or ops[-1][0] != 'sym' or ops[-1][1] not in symtab:
+        return 0  # undefined labels are left to pass2
+    m = ins.mnemonic
+    if m in INVERSE and len(ops) == 3:
+        return 3
+    if m == 'jal' and len(ops) == 2:
+        return 2
+    return 0
+
+def _margin(ins, size, pc, target):
+    # bytes the target may still move before the current form (size words
+    # at pc) stops reaching it; negative when it is out of reach already
+    if ins.mnemonic == 'jal':
+        lo, hi = JAL_REACH
+        off = target - pc
+    elif size == 1:
+        lo, hi = BRANCH_REACH
+        off = target - pc
+    else:
+        lo, hi = JAL_REACH
+        off = target - pc - 4  # the jal after the inverted branch
+    return min(off - lo, hi - off)
+
+def relaxed_form(ins, size):
+    # -> the instructions ins becomes at size words
+    if size == 1:
+        return [ins]
+    forms = _relaxed_form(ins, size)
+    for form in forms:
+        form.loc = ins.loc
+    return forms
+
+def _relaxed_form(ins, size):
+    ops = ins.operands
+    target = ops[-1]
+    sym = target[1]
+    if ins.mnemonic == 'jal':
+        rd = ops[0]
+        scratch = rd if rd != X0 else SCRATCH
+        return [Instr('auipc', [scratch, ('pcrel_hi', sym)]),
+                Instr('jalr', [rd, scratch, ('pcrel_lo', sym)])]
+    skip = Instr(INVERSE[ins.mnemonic], [ops[0], ops[1], ('imm', 4 * size)])
+    if size == 2:
+        return [skip, Instr('jal', [X0, target])]
+    return [skip, Instr('auipc', [SCRATCH, ('pcrel_hi', sym)]),
+            Instr('jalr', [X0, SCRATCH, ('pcrel_lo', sym)])]
+
+def relax(program, symtab, labels):
+    # program: pass1 records (address, Instr); labels: name -> index in
+    # program of the first instruction after the label. Returns
+    # (symtab, program) with every branch/jump in reach of its label.
+    blo, bhi = BRANCH_REACH
+    jlo, jhi = JAL_REACH
+    get = symtab.get
+    for pc, ins in program:
+        m = ins.mnemonic
+        if m not in RELAXABLE:
+            continue
+        if m != 'jal':
+            lo, hi = blo, bhi
+        else:
+            lo, hi = jlo, jhi
+        target = ins.operands[-1] if ins.operands else None
+        if target is None or target[0] != 'sym':
+            continue
+        addr = get(target[1])
+        if addr is not None and not lo <= addr - pc <= hi and _relaxable(ins, symtab):
+            return _relax(program, symtab, labels)
+    return symtab, program  # everything in reach
+
+def _relax(program, symtab, labels):
+    n = len(program)
+    pcs = [pc for pc, _ in program]
+    # a .text directive restarts the address counter: the plain layout has
+    # consecutive addresses except where a new segment starts
+    if pcs[-1] - pcs[0] == 4 * (n - 1):
+        starts = []
+    else:
+        starts = [i for i in range(1, n) if pcs[i] != pcs[i - 1] + 4]
+    idx = []    # program index of each relaxable instruction
+    limit = []  # its largest size
+    for i, (pc, ins) in enumerate(program):
+        if ins.mnemonic in RELAXABLE:
+            top = _relaxable(ins, symtab)
+            if top:
+                idx.append(i)
+                limit.append(top)
+    r = len(idx)
+    size = [1] * r
+    cseg = [bisect_right(starts, i) for i in idx]
+    # each label: (plain address, last relaxable index before it, segment)
+    where = {}
+    for name, addr in symtab.items():
+        li = labels[name]
+        if li < n and pcs[li] == addr:
+            lseg = bisect_right(starts, li)
+        else:
+            lseg = bisect_right(starts, li - 1)  # end of a segment
+        where[name] = (addr, bisect_left(idx, li) - 1, lseg)
+    instrs = [program[i][1] for i in idx]
+    targets = [where[ins.operands[-1][1]] for ins in instrs]
+    # A form that reaches its target with m bytes to spare keeps reaching it
+    # until at least m bytes have been added in front of some instructions,
+    # so each round only re-checks the instructions whose spare is used up.
+    due = [0] * r  # re-check k once this many bytes have been added
+    added = 0
+    work = list(range(r))
+    while True:
+        before = _growth(size, cseg)
+        grow = []
+        for k in work:
+            if due[k] > added:
+                continue
+            m = _margin(instrs[k], size[k], pcs[idx[k]] + before[k],
+                        _address(targets[k], before, size, cseg))
+            if m < 0:
+                grow.append(k)
+            else:
+                due[k] = added + m + 1
+        if not grow:
+            break
+        for k in grow:
+            size[k] += 1
+        added += 4 * len(grow)
+        work = [k for k in work if size[k] < limit[k]]
+    # rebuild: copy the runs between relaxable instructions, shifted by the
+    # growth in front of them
+    out = []
+    pos = 0
+    grown = 0
+    bounds = iter(starts)
+    nxt = next(bounds, n)
+    for k, i in enumerate(idx + [n]):
+        while nxt <= i and nxt < n:
+            _shifted(out, program, pos, nxt, grown)
+            pos = nxt
+            grown = 0
+            nxt = next(bounds, n)
+        _shifted(out, program, pos, i, grown)
+        if i == n:
+            break
+        pc = pcs[i] + grown
+        for j, einstr in enumerate(relaxed_form(instrs[k], size[k])):
+            out.append((pc + 4 * j, einstr))
+        grown += 4 * (size[k] - 1)
+        pos = i + 1
+    return {name: _address(where[name], before, size, cseg) for name in symtab}, out
+
+def _shifted(out, program, a, b, shift):
+    if shift:
+        out.extend([(pc + shift, ins) for pc, ins in program[a:b]])
+    else:
+        out.extend(program[a:b])
+
+def _growth(size, cseg):
+    # bytes added in front of each relaxable instruction, within its segment
+    before = [0] * len(size)
+    grown = 0
+    prev = None
+    for k, s in enumerate(size):
+        if cseg[k] != prev:
+            grown = 0
+            prev = cseg[k]
+        before[k] = grown
+        grown += 4 * (s - 1)
+    return before
+
+def _address(label, before, size, cseg):
+    addr, k, lseg = label
+    if k >= 0 and cseg[k] == lseg:
+        addr += before[k] + 4 * (size[k] - 1)
+    return addr
@@ -0,0 +1,127 @@
+# ---------------------------
+# Long-running modes with warm state
+# watch(): re-assemble one file whenever it changes on disk.
+# serve(): answer assembly requests on a local TCP socket.
+# Both keep the lexer, parser, instruction tables and an IncrementalAssembler
+# per source alive between builds, so a rebuild only pays for what changed.
+#
+# Protocol (serve): one JSON object per line in each direction.
+#   {"asm": "prog.asm", "outputs": ["prog.hex", "prog.bin"], "format": "hexbin"}
+#       assemble a file and write its outputs
+#   {"source": "addi x1, x0, 1\n"}
+#       assemble inline text; the reply carries the words as hex strings
+# Reply: {"ok": true, "words": N, "ms": latency} (+ "hex": [...] for source)
+#        {"ok": false, "error": "...", "ms": latency}
+# ---------------------------
+
+import json
+import os
+import socket
+import socketserver
+import time
+
+from assembler.incremental import IncrementalAssembler
+from assembler.iohelpers import write_output
+from assembler.pipeline import make_front_end
+
+DEFAULT_PORT = 8765
+
+class WarmAssembler:
+    # one lexer/parser shared by an IncrementalAssembler per source
+    def __init__(self, front_end='line'):
+        self.lexer, self.parser = make_front_end(front_end)
+        self._by_source = {}
+
+    def assemble(self, txt, source='<inline>'):
+        inc = self._by_source.get(source)
+        if inc is None:
+            inc = self._by_source[source] = IncrementalAssembler(self.lexer, self.parser)
+        return inc.assemble(txt, source if os.path.exists(source) else None), inc.stats
+
+    def handle(self, request):
+        # one protocol request -> reply dict
+        t0 = time.perf_counter()
+        try:
+            if 'source' in request:
+                machine, _ = self.assemble(request['source'])
+                reply = {'ok': True, 'words': len(machine),
+                         'hex': [f"{word:08x}" for _, word in machine]}
+            else:
+                asmfile = request['asm']
+                with open(asmfile, 'r') as f:
+                    txt = f.read()
+                machine, _ = self.assemble(txt, os.path.abspath(asmfile))
+                write_output(machine, request.get('format', 'hexbin'), request['outputs'])
+                reply = {'ok': True, 'words': len(machine)}
+        except Exception as e:
+            reply = {'ok': False, 'error': str(e)}
+        reply['ms'] = round((time.perf_counter() - t0) * 1000, 3)
+        return reply
+
+def watch(asmfile, fmt, outputs, interval=0.2, report=print, front_end='line'):
+    warm = WarmAssembler(front_end)
+    source = os.path.abspath(asmfile)
+    last = None
+    report(f"Watching {asmfile} (Ctrl-C to stop)")
+    try:
+        while True:
+            try:
+                mtime = os.stat(asmfile).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != last:
+                last = mtime
+                t0 = time.perf_counter()
+                try:
+                    with open(asmfile, 'r') as f:
+                        txt = f.read()
+                    machine, stats = warm.assemble(txt, source)
+                    write_output(machine, fmt, outputs)
+                except Exception as e:
+                    report(f"Error: {e}")
+                else:
+                    ms = (time.perf_counter() - t0) * 1000
+                    report(f"Wrote {len(machine)} words in {ms:.1f} ms "
+                           f"(reparsed {stats['parsed']}/{stats['chunks']} chunks, "
+                           f"re-encoded {stats['encoded']})")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            name = '?'
+            try:
+                request = json.loads(line)
+                name = request.get('asm', '<inline>')
+            except (ValueError, AttributeError) as e:
+                reply = {'ok': False, 'error': f"Bad request: {e}", 'ms': 0.0}
+            else:
+                reply = self.server.warm.handle(request)
+            self.server.report(f"{name}: {'ok' if reply['ok'] else 'FAIL'} {reply['ms']:.1f} ms")
+            self.wfile.write((json.dumps(reply) + '\n').encode())
+            self.wfile.flush()
+
+class _Server(socketserver.TCPServer):
+    allow_reuse_address = True
+
+def serve(port=DEFAULT_PORT, host='127.0.0.1', report=print, front_end='line'):
+    # requests are handled one at a time, so the warm state needs no locking
+    with _Server((host, port), _Handler) as srv:
+        srv.warm = WarmAssembler(front_end)
+        srv.report = report
+        report(f"Listening on {host}:{srv.server_address[1]} (Ctrl-C to stop)")
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+def send_request(request, port=DEFAULT_PORT, host='127.0.0.1'):
+    # client helper for build scripts: one request, one reply
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall((json.dumps(request) + '\n').encode())
+        with sock.makefile('r') as f:
+            return json.loads(f.readline())
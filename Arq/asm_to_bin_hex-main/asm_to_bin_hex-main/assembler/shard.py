@@ -0,0 +1,71 @@
+# ---------------------------
+# Sharded pass2 (-j N on a single file): encode one huge program across
+# a process pool
+# After pass1 every instruction carries its own address and the symbol
+# table is final, so instructions encode independently. The program is cut
+# into contiguous shards (a few per worker, for balance); each worker
+# encodes its shards (with the NumPy batch path whatever their size: a
+# worker imports NumPy once for all of them) and sends back the words as a
+# packed array, which are joined in order. Where fork is the default start
+# method, the workers inherit the program and the symbol table and a task
+# is just a (start, end) pair (fork is never forced where the platform
+# avoids it, e.g. macOS); elsewhere the symbol table goes to each worker once,
+# through the pool initializer, and only the shard's instructions travel
+# with a task.
+# Any error sends the program back to the serial path, which reports it
+# exactly as it always does.
+# ---------------------------
+
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+SHARDS_PER_JOB = 4  # so one slow shard does not hold up the others
+
+# what the workers encode (inherited when forked, else set by _init_worker)
+_program = None
+_symtab = None
+
+def _init_worker(symtab):
+    global _symtab
+    _symtab = symtab
+
+def _encode(shard):
+    from assembler.passes import encode_stream, pass2_batch
+    machine = pass2_batch(shard, _symtab)
+    if machine is None:
+        machine = encode_stream(shard, _symtab)
+    return array('I', map(itemgetter(1), machine))
+
+def _encode_range(bounds):
+    start, end = bounds
+    return _encode(_program[start:end])
+
+def shards(n, jobs):
+    # -> contiguous (start, end) index ranges covering n instructions
+    size = max(1, -(-n // (jobs * SHARDS_PER_JOB)))
+    return [(start, min(start + size, n)) for start in range(0, n, size)]
+
+def encode_sharded(program, symtab, jobs):
+    # -> array of words in program order, or None if a shard failed (the
+    # serial path then produces the error)
+    global _program, _symtab
+    bounds = shards(len(program), jobs)
+    words = array('I')
+    try:
+        if multiprocessing.get_start_method() == 'fork':
+            _program, _symtab = program, symtab
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                for part in pool.map(_encode_range, bounds):
+                    words += part
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(symtab,)) as pool:
+                for part in pool.map(_encode, (program[a:b] for a, b in bounds)):
+                    words += part
+    except Exception:
+        return None
+    finally:
+        _program = _symtab = None
+    return words
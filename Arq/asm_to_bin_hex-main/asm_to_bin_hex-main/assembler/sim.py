@@ -0,0 +1,564 @@
+# ---------------------------
+# Instruction-set simulator for assembled images (RV32IM)
+# The image is loaded at address 0 of a flat little-endian bytearray. Each
+# word is decoded once, the first time its PC is reached, into a closure
+# that executes it and returns the next PC; the decode cache maps PC ->
+# closure. Stores into the loaded code drop the affected cache entries.
+# Execution stops at ecall/ebreak, when the PC falls off the end of the
+# code (the image, or the text when a .data section follows it), or after
+# max_steps instructions.
+#
+# By default the simulator goes one step further and translates each basic
+# block (a straight-line run ending at a branch, jal, jalr, ecall or ebreak)
+# into one generated Python function, cached by its start PC, so a whole
+# block runs per dispatch. A store into code invalidates every block that
+# covers the written word and leaves the running block right after it.
+#
+# Usage: python -m assembler.sim program.{asm,hex,img} [--max-steps N] [--no-blocks]
+# ---------------------------
+
+import struct
+import sys
+import time
+
+from assembler.decode import decode
+
+M = 0xFFFFFFFF
+DEFAULT_MEM_SIZE = 1 << 20  # bytes
+# writes to x0 land in this extra register slot, so x0 always reads 0
+X0_SINK = 32
+
+_word = struct.Struct('<I')
+_half = struct.Struct('<H')
+
+def signed(x):
+    return x - 0x100000000 if x & 0x80000000 else x
+
+class Halt(Exception):
+    # raised by ecall/ebreak and at the end of the image; stops run()
+    pass
+
+class CodeWritten(Exception):
+    # raised by a translated block after a store into code:
+    # args = (next pc, instructions the block executed)
+    pass
+
+# ---------------------------
+# ALU operations on unsigned 32-bit register values. The immediate forms
+# use the same functions with the sign-extended immediate as a u32.
+# ---------------------------
+
+def _div(a, b):
+    a, b = signed(a), signed(b)
+    if b == 0:
+        return M
+    q = abs(a) // abs(b)
+    return (-q if (a < 0) != (b < 0) else q) & M
+
+def _rem(a, b):
+    sa, sb = signed(a), signed(b)
+    if sb == 0:
+        return a
+    r = abs(sa) % abs(sb)
+    return (-r if sa < 0 else r) & M
+
+ALU = {
+    'add': lambda a, b: (a + b) & M,
+    'sub': lambda a, b: (a - b) & M,
+    'sll': lambda a, b: (a << (b & 31)) & M,
+    'slt': lambda a, b: int(signed(a) < signed(b)),
+    'sltu': lambda a, b: int(a < b),
+    'xor': lambda a, b: a ^ b,
+    'srl': lambda a, b: a >> (b & 31),
+    'sra': lambda a, b: (signed(a) >> (b & 31)) & M,
+    'or': lambda a, b: a | b,
+    'and': lambda a, b: a & b,
+    'mul': lambda a, b: (a * b) & M,
+    'mulh': lambda a, b: ((signed(a) * signed(b)) >> 32) & M,
+    'mulhsu': lambda a, b: ((signed(a) * b) >> 32) & M,
+    'mulhu': lambda a, b: (a * b) >> 32,
+    'div': _div,
+    'divu': lambda a, b: a // b if b else M,
+    'rem': _rem,
+    'remu': lambda a, b: a % b if b else a,
+}
+
+# immediate form -> register form
+ALU_IMM = {
+    'addi': 'add', 'slti': 'slt', 'sltiu': 'sltu', 'xori': 'xor',
+    'ori': 'or', 'andi': 'and', 'slli': 'sll', 'srli': 'srl', 'srai': 'sra',
+}
+
+BRANCH = {
+    'beq': lambda a, b: a == b,
+    'bne': lambda a, b: a != b,
+    'blt': lambda a, b: signed(a) < signed(b),
+    'bge': lambda a, b: signed(a) >= signed(b),
+    'bltu': lambda a, b: a < b,
+    'bgeu': lambda a, b: a >= b,
+}
+
+# ---------------------------
+# Closure factories: (sim, pc, rd, rs1, rs2, imm) -> op(pc) -> next pc
+# Everything known at decode time (targets, link addresses, the ALU
+# function) is bound into the closure.
+# ---------------------------
+
+def _op_rrr(sim, fn, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    def op(pc):
+        regs[rd] = fn(regs[rs1], regs[rs2])
+        return pc + 4
+    return op
+
+def _op_add(sim, fn, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    def op(pc):
+        regs[rd] = (regs[rs1] + regs[rs2]) & M
+        return pc + 4
+    return op
+
+def _op_rri(sim, fn, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    b = imm & M
+    def op(pc):
+        regs[rd] = fn(regs[rs1], b)
+        return pc + 4
+    return op
+
+def _op_addi(sim, fn, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    def op(pc):
+        regs[rd] = (regs[rs1] + imm) & M
+        return pc + 4
+    return op
+
+def _op_branch(sim, cond, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    target = (pc + imm) & M
+    def op(pc):
+        return target if cond(regs[rs1], regs[rs2]) else pc + 4
+    return op
+
+def _op_jal(sim, fn, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    target = (pc + imm) & M
+    link = (pc + 4) & M
+    def op(pc):
+        regs[rd] = link
+        return target
+    return op
+
+def _op_jalr(sim, fn, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    link = (pc + 4) & M
+    def op(pc):
+        target = (regs[rs1] + imm) & 0xFFFFFFFE
+        regs[rd] = link
+        return target
+    return op
+
+def _op_lui(sim, fn, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    value = imm & M
+    def op(pc):
+        regs[rd] = value
+        return pc + 4
+    return op
+
+def _op_auipc(sim, fn, pc, rd, rs1, rs2, imm):
+    return _op_lui(sim, fn, pc, rd, rs1, rs2, pc + imm)
+
+def _op_load(sim, load, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    mem = sim.mem
+    def op(pc):
+        regs[rd] = load(mem, (regs[rs1] + imm) & M)
+        return pc + 4
+    return op
+
+def _op_store(sim, store, pc, rd, rs1, rs2, imm):
+    regs = sim.regs
+    mem = sim.mem
+    code_end = sim.code_end
+    code_written = sim.code_written
+    def op(pc):
+        addr = (regs[rs1] + imm) & M
+        store(mem, addr, regs[rs2])
+        if addr < code_end:
+            code_written(addr)
+        return pc + 4
+    return op
+
+def _op_nop(sim, fn, pc, rd, rs1, rs2, imm):
+    def op(pc):
+        return pc + 4
+    return op
+
+def _op_halt(sim, reason, pc, rd, rs1, rs2, imm):
+    def op(pc):
+        raise Halt(reason)
+    return op
+
+LOADS = {
+    'lb': lambda mem, a: mem[a] - ((mem[a] & 0x80) << 1) & M,
+    'lbu': lambda mem, a: mem[a],
+    'lh': lambda mem, a: (signed(_half.unpack_from(mem, a)[0] << 16) >> 16) & M,
+    'lhu': lambda mem, a: _half.unpack_from(mem, a)[0],
+    'lw': lambda mem, a: _word.unpack_from(mem, a)[0],
+}
+
+def _sb(mem, a, v):
+    mem[a] = v & 0xFF
+
+STORES = {
+    'sb': _sb,
+    'sh': lambda mem, a, v: _half.pack_into(mem, a, v & 0xFFFF),
+    'sw': _word.pack_into,
+}
+
+# mnemonic -> (closure factory, its extra argument)
+OPS = {}
+OPS.update((m, (_op_rrr, fn)) for m, fn in ALU.items())
+OPS.update((m, (_op_rri, ALU[r])) for m, r in ALU_IMM.items())
+OPS.update((m, (_op_branch, cond)) for m, cond in BRANCH.items())
+OPS.update((m, (_op_load, fn)) for m, fn in LOADS.items())
+OPS.update((m, (_op_store, fn)) for m, fn in STORES.items())
+OPS.update({
+    'add': (_op_add, None),
+    'addi': (_op_addi, None),
+    'jal': (_op_jal, None),
+    'jalr': (_op_jalr, None),
+    'lui': (_op_lui, None),
+    'auipc': (_op_auipc, None),
+    'fence': (_op_nop, None),
+    'ecall': (_op_halt, 'ecall'),
+    'ebreak': (_op_halt, 'ebreak'),
+})
+
+# ---------------------------
+# Basic-block translation: each instruction becomes a few lines of Python
+# source; a block is compiled into one function block(r, mem) -> next pc.
+# Register reads are r[n] (r[0] is always 0); writes to x0 are dropped.
+# ---------------------------
+
+MAX_BLOCK = 128  # instructions per translated block
+
+# ALU expressions; {a} and {b} are the operand expressions
+ALU_SRC = {
+    'add': '({a} + {b}) & 0xFFFFFFFF',
+    'sub': '({a} - {b}) & 0xFFFFFFFF',
+    'sll': '({a} << ({b} & 31)) & 0xFFFFFFFF',
+    'slt': 'int(S({a}) < S({b}))',
+    'sltu': 'int({a} < {b})',
+    'xor': '{a} ^ {b}',
+    'srl': '{a} >> ({b} & 31)',
+    'sra': '(S({a}) >> ({b} & 31)) & 0xFFFFFFFF',
+    'or': '{a} | {b}',
+    'and': '{a} & {b}',
+    'mul': '({a} * {b}) & 0xFFFFFFFF',
+}
+
+BRANCH_SRC = {
+    'beq': '{a} == {b}',
+    'bne': '{a} != {b}',
+    'blt': 'S({a}) < S({b})',
+    'bge': 'S({a}) >= S({b})',
+    'bltu': '{a} < {b}',
+    'bgeu': '{a} >= {b}',
+}
+
+# names the generated code can use
+BLOCK_NAMES = {
+    'S': signed,
+    'F': ALU,
+    'LOAD': LOADS,
+    'STORE': STORES,
+    'Halt': Halt,
+    'UW': _word.unpack_from,
+    'PW': _word.pack_into,
+}
+
+def _alu_src(m, a, b):
+    src = ALU_SRC.get(m)
+    if src is None:
+        return f"F[{m!r}]({a}, {b})"
+    return src.format(a=a, b=b)
+
+def translate_instr(spec, pc, rd, rs1, rs2, imm, k):
+    # -> (source lines, ends the block); k = instructions before this one
+    m = spec.mnemonic
+    layout = spec.layout
+    a = f"r[{rs1}]"
+    if layout == 'rrr':
+        return ([f"r[{rd}] = {_alu_src(m, a, f'r[{rs2}]')}"] if rd else []), False
+    if m in ALU_IMM:
+        return ([f"r[{rd}] = {_alu_src(ALU_IMM[m], a, imm & M)}"] if rd else []), False
+    if layout == 'load':
+        if not rd:
+            return [], False
+        if m == 'lw':
+            return [f"r[{rd}] = UW(mem, ({a} + {imm}) & 0xFFFFFFFF)[0]"], False
+        if m == 'lbu':
+            return [f"r[{rd}] = mem[({a} + {imm}) & 0xFFFFFFFF]"], False
+        return [f"r[{rd}] = LOAD[{m!r}](mem, ({a} + {imm}) & 0xFFFFFFFF)"], False
+    if layout == 'store':
+        store = "PW" if m == 'sw' else f"STORE[{m!r}]"
+        return [f"a = ({a} + {imm}) & 0xFFFFFFFF",
+                f"{store}(mem, a, r[{rs2}])",
+                f"if a < CODE_END: code_written(a, {pc + 4}, {k + 1})"], False
+    if layout == 'branch':
+        cond = BRANCH_SRC[m].format(a=a, b=f"r[{rs2}]")
+        return [f"return {(pc + imm) & M} if {cond} else {pc + 4}"], True
+    if m == 'jal':
+        return ([f"r[{rd}] = {pc + 4}"] if rd else []) + [f"return {(pc + imm) & M}"], True
+    if m == 'jalr':
+        return ([f"t = ({a} + {imm}) & 0xFFFFFFFE"] + ([f"r[{rd}] = {pc + 4}"] if rd else [])
+                + ["return t"]), True
+    if m == 'lui':
+        return ([f"r[{rd}] = {imm & M}"] if rd else []), False
+    if m == 'auipc':
+        return ([f"r[{rd}] = {(pc + imm) & M}"] if rd else []), False
+    if m in ('ecall', 'ebreak'):
+        return [f"raise Halt({m!r}, {pc})"], True
+    if m == 'fence':
+        return [], False
+    raise Exception(f"No translation for {m}")
+
+class Sim:
+    def __init__(self, mem_size=DEFAULT_MEM_SIZE, blocks=True):
+        self.mem = bytearray(mem_size)
+        self.view = memoryview(self.mem)
+        self.regs = [0] * 33  # x0..x31 + X0_SINK
+        self.regs[2] = mem_size  # sp starts at the top of memory
+        self.pc = 0
+        self.code_end = 0
+        self.blocks = blocks  # per-block (True) or per-instruction dispatch
+        self._decoded = {}  # pc -> op closure
+        self._blocks = {}   # start pc -> (block function, instruction count)
+        self._covering = {}  # word address -> start pcs of blocks containing it
+        self.stats = {'steps': 0, 'seconds': 0.0, 'ips': 0.0, 'halt': None}
+
+    # ---------------------------
+    # Loading
+    # ---------------------------
+
+    def load(self, machine, code_end=None):
+        # machine: list of (address, word), as produced by pass2; code_end:
+        # where the code stops (default: after the last word)
+        for addr, word in machine:
+            _word.pack_into(self.mem, addr, word)
+        if code_end is None:
+            code_end = max((addr + 4 for addr, _ in machine), default=0)
+        self.code_end = code_end
+        self._flush()
+
+    def load_image(self, data, code_end=None):
+        # raw little-endian image at address 0
+        self.view[:len(data)] = data
+        self.code_end = len(data) - len(data) % 4 if code_end is None else code_end
+        self._flush()
+
+    def _flush(self):
+        self._decoded.clear()
+        self._blocks.clear()
+        self._covering.clear()
+
+    def code_written(self, addr):
+        # a store hit the loaded code: forget what was decoded or translated
+        # there (a misaligned sh/sw can touch the next word too)
+        for word in {addr & ~3, (addr + 3) & ~3}:
+            self._decoded.pop(word, None)
+            for start in self._covering.pop(word, ()):
+                self._blocks.pop(start, None)
+
+    def _block_code_written(self, addr, next_pc, executed):
+        # store into code from a translated block: invalidate, then leave
+        # the block, which may have just overwritten its own instructions
+        self.code_written(addr)
+        raise CodeWritten(next_pc, executed)
+
+    # ---------------------------
+    # Execution
+    # ---------------------------
+
+    def _fetch(self, pc):
+        # -> decoded fields of the word at pc
+        if pc == self.code_end:
+            raise Halt('end')
+        if pc & 3 or pc > len(self.mem) - 4:
+            raise Exception(f"Bad instruction fetch at 0x{pc:08x}")
+        word = _word.unpack_from(self.mem, pc)[0]
+        try:
+            return decode(word)
+        except Exception as e:
+            raise Exception(f"{e} at 0x{pc:08x}")
+
+    def _decode(self, pc):
+        spec, rd, rs1, rs2, imm = self._fetch(pc)
+        factory, arg = OPS[spec.mnemonic]
+        op = self._decoded[pc] = factory(self, arg, pc, rd or X0_SINK, rs1, rs2, imm)
+        return op
+
+    def _translate(self, start):
+        # -> (block function, instruction count) for the block at start
+        lines = []
+        pc = start
+        n = 0
+        ends = False
+        while True:
+            try:
+                spec, rd, rs1, rs2, imm = self._fetch(pc)
+            except Exception:
+                if n == 0:
+                    raise
+                break  # let the next dispatch report it at the right pc
+            code, ends = translate_instr(spec, pc, rd, rs1, rs2, imm, n)
+            lines += code
+            pc += 4
+            n += 1
+            if ends or n == MAX_BLOCK or pc >= self.code_end:
+                break
+        if not ends:
+            lines.append(f"return {pc}")
+        src = "def block(r, mem):\n    " + "\n    ".join(lines) + "\n"
+        names = dict(BLOCK_NAMES, CODE_END=self.code_end, code_written=self._block_code_written)
+        exec(compile(src, f"<block 0x{start:08x}>", 'exec'), names)
+        block = self._blocks[start] = (names['block'], n)
+        for word in range(start, pc, 4):
+            self._covering.setdefault(word, []).append(start)
+        return block
+
+    def step(self):
+        # execute one instruction; Halt propagates
+        op = self._decoded.get(self.pc) or self._decode(self.pc)
+        self.pc = op(self.pc)
+
+    def run(self, max_steps=None):
+        # -> stats dict: steps, seconds, ips, halt ('ecall', 'ebreak', 'end'
+        # or 'max-steps'), blocks translated so far
+        limit = max_steps if max_steps is not None else float('inf')
+        t0 = time.perf_counter()
+        if self.blocks:
+            steps, reason = self._run_blocks(limit)
+        else:
+            steps, reason = self._run_steps(limit, 0)
+        seconds = time.perf_counter() - t0
+        self.stats = {'steps': steps, 'seconds': seconds,
+                      'ips': steps / seconds if seconds else 0.0, 'halt': reason,
+                      'blocks': len(self._blocks)}
+        return self.stats
+
+    def _run_steps(self, limit, steps):
+        # per-instruction dispatch through the decode cache
+        get = self._decoded.get
+        decode_at = self._decode
+        pc = self.pc
+        reason = 'max-steps'
+        try:
+            while steps < limit:
+                op = get(pc)
+                if op is None:
+                    op = decode_at(pc)
+                pc = op(pc)
+                steps += 1
+        except Halt as h:
+            reason = h.args[0]
+            if reason != 'end':
+                steps += 1  # ecall/ebreak executed
+        except (IndexError, struct.error):
+            raise Exception(f"Memory access out of range at 0x{pc:08x}")
+        finally:
+            self.pc = pc
+        return steps, reason
+
+    def _run_blocks(self, limit):
+        # per-block dispatch through the translation cache; the tail that
+        # would overshoot max_steps runs per instruction
+        blocks = self._blocks
+        get = blocks.get
+        translate = self._translate
+        regs = self.regs
+        mem = self.mem
+        pc = self.pc
+        steps = 0
+        while True:
+            n = 0
+            try:
+                while True:
+                    block = get(pc)
+                    if block is None:
+                        block = translate(pc)
+                    fn, n = block
+                    if steps + n > limit:
+                        break
+                    pc = fn(regs, mem)
+                    steps += n
+            except CodeWritten as c:
+                pc, executed = c.args
+                steps += executed
+                continue
+            except Halt as h:
+                # a block that stops at ecall/ebreak passes its address
+                self.pc = h.args[1] if len(h.args) > 1 else pc
+                reason = h.args[0]
+                if reason != 'end':
+                    steps += n  # the block up to and including ecall/ebreak
+                return steps, reason
+            except (IndexError, struct.error):
+                self.pc = pc
+                raise Exception(f"Memory access out of range in block at 0x{pc:08x}")
+            except Exception:
+                self.pc = pc
+                raise
+            self.pc = pc
+            return self._run_steps(limit, steps)
+
+    def reg(self, n):
+        return self.regs[n] if n else 0
+
+def load_file(sim, path):
+    # .asm is assembled first, .hex is one hex word per line, anything
+    # else is a raw image
+    if path.endswith('.asm'):
+        from assembler.pipeline import parse_source
+        from assembler.passes import pass1, pass2
+        with open(path, 'r') as f:
+            symtab, program, data = pass1(parse_source(f.read(), source=path))
+        # code ends where the .data image starts
+        sim.load(pass2(program, symtab, data), data.base - data.pad if data else None)
+    elif path.endswith('.hex'):
+        with open(path, 'r') as f:
+            words = [int(line, 16) for line in f if line.strip()]
+        sim.load(list(zip(range(0, 4 * len(words), 4), words)))
+    else:
+        with open(path, 'rb') as f:
+            sim.load_image(f.read())
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog='assembler.sim',
+                                 description="Run an assembled RV32IM program")
+    ap.add_argument('program', help=".asm, .hex (one word per line) or raw image")
+    ap.add_argument('--max-steps', type=int, default=None,
+                    help="stop after this many instructions")
+    ap.add_argument('--no-blocks', action='store_true',
+                    help="dispatch one instruction at a time instead of whole basic blocks")
+    ap.add_argument('--mem-size', type=int, default=DEFAULT_MEM_SIZE,
+                    help="memory size in bytes (default 1 MiB)")
+    args = ap.parse_args(argv)
+    sim = Sim(args.mem_size, blocks=not args.no_blocks)
+    try:
+        load_file(sim, args.program)
+        stats = sim.run(args.max_steps)
+    except Exception as e:
+        print(e)
+        return 1
+    print(f"Executed {stats['steps']} instructions in {stats['seconds']:.3f}s "
+          f"({stats['ips']:,.0f} IPS), stopped at 0x{sim.pc:08x}: {stats['halt']}")
+    for i in range(0, 32, 4):
+        print('  '.join(f"x{n:<2} {sim.reg(n):08x}" for n in range(i, i + 4)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
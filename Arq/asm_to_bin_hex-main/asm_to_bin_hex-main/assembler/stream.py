@@ -0,0 +1,112 @@
+# ---------------------------
+# Streaming assembly (--stream): memory stays flat in the input size
+# The source is read in blocks of whole lines and parsed block by block
+# into a generator of statements. pass1 keeps only the symbol table and an
+# instruction count; pass2 reads the source again and hands each chunk of
+# encoded words to a streaming writer as it goes. Only the symbol table
+# grows with the input (one entry per label), plus the .data image, which
+# is kept from pass1 and written after the text. Branches and jumps are not
+# relaxed here (that needs the whole program); one whose label is out of
+# reach is reported as an error. Errors stop the run at the first one (no
+# --all-errors) and carry no column: token indexes are block offsets.
+# ---------------------------
+
+from itertools import islice
+
+from assembler.data import DataImage
+from assembler.diagnostics import AssemblyError, Diagnostics
+from assembler.iohelpers import open_stream
+from assembler.passes import layout, encode_stream
+from assembler.pipeline import make_front_end
+from assembler.preprocess import needs_preprocessing
+
+READ_BLOCK = 1 << 16   # bytes of source lexed and parsed at a time
+WRITE_CHUNK = 1 << 12  # words encoded before they are written
+
+def read_blocks(path, block=READ_BLOCK):
+    # -> (first line number, text) blocks that end on a line boundary
+    lineno = 1
+    with open(path, 'r') as f:
+        while True:
+            lines = f.readlines(block)
+            if not lines:
+                return
+            yield lineno, ''.join(lines)
+            lineno += len(lines)
+
+def stream_statements(path, lexer, parser):
+    for lineno, txt in read_blocks(path):
+        if needs_preprocessing(txt):
+            raise Exception("--stream parses the source block by block and can't run the "
+                            "preprocessor (.include/.macro/.rept/.equ); assemble without --stream")
+        statements = parser.parse(iter(lexer.tokenize(txt, lineno)))
+        yield from (s for s in statements or [] if s is not None)
+
+def stream_pass1(path, lexer, parser, diag):
+    # -> (symtab, instruction count, data image)
+    symtab = {}
+    data = DataImage()
+    count = 0
+    end = 0
+    try:
+        for pc, _ in layout(stream_statements(path, lexer, parser), symtab, data=data, diag=diag):
+            count += 1
+            end = max(end, pc + 4)
+        if data:
+            data.place(end, symtab)
+    except AssemblyError:
+        raise
+    except Exception as e:
+        diag.error('pass1', str(e))
+    return symtab, count, data
+
+class _DataSink(DataImage):
+    # what pass2's layout puts .data into: nothing is kept, the image
+    # written is the one pass1 built (and checked)
+    def label(self, name):
+        pass
+
+    def directive(self, name, args):
+        pass
+
+def stream_pass2(path, symtab, lexer, parser, diag, data=None):
+    # generator of machine chunks, each a list of (address, word)
+    program = layout(stream_statements(path, lexer, parser), {}, data=_DataSink())
+    words = encode_stream(program, symtab, diag)
+    while True:
+        try:
+            chunk = list(islice(words, WRITE_CHUNK))
+        except AssemblyError:
+            raise
+        except Exception as e:
+            diag.error('pass2', str(e))
+        if not chunk:
+            break
+        yield chunk
+    if data:
+        try:
+            yield data.machine(symtab)
+        except Exception as e:
+            diag.error('pass2', str(e))
+
+def assemble_stream(path, fmt, outputs, lexer=None, parser=None):
+    # assemble path straight into the output files; -> number of words
+    if lexer is None or parser is None:
+        lexer, parser = make_front_end()
+    diag = Diagnostics(path, columns=False)
+    lexer.diag = parser.diag = diag
+    try:
+        symtab, count, data = stream_pass1(path, lexer, parser, diag)
+        writer = open_stream(fmt, outputs)
+        try:
+            for chunk in stream_pass2(path, symtab, lexer, parser, diag, data):
+                writer.write(chunk)
+        except Exception:
+            writer.discard()
+            raise
+    finally:
+        lexer.diag = parser.diag = None
+    writer.close()
+    if data:
+        count += (data.pad + len(data.image)) // 4
+    return count
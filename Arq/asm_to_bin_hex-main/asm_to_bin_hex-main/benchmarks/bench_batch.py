@@ -0,0 +1,33 @@
+# ---------------------------
+# Benchmark: NumPy batch encoding vs the scalar path
+# Times scalar and batch pass2 on the same program (tests/test_encode_batch.py
+# checks that they agree bit for bit).
+# Usage: python benchmarks/bench_batch.py [n_instrs]
+# ---------------------------
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler import passes
+from assembler.passes import pass1, pass2
+
+from bench_encode import make_program
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    symtab, program, _ = pass1(make_program(n))
+    passes.BATCH_THRESHOLD = n + 1
+    t0 = time.perf_counter()
+    pass2(program, symtab)
+    t1 = time.perf_counter()
+    passes.BATCH_THRESHOLD = 0
+    pass2(program, symtab)
+    t2 = time.perf_counter()
+    print(f"pass2 scalar: {t1 - t0:.3f}s  {n / (t1 - t0):,.0f} instr/s")
+    print(f"pass2 batch:  {t2 - t1:.3f}s  {n / (t2 - t1):,.0f} instr/s")
+
+if __name__ == '__main__':
+    main()
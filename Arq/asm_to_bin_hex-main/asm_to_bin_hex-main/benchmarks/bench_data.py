@@ -0,0 +1,79 @@
+# ---------------------------
+# Benchmark: .data section (assembler.data)
+# Assembles a program carrying large lookup tables (.word, .half, .byte and
+# a string) and reports where the time goes (tests/test_data.py checks the
+# image against struct.pack and runs it in the simulator).
+# Usage: python benchmarks/bench_data.py [table_words]
+#        (default 262144, a 1 MiB .word table)
+# ---------------------------
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.iohelpers import image_bytes
+from assembler.passes import pass1, pass2
+from assembler.pipeline import make_front_end
+
+PER_LINE = 16
+SUMMED = 1000  # table entries the program adds up
+
+def make_tables(n, seed=1):
+    rng = random.Random(seed)
+    words = [rng.randrange(-(1 << 31), 1 << 32) for _ in range(n)]
+    halves = [rng.randrange(-(1 << 15), 1 << 16) for _ in range(n // 8)]
+    bytes_ = [rng.randrange(256) for _ in range(n // 8)]
+    return words, halves, bytes_
+
+def directive_lines(name, values):
+    return [f" {name} " + ", ".join(map(str, values[i:i + PER_LINE]))
+            for i in range(0, len(values), PER_LINE)]
+
+def make_program(words, halves, bytes_):
+    lines = [".text", "main:",
+             " la x5, table",
+             f" li x6, {SUMMED}",
+             " li x10, 0",
+             "loop:",
+             " lw x7, 0(x5)",
+             " add x10, x10, x7",
+             " addi x5, x5, 4",
+             " addi x6, x6, -1",
+             " bnez x6, loop",
+             " lw x11, last",
+             " lhu x12, halves",
+             " lbu x13, bytes",
+             " ecall",
+             ".data",
+             "msg: .asciz \"lookup tables\"",
+             ".align 2",
+             "table:"]
+    lines += directive_lines(".word", words[:-1])
+    lines += ["last:", f" .word {words[-1]}", "halves:"]
+    lines += directive_lines(".half", halves)
+    lines += ["bytes:"]
+    lines += directive_lines(".byte", bytes_)
+    return "\n".join(lines) + "\n"
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 262144
+    words, halves, bytes_ = make_tables(n)
+    src = make_program(words, halves, bytes_)
+    lexer, parser = make_front_end()
+    t0 = time.perf_counter()
+    statements = parser.parse(lexer.tokenize(src))
+    t1 = time.perf_counter()
+    symtab, program, data = pass1(statements)
+    t2 = time.perf_counter()
+    machine = pass2(program, symtab, data)
+    t3 = time.perf_counter()
+    image_bytes(machine)
+    t4 = time.perf_counter()
+    print(f"{len(src) / 1e6:.1f} MB source, {len(data.image) / (1 << 20):.2f} MiB data image")
+    print(f"parse {t1 - t0:.2f}s  pass1 {t2 - t1:.2f}s  pass2 {t3 - t2:.2f}s  image {t4 - t3:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# ---------------------------
+# Benchmark: error reporting (assembler.diagnostics)
+# Generates a large program, then a copy with errors of every phase
+# injected (an illegal character, a malformed operand list, a redefined
+# label, an immediate out of range, an unknown mnemonic, an undefined
+# label), and compares the time collect-all and fail-fast take on it with
+# assembling the clean program (tests/test_diagnostics.py checks that each
+# error is reported at its line, column and phase).
+# Usage: python benchmarks/bench_diagnostics.py [lines] [errors]
+#        (default 200000, 60)
+# ---------------------------
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.diagnostics import AssemblyError, Diagnostics
+from assembler.pipeline import assemble, make_front_end
+
+BODY = [
+    " addi x5, x5, 10",
+    " add x6, x5, x7",
+    " lw x8, 4(x6)",
+    " beq x5, x6, loop{}",
+    " sw x8, 8(x2)",
+]
+
+# phase -> a broken line in its place
+ERRORS = {
+    'lex': " $ addi x5, x5, 1",
+    'parse': " add x6, x5,",
+    'pass1': " loop{}:",
+    'pass2': [" addi x5, x5, 5000", " frob x5, x6", " beq x5, x6, nowhere"],
+}
+
+def make_program(n_lines):
+    lines = []
+    label = 0
+    while len(lines) < n_lines:
+        lines.append(f"loop{label}:")
+        lines += [BODY[k % len(BODY)].format(label) for k in range(len(BODY) * 40)]
+        label += 1
+    lines.append(" ecall")
+    return lines
+
+def inject(lines, n_errors, rng):
+    # -> broken lines
+    broken = list(lines)
+    phases = sorted(ERRORS)
+    # never break a label line (the branches of its block would fail too)
+    spots = rng.sample([i for i, line in enumerate(lines) if line.startswith(' ')], n_errors)
+    for k, i in enumerate(sorted(spots)):
+        phase = phases[k % len(phases)]
+        line = ERRORS[phase]
+        if phase == 'pass1':
+            # the label of the block the line is in: defined above it
+            line = line.format(i // (len(BODY) * 40 + 1))
+        elif phase == 'pass2':
+            line = rng.choice(line)
+        broken[i] = line
+    return broken
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    n_errors = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    rng = random.Random(1)
+    lines = make_program(n_lines)
+    broken = inject(lines, n_errors, rng)
+    clean = "\n".join(lines) + "\n"
+    bad = "\n".join(broken) + "\n"
+    lexer, parser = make_front_end()
+
+    t0 = time.perf_counter()
+    words = assemble(clean, lexer, parser)
+    t1 = time.perf_counter()
+    try:
+        assemble(bad, lexer, parser, diag=Diagnostics('bad.asm', bad, collect=True))
+        found = []
+    except AssemblyError as e:
+        found = e.diagnostics
+    t2 = time.perf_counter()
+    try:
+        assemble(bad, lexer, parser, source='bad.asm')
+    except AssemblyError:
+        pass
+    t3 = time.perf_counter()
+
+    print(f"{len(lines):,} lines, {len(words):,} words, {n_errors} errors injected")
+    print(f"clean {t1 - t0:.2f}s  collect-all {t2 - t1:.2f}s ({len(found)} found)  "
+          f"fail-fast {t3 - t2:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# ---------------------------
+# Benchmark: disassembler
+# Times bulk disassembly of a large image, NumPy path vs the pure-Python
+# path (tests/test_disasm.py checks the round trip through the assembler).
+# Usage: python benchmarks/bench_disasm.py [n_words]   (default 1M)
+# ---------------------------
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler import disasm
+from assembler.disasm import disassemble_words
+from assembler.instructions import INSTR_TABLE, AsmContext
+
+def random_operands(rng, spec):
+    reg = lambda: ('reg', rng.randrange(32))
+    layout = spec.layout
+    if layout == 'rrr':
+        return [reg(), reg(), reg()]
+    if layout == 'rri':
+        return [reg(), reg(), ('imm', rng.randint(-2048, 2047))]
+    if layout == 'shift':
+        return [reg(), reg(), ('imm', rng.randrange(32))]
+    if layout in ('load', 'store'):
+        return [reg(), ('memoff', rng.randint(-2048, 2047), rng.randrange(32))]
+    if layout == 'branch':
+        return [reg(), reg(), ('imm', rng.randrange(-4096, 4096, 2))]
+    if layout == 'upper':
+        return [reg(), ('imm', rng.randrange(1 << 20) << 12)]
+    if layout == 'jump':
+        return [reg(), ('imm', rng.randrange(-(1 << 20), 1 << 20, 2))]
+    return []
+
+def bench(n_words):
+    rng = random.Random(2)
+    ctx = AsmContext({}, 0)
+    # an image made of a few thousand distinct instructions, as real code is
+    pool = [spec.encode(random_operands(rng, spec), ctx)
+            for spec in rng.choices(list(INSTR_TABLE.values()), k=5000)]
+    words = [rng.choice(pool) for _ in range(n_words)]
+    symtab = {f"l{i}": 4 * i for i in range(0, n_words, 64)}
+    t0 = time.perf_counter()
+    disassemble_words(words, 0, symtab)
+    t1 = time.perf_counter()
+    names = {addr: name for name, addr in symtab.items()}
+    disasm._disassemble_py(words, 0, names)
+    t2 = time.perf_counter()
+    print(f"{n_words:,} words  numpy {t1 - t0:.3f}s ({n_words / (t1 - t0):,.0f} words/s)  "
+          f"python {t2 - t1:.3f}s ({n_words / (t2 - t1):,.0f} words/s)")
+
+def main():
+    n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    bench(n_words)
+
+if __name__ == '__main__':
+    main()
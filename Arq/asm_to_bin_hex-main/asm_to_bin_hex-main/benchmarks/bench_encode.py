@@ -0,0 +1,62 @@
+# ---------------------------
+# Benchmark: encode throughput (instructions per second), both the bare
+# INSTR_TABLE encoders and the whole of pass2
+# Usage: python benchmarks/bench_encode.py [n_instrs] [repeat]
+# ---------------------------
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.nodes import Instr, Label
+from assembler.instructions import AsmContext, INSTR_TABLE
+from assembler.passes import pass1, pass2
+
+MIX = [
+    Instr('add', [('reg', 5), ('reg', 6), ('reg', 7)]),
+    Instr('sub', [('reg', 5), ('reg', 6), ('reg', 7)]),
+    Instr('addi', [('reg', 5), ('reg', 5), ('imm', 10)]),
+    Instr('xori', [('reg', 5), ('reg', 6), ('imm', -1)]),
+    Instr('lb', [('reg', 8), ('memoff', 4, 6)]),
+    Instr('sb', [('reg', 8), ('memoff', 8, 6)]),
+    Instr('beq', [('reg', 5), ('reg', 6), ('sym', 'loop')]),
+    Instr('bne', [('reg', 5), ('reg', 6), ('sym', 'loop')]),
+    Instr('jal', [('reg', 1), ('sym', 'loop')]),
+    Instr('lui', [('reg', 3), ('imm', 0x12345000)]),
+]
+
+def make_program(n_instrs):
+    statements = [Label('loop')]
+    for i in range(n_instrs):
+        statements.append(MIX[i % len(MIX)])
+    return statements
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    symtab, program, _ = pass1(make_program(n))
+
+    ctx = AsmContext(symtab, 0)
+    pairs = [(INSTR_TABLE[ins.mnemonic].encode, ins.operands) for pc, ins in program]
+    def encode_only():
+        for encode, ops in pairs:
+            encode(ops, ctx)
+    best = best_of(repeat, encode_only)
+    print(f"table encode: {n} instructions  best {best:.3f}s  {n / best:,.0f} instr/s")
+
+    best = best_of(repeat, lambda: pass2(program, symtab))
+    print(f"pass2:        {n} instructions  best {best:.3f}s  {n / best:,.0f} instr/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# ---------------------------
+# Benchmark: incremental re-assembly after a one-function edit
+# Assembles a generated source with many labelled functions, edits one
+# function in the middle (which shifts everything after it) and compares
+# a full re-assembly with IncrementalAssembler.
+# Usage: python benchmarks/bench_incremental.py [n_functions]
+# ---------------------------
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.incremental import IncrementalAssembler
+from assembler.pipeline import assemble
+
+def make_source(n_funcs, extra=0):
+    # every function calls the next one; function n_funcs // 2 gets `extra` nops
+    out = []
+    for i in range(n_funcs):
+        out.append(f"f{i}:\n")
+        out.append("  addi x5, x5, 1\n  add x6, x5, x7\n  lb x8, 4(x6)\n")
+        out.append(f"  beq x5, x6, f{i}\n")
+        if i == n_funcs // 2:
+            out.append("  nop\n" * extra)
+        out.append(f"  jal x1, f{(i + 1) % n_funcs}\n  ret\n")
+    return ''.join(out)
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    before, after = make_source(n), make_source(n, extra=3)
+    inc = IncrementalAssembler()
+    _, cold = timed(inc.assemble, before)
+    machine, warm = timed(inc.assemble, after)
+    stats = dict(inc.stats)
+    full, t_full = timed(assemble, after)
+    if machine != full:
+        raise SystemExit("MISMATCH between incremental and full assembly")
+    print(f"{n} functions, {len(full)} words")
+    print(f"full assembly:        {t_full:.3f}s")
+    print(f"incremental (cold):   {cold:.3f}s")
+    print(f"incremental (1 edit): {warm:.3f}s  reparsed {stats['parsed']}/{stats['chunks']} chunks, "
+          f"re-encoded {stats['encoded']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# ---------------------------
+# Benchmark: object files and the linker (assembler.objfile,
+# assembler.link)
+# Generates a program split into modules that call each other and refer to
+# each other's .data, then builds it three ways:
+#   monolithic  all modules concatenated into one source, assembled at once
+#   modular     every module assembled to an object (in parallel), linked
+#   relink      one module changed: only it is re-assembled, then linked
+# (tests/test_link.py checks that the linked image equals the monolithic
+# one and computes the expected sum.)
+# Usage: python benchmarks/bench_link.py [modules] [filler_per_module] [jobs]
+#        (default 64, 2000, CPU count)
+# ---------------------------
+
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.link import image_machine, link
+from assembler.objfile import assemble_object
+from assembler.pipeline import assemble
+
+def make_modules(n, filler, seed=1):
+    # module 0 calls f1..f{n-1}; module i adds its constant and its .data
+    # word to x10, plus the address of the next module's value (masked
+    # to its low bit so the sum stays easy to predict)
+    rng = random.Random(seed)
+    consts = [rng.randrange(1, 1000) for _ in range(n)]
+    values = [rng.randrange(1 << 20) for _ in range(n)]
+    main = [".text", ".globl main", "main:", " li x10, 0"]
+    main += [f" call f{i}" for i in range(1, n)]
+    main += [" ecall", ".data", "v0: .word 0"]
+    modules = ["\n".join(main) + "\n"]
+    for i in range(1, n):
+        nxt = i + 1 if i + 1 < n else 1
+        lines = [".text", f".globl f{i}", f".globl v{i}", f"f{i}:",
+                 f" addi x10, x10, {consts[i]}",
+                 f" lw x11, v{i}",
+                 " add x10, x10, x11",
+                 f" lw x12, p{i}",
+                 " lw x12, 0(x12)",
+                 " andi x12, x12, 1",
+                 " add x10, x10, x12",
+                 " ret"]
+        lines += [" addi x7, x7, 1"] * filler  # never executed
+        lines += [".data", f"v{i}: .word {values[i]}", f"p{i}: .word v{nxt}"]
+        modules.append("\n".join(lines) + "\n")
+    expected = 0
+    for i in range(1, n):
+        nxt = i + 1 if i + 1 < n else 1
+        expected += consts[i] + values[i] + (values[nxt] & 1)
+    return modules, expected & 0xFFFFFFFF
+
+def monolithic(modules):
+    # .globl is only meaningful between modules; one source needs none
+    return "".join(line + "\n" for m in modules for line in m.splitlines()
+                   if not line.startswith(".globl"))
+
+def build_objects(modules, jobs):
+    if jobs == 1:
+        return list(map(assemble_object, modules))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(assemble_object, modules, chunksize=max(1, len(modules) // (jobs * 4))))
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    filler = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    jobs = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+    modules, _ = make_modules(n, filler)
+
+    t0 = time.perf_counter()
+    mono = assemble(monolithic(modules))
+    t1 = time.perf_counter()
+    objects = build_objects(modules, jobs)
+    t2 = time.perf_counter()
+    image, _ = link(objects)
+    image_machine(image)
+    t3 = time.perf_counter()
+
+    # change one module's constant: re-assemble it alone and relink
+    k = n // 2
+    modules[k] = re.sub(r"addi x10, x10, (\d+)", lambda m: f"addi x10, x10, {int(m[1]) + 1}",
+                        modules[k], count=1)
+    t4 = time.perf_counter()
+    objects[k] = assemble_object(modules[k])
+    image, _ = link(objects)
+    image_machine(image)
+    t5 = time.perf_counter()
+
+    print(f"{n} modules, {len(mono):,} words")
+    print(f"monolithic {t1 - t0:.2f}s  modular {t2 - t1:.2f}s + link {t3 - t2:.3f}s ({jobs} jobs)  "
+          f"relink after one change {t5 - t4:.3f}s")
+
+if __name__ == '__main__':
+    main()
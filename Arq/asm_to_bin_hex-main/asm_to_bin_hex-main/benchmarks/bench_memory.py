@@ -0,0 +1,84 @@
+# ---------------------------
+# Benchmark: peak memory of parsing and assembling a big source
+# Writes a synthetic source (the bench_stream line mix plus pseudo-
+# instructions) and, in a fresh process per run, parses it into statements
+# and assembles it, reporting wall time and peak RSS. With --compare DIR
+# the same runs are made against another checkout of the repo (e.g. one
+# made with git worktree at an older commit), for a before/after table.
+# Usage: python benchmarks/bench_memory.py [lines] [--compare DIR]
+#        (default 1000000)
+# ---------------------------
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BODY = [
+    "addi x5, x5, 10",
+    "add x6, x5, x7",
+    "lw x8, 4(x6)",
+    "beq x5, x6, loop{}",
+    "li x9, 100000",
+    "sw x9, 8(x2)",
+    "la x3, loop{}",
+]
+LABEL_EVERY = 100  # lines
+
+# child process: parse (or assemble), then print the statement or word
+# count and peak RSS in KiB
+CHILD = """
+import resource, sys
+mode, src = sys.argv[1:]
+with open(src) as f:
+    txt = f.read()
+if mode == 'parse':
+    from assembler.pipeline import parse_source
+    n = len(parse_source(txt))
+else:
+    from assembler.pipeline import assemble
+    n = len(assemble(txt))
+print(n, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def write_source(path, n_lines):
+    with open(path, 'w') as f:
+        for n in range(0, n_lines, LABEL_EVERY):
+            label = n // LABEL_EVERY
+            f.write(f"loop{label}:\n")
+            f.write(''.join(f" {BODY[k % len(BODY)].format(label)}\n" for k in range(LABEL_EVERY)))
+        f.write(" ecall\n")
+
+def run(root, mode, src):
+    t0 = time.perf_counter()
+    res = subprocess.run([sys.executable, '-c', CHILD, mode, src], cwd=root,
+                         check=True, capture_output=True, text=True)
+    count, rss = res.stdout.split()[-2:]
+    return time.perf_counter() - t0, int(count), int(rss) / 1024
+
+def main():
+    args = sys.argv[1:]
+    other = None
+    if '--compare' in args:
+        i = args.index('--compare')
+        other = os.path.abspath(args[i + 1])
+        del args[i:i + 2]
+    n_lines = int(args[0]) if args else 1_000_000
+    roots = [('this tree', ROOT)] + ([('compared', other)] if other else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, 'big.asm')
+        write_source(src, n_lines)
+        size = os.path.getsize(src) / 1e6
+        print(f"{n_lines:,} lines, {size:.1f} MB source")
+        for mode in ('parse', 'assemble'):
+            for name, root in roots:
+                dt, count, rss = run(root, mode, src)
+                what = 'statements' if mode == 'parse' else 'words'
+                print(f"{mode:9} {name:10} {dt:7.2f}s  peak RSS {rss:8.1f} MB  "
+                      f"({count:,} {what})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# ---------------------------
+# Benchmark + cross-check: -O (assembler.optimize)
+# Assembles generated programs with and without -O, runs both in the
+# simulator and checks they compute the same result (a0..a7), then reports
+# code size, instructions executed and assembly time. One program puts a
+# function past jal's 1 MiB reach, so call relaxation must keep auipc+jalr
+# for it; another pads with nops that -O deletes, pulling a far function
+# back into jal reach (the layout has to iterate for that).
+# Usage: python benchmarks/bench_optimize.py [n_blocks] [padding_words]
+#        (default 2000, 262200)
+# ---------------------------
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.pipeline import assemble
+from assembler.sim import Sim
+
+CONSTANTS = [0, 5, -2048, 2047, 2048, 0x1000, -4096, 0x7FFFF000, 12345678, -987654, 0x80000]
+
+def make_program(n_blocks, padding, pad_line, seed=1):
+    rng = random.Random(seed)
+    lines = ["main:", " li x10, 0"]
+    for _ in range(n_blocks):
+        lines += [f" li x11, {rng.choice(CONSTANTS)}",
+                  " add x10, x10, x11",
+                  " mv x11, x11",
+                  " nop",
+                  " addi x0, x10, 1",
+                  f" call f{rng.randrange(4)}"]
+    lines += [" call far", " tail done"]
+    for j in range(4):
+        lines += [f"f{j}:", f" addi x10, x10, {j + 1}", " slli x12, x10, 1", " xor x10, x10, x12", " ret"]
+    lines += [pad_line] * padding
+    lines += ["far:", " xori x10, x10, 0x55", " ret", "done:", " ecall"]
+    return "\n".join(lines) + "\n"
+
+def run(machine):
+    sim = Sim(mem_size=8 << 20)
+    sim.load(machine)
+    stats = sim.run(10_000_000)
+    return [sim.reg(r) for r in range(10, 18)], stats
+
+def compare(name, src):
+    t0 = time.perf_counter()
+    plain = assemble(src)
+    t1 = time.perf_counter()
+    opt = assemble(src, optimize=True)
+    t2 = time.perf_counter()
+    regs_plain, stats_plain = run(plain)
+    regs_opt, stats_opt = run(opt)
+    ok = regs_plain == regs_opt and stats_plain['halt'] == stats_opt['halt'] == 'ecall'
+    print(f"{name:<14} words {len(plain):>8,} -> {len(opt):>8,} ({1 - len(opt) / len(plain):6.1%} smaller)  "
+          f"executed {stats_plain['steps']:>7,} -> {stats_opt['steps']:>7,}  "
+          f"assemble {t1 - t0:.2f}s / -O {t2 - t1:.2f}s  {'same result' if ok else 'MISMATCH'}")
+    return 0 if ok else 1
+
+def main():
+    n_blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    padding = int(sys.argv[2]) if len(sys.argv) > 2 else 262200
+    failures = 0
+    failures += compare("near", make_program(n_blocks, 0, " addi x7, x7, 1"))
+    failures += compare("far call", make_program(n_blocks, padding, " addi x7, x7, 1"))
+    failures += compare("nop padding", make_program(n_blocks, padding, " nop"))
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
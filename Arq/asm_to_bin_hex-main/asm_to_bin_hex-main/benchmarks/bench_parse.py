@@ -0,0 +1,50 @@
+# ---------------------------
+# Benchmark: lexing + parsing time for large generated sources
+# Usage: python benchmarks/bench_parse.py [n_lines ...]   (default 10k 100k 1M)
+# ---------------------------
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.pipeline import FRONT_ENDS, make_front_end
+
+BODY = [
+    "addi x5, x5, 10",
+    "add x6, x5, x7",
+    "lb x8, 4(x6)",
+    "beq x5, x6, loop",
+    "li x9, 100",
+    "",
+]
+
+def make_source(n_lines):
+    lines = ["loop:"]
+    i = 0
+    while len(lines) < n_lines:
+        lines.append(BODY[i % len(BODY)])
+        i += 1
+    return "\n".join(lines) + "\n"
+
+def bench(n_lines, front_end):
+    txt = make_source(n_lines)
+    lexer, parser = make_front_end(front_end)
+    t0 = time.perf_counter()
+    tokens = list(lexer.tokenize(txt))
+    t1 = time.perf_counter()
+    statements = parser.parse(iter(tokens))
+    t2 = time.perf_counter()
+    total = t2 - t0
+    print(f"{front_end:>4} {n_lines:>9} lines  lex {t1 - t0:8.3f}s  parse {t2 - t1:8.3f}s  "
+          f"total {total:8.3f}s  {n_lines / total:>10.0f} lines/s  ({len(statements)} statements)")
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for n in sizes:
+        for front_end in FRONT_ENDS:
+            bench(n, front_end)
+
+if __name__ == '__main__':
+    main()
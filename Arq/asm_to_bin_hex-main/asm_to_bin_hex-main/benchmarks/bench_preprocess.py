@@ -0,0 +1,97 @@
+# ---------------------------
+# Benchmark: the preprocessor (assembler.preprocess)
+# Generates a templated program: an included library of .equ constants and
+# parameterized macros, a main file invoking them with random arguments
+# and .rept blocks. The same program is also written out flat (expanded
+# here in Python; tests/test_preprocess.py checks that both give the same
+# words). The time to get the statements from the templated source
+# (include, expansion, parse) is compared with lexing and parsing the flat
+# text, and the templated source is parsed again to show the cached
+# include tokens and the memoized expansions at work.
+# Usage: python benchmarks/bench_preprocess.py [invocations] [macros]
+#        (default 100000, 50)
+# ---------------------------
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.pipeline import make_front_end, parse_source
+
+BODY_OPS = ('add', 'sub', 'xor', 'or', 'and')
+
+def make_library(n_macros, rng):
+    # -> (library text, {name: (constant, [(op, scratch register), ...])})
+    lines = []
+    macros = {}
+    for m in range(n_macros):
+        const = rng.randrange(-2048, 2048)
+        body = [(rng.choice(BODY_OPS), rng.randrange(5, 8)) for _ in range(rng.randrange(2, 6))]
+        macros[f"m{m}"] = (const, body)
+        lines.append(f".equ K{m}, {const}")
+        lines.append(f".macro m{m} rd, rs, imm")
+        lines.append(f" addi \\rd, \\rs, K{m}")
+        for op, scratch in body:
+            lines.append(f" {op} \\rd, \\rd, x{scratch}")
+        lines.append(" xori \\rd, \\rd, \\imm")
+        lines.append(".endm")
+    return "\n".join(lines) + "\n", macros
+
+def expand(name, rd, rs, imm, macros):
+    const, body = macros[name]
+    lines = [f" addi x{rd}, x{rs}, {const}"]
+    lines += [f" {op} x{rd}, x{rd}, x{scratch}" for op, scratch in body]
+    lines.append(f" xori x{rd}, x{rd}, {imm}")
+    return lines
+
+def make_program(n_calls, macros, rng):
+    # -> (templated main text, flat text)
+    names = sorted(macros)
+    main = ['.include "lib.asm"', "main:"]
+    flat = ["main:"]
+    i = 0
+    while i < n_calls:
+        name = rng.choice(names)
+        rd, rs, imm = rng.randrange(10, 16), rng.randrange(10, 16), rng.randrange(-100, 100)
+        if rng.random() < 0.05:
+            count = rng.randrange(2, 20)
+            main += [f" .rept {count}", f" {name} x{rd}, x{rs}, {imm}", " .endr"]
+            flat += expand(name, rd, rs, imm, macros) * count
+            i += count
+        else:
+            main.append(f" {name} x{rd}, x{rs}, {imm}")
+            flat += expand(name, rd, rs, imm, macros)
+            i += 1
+    main.append(" ecall")
+    flat.append(" ecall")
+    return "\n".join(main) + "\n", "\n".join(flat) + "\n"
+
+def main():
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_macros = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(1)
+    library, macros = make_library(n_macros, rng)
+    templated, flat = make_program(n_calls, macros, rng)
+    lexer, parser = make_front_end()
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "lib.asm"), "w") as f:
+            f.write(library)
+        source = os.path.join(tmp, "main.asm")
+        t0 = time.perf_counter()
+        statements = parse_source(templated, lexer, parser, source)
+        t1 = time.perf_counter()
+        parse_source(templated, lexer, parser, source)
+        t2 = time.perf_counter()
+        parse_source(flat, lexer, parser)
+        t3 = time.perf_counter()
+    print(f"templated source {len(templated) / 1e6:.2f} MB + {len(library) / 1e3:.0f} kB library, "
+          f"flat {len(flat) / 1e6:.2f} MB, {len(statements):,} statements")
+    print(f"templated: preprocess+parse {t1 - t0:.2f}s (again {t2 - t1:.2f}s)  "
+          f"flat: lex+parse {t3 - t2:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# ---------------------------
+# Benchmark: phase profiling (assembler.profiling)
+# Assembles one big source (the bench_memory line mix) without a Profile,
+# with one (--stats) and with one tracing memory (--profile), and shows how
+# much of the wall time the top-level phases account for
+# (tests/test_profile.py checks that all three give the same words). The
+# run without a Profile is what every assembly pays; the checks it does
+# (one per phase) are not measurable against it, see the spread between
+# the repeats.
+# Usage: python benchmarks/bench_profile.py [lines] [repeats]
+#        (default 300000, 3)
+# ---------------------------
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.pipeline import assemble, make_front_end
+from assembler.profiling import Profile
+
+from bench_memory import BODY, LABEL_EVERY
+
+def make_source(n_lines):
+    lines = []
+    for n in range(0, n_lines, LABEL_EVERY):
+        label = n // LABEL_EVERY
+        lines.append(f"loop{label}:")
+        lines += [f" {BODY[k % len(BODY)].format(label)}" for k in range(LABEL_EVERY)]
+    lines.append(" ecall")
+    return "\n".join(lines) + "\n"
+
+def run(txt, lexer, parser, memory=None):
+    # -> (seconds, words, profile or None)
+    profile = None if memory is None else Profile(memory)
+    t0 = time.perf_counter()
+    machine = assemble(txt, lexer, parser, profile=profile)
+    dt = time.perf_counter() - t0
+    if profile is not None:
+        profile.close()
+    return dt, machine, profile
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    txt = make_source(n_lines)
+    lexer, parser = make_front_end()
+
+    plain = [run(txt, lexer, parser) for _ in range(repeats)]
+    stats = [run(txt, lexer, parser, False) for _ in range(repeats)]
+    traced = run(txt, lexer, parser, True)
+    words = plain[0][1]
+    dt, _, profile = stats[0]
+    covered = sum(ph.seconds for name, ph in profile.phases.items() if '.' not in name)
+
+    best = min(p[0] for p in plain)
+    print(f"{n_lines:,} lines, {len(words):,} words")
+    print(f"no profile  best {best:6.2f}s  (repeats {', '.join(f'{p[0]:.2f}' for p in plain)})")
+    s = min(p[0] for p in stats)
+    print(f"--stats     best {s:6.2f}s  x{s / best:.2f}  "
+          f"(phases cover {covered:.2f}s of {dt:.2f}s)")
+    print(f"--profile        {traced[0]:6.2f}s  x{traced[0] / best:.2f}")
+    print(profile.format())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# ---------------------------
+# Benchmark: branch/jump relaxation (assembler.relax)
+# Generates a large state machine whose states branch to random other
+# states, so most branches are out of their 4 KiB reach (and, with padding
+# between states, many jal too), and compares the time pass1 takes with
+# the plain layout alone (tests/test_relax.py checks the relaxed code).
+# Usage: python benchmarks/bench_relax.py [n_states] [steps]
+#        (default 20000, 50000)
+# ---------------------------
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.passes import layout, pass1
+from assembler.pipeline import make_front_end
+
+def make_machine(n_states, seed=1):
+    # per state: (constant added to x10, next state if x10 is odd, if even)
+    rng = random.Random(seed)
+    return [(rng.randrange(1, 2000), rng.randrange(n_states), rng.randrange(n_states))
+            for _ in range(n_states)]
+
+def make_program(machine, steps, padding):
+    lines = ["main:", " li x10, 0", f" li x5, {steps}", " jal x0, s0"]
+    for i, (c, odd, even) in enumerate(machine):
+        lines += [f"s{i}:",
+                  f" addi x10, x10, {c}",
+                  " addi x5, x5, -1",
+                  " beq x5, x0, done",
+                  " andi x12, x10, 1",
+                  f" bne x12, x0, s{odd}",
+                  f" jal x0, s{even}"]
+        lines += [" addi x7, x7, 1"] * padding  # never executed
+    lines += ["done:", " ecall"]
+    return "\n".join(lines) + "\n"
+
+def bench(name, machine, steps, padding):
+    src = make_program(machine, steps, padding)
+    lexer, parser = make_front_end()
+    statements = parser.parse(lexer.tokenize(src))
+    t0 = time.perf_counter()
+    plain = list(layout(statements, {}))
+    t1 = time.perf_counter()
+    symtab, program, _ = pass1(statements)
+    t2 = time.perf_counter()
+    print(f"{name:<10} words {len(plain):>9,} -> {len(program):>9,} (+{len(program) - len(plain):,} relaxed)  "
+          f"layout {t1 - t0:.2f}s  pass1 with relaxation {t2 - t1:.2f}s")
+
+def main():
+    n_states = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    machine = make_machine(n_states)
+    bench("compact", machine, steps, 0)      # branches relaxed to jal
+    bench("padded", machine, steps, 12)      # jal relaxed to auipc+jalr too
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# ---------------------------
+# Benchmark: sharded pass2 (assembler.shard)
+# Lays out one big program (the bench_encode instruction mix), then times
+# pass2 serially and split across 2..N worker processes
+# (tests/test_shard.py checks that they give the serial words, in order).
+# The sharded runs call the pool directly: pass2 itself never starts more processes than there are CPUs,
+# so on a machine with fewer cores than jobs the extra processes only show
+# the pool's overhead.
+# Usage: python benchmarks/bench_shard.py [n_instrs] [max_jobs]
+#        (default 2000000, CPU count but at least 2)
+# ---------------------------
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.passes import pass1, pass2
+from assembler.shard import encode_sharded
+
+from bench_encode import make_program
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    cores = os.cpu_count() or 1
+    max_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else max(2, cores)
+    symtab, program, _ = pass1(make_program(n))
+
+    t0 = time.perf_counter()
+    pass2(program, symtab)
+    base = time.perf_counter() - t0
+    print(f"{n:,} instructions, {cores} CPU(s)")
+    print(f"serial      {base:6.2f}s  {n / base:12,.0f} instr/s")
+    jobs = 2
+    while jobs <= max_jobs:
+        t0 = time.perf_counter()
+        encode_sharded(program, symtab, jobs)
+        dt = time.perf_counter() - t0
+        print(f"{jobs:2} jobs     {dt:6.2f}s  {n / dt:12,.0f} instr/s  x{base / dt:.2f}"
+              f"{'  (more jobs than CPUs)' if jobs > cores else ''}")
+        jobs *= 2
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# ---------------------------
+# Benchmark: instruction-set simulator
+# Times a loop-heavy program under both dispatch modes and reports
+# instructions per second (tests/test_sim.py checks the results).
+# Usage: python benchmarks/bench_sim.py [loop_iterations]   (default 200k)
+# ---------------------------
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assembler.pipeline import assemble
+from assembler.sim import Sim
+
+# nested loops over an array: loads, stores, ALU ops and branches
+LOOP = """
+ li x10, 0x1000
+ li x11, {n}
+outer:
+ li x12, 16
+ mv x13, x10
+inner:
+ lw x14, 0(x13)
+ add x14, x14, x11
+ sw x14, 0(x13)
+ addi x13, x13, 4
+ addi x12, x12, -1
+ bnez x12, inner
+ addi x11, x11, -1
+ bnez x11, outer
+ ecall
+"""
+
+def bench(n):
+    program = assemble(LOOP.format(n=n // 16))
+    ips = {}
+    for blocks, name in ((False, 'per-instruction'), (True, 'per-block')):
+        sim = Sim(blocks=blocks)
+        sim.load(program)
+        stats = sim.run()
+        ips[blocks] = stats['ips']
+        print(f"{name:<16} {stats['steps']:,} instructions in {stats['seconds']:.3f}s  "
+              f"{stats['ips']:,.0f} IPS  (halt: {stats['halt']})")
+    print(f"per-block dispatch is {ips[True] / ips[False]:.1f}x faster")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    bench(n)
+
+if __name__ == '__main__':
+    main()
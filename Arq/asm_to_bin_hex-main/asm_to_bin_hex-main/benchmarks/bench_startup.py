@@ -0,0 +1,47 @@
+# ---------------------------
+# Benchmark: cold start, i.e. time to first word for a 1-line program
+# Each run is a fresh `python -m assembler.main --no-cache` process, so it
+# measures interpreter start, imports and front end setup.
+# Usage: python benchmarks/bench_startup.py [runs]   (default 20)
+# ---------------------------
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_once(args):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'assembler.main', '--no-cache'] + args,
+                   cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+def bench(name, args, runs):
+    run_once(args)  # warm the OS file cache and __pycache__
+    times = [run_once(args) for _ in range(runs)]
+    print(f"{name:<16} median {statistics.median(times) * 1000:7.1f} ms  "
+          f"min {min(times) * 1000:7.1f} ms  ({runs} runs)")
+    return statistics.median(times)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        asm = os.path.join(tmp, 'one.asm')
+        with open(asm, 'w') as f:
+            f.write("addi x1, x0, 1\n")
+        outputs = [os.path.join(tmp, 'one.hex'), os.path.join(tmp, 'one.bin')]
+        # interpreter start alone, for reference
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        print(f"{'python -c pass':<16} mean   {(time.perf_counter() - t0) / runs * 1000:7.1f} ms")
+        line = bench('--parser line', ['--parser', 'line', asm] + outputs, runs)
+        sly = bench('--parser sly', ['--parser', 'sly', asm] + outputs, runs)
+        print(f"line front end starts {sly / line:.2f}x faster")
+
+if __name__ == '__main__':
+    main()
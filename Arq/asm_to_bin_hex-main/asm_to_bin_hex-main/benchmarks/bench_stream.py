@@ -0,0 +1,86 @@
+# ---------------------------
+# Benchmark: peak memory of --stream vs in-memory assembly
+# Writes a synthetic source of the given size and assembles it in a fresh
+# process per run, reporting wall time and peak RSS. Streaming should stay
+# flat as the source grows; in-memory assembly grows with it, so it is only
+# run up to --max-inmem MB.
+# Usage: python benchmarks/bench_stream.py [size_mb ...] [--max-inmem MB]
+#        (default 4 16 64, in-memory up to 16 MB; multi-GB sizes work but take a while)
+# ---------------------------
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BODY = [
+    "addi x5, x5, 10",
+    "add x6, x5, x7",
+    "lb x8, 4(x6)",
+    "beq x5, x6, loop{}",
+    "li x9, 100000",
+    "sw x9, 8(x2)",
+]
+LABEL_EVERY = 800  # lines; labels are the one thing streaming keeps (and
+                   # each block's branch back to its label must stay in reach)
+
+# child process: assemble, then print peak RSS in KiB
+CHILD = """
+import resource, sys
+mode, src, out = sys.argv[1:]
+if mode == 'stream':
+    from assembler.stream import assemble_stream
+    assemble_stream(src, 'raw', [out])
+else:
+    from assembler.pipeline import assemble
+    from assembler.iohelpers import write_raw
+    with open(src) as f:
+        write_raw(assemble(f.read()), out)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def write_source(path, size_mb):
+    target = size_mb * 1024 * 1024
+    block = []
+    n = 0
+    for i in range(LABEL_EVERY):
+        line = BODY[i % len(BODY)]
+        block.append(line.format(0) + "\n")
+    block_len = sum(map(len, block))
+    with open(path, 'w') as f:
+        written = 0
+        while written < target:
+            f.write(f"loop{n}:\n")
+            f.write(''.join(block).replace("loop0", f"loop{n}"))
+            written += block_len
+            n += 1
+
+def run(mode, src, out):
+    t0 = time.perf_counter()
+    res = subprocess.run([sys.executable, '-c', CHILD, mode, src, out], cwd=ROOT,
+                         check=True, capture_output=True, text=True)
+    return time.perf_counter() - t0, int(res.stdout.split()[-1]) / 1024
+
+def main():
+    args = sys.argv[1:]
+    max_inmem = 16
+    if '--max-inmem' in args:
+        i = args.index('--max-inmem')
+        max_inmem = int(args[i + 1])
+        del args[i:i + 2]
+    sizes = [int(a) for a in args] or [4, 16, 64]
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, 'big.asm')
+        out = os.path.join(tmp, 'big.img')
+        for size in sizes:
+            write_source(src, size)
+            modes = ['stream'] + (['in-memory'] if size <= max_inmem else [])
+            for mode in modes:
+                seconds, rss = run(mode, src, out)
+                print(f"{size:>6} MB source  {mode:<9}  {seconds:8.1f}s  peak RSS {rss:8.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# ---------------------------
+# Benchmark suite: the whole pipeline on generated programs, against a
+# saved baseline
+# Each case is a program from gen_program with its own mix (default, no
+# pseudo-instructions, pseudo-heavy, label-dense, far branches that need
+# relaxation, comment-heavy). Every run is a fresh process that reads the
+# source, assembles it (lex, parse, pass1, pass2) and writes the .hex and
+# .bin, and reports lines/s, words/s and peak RSS; the best of --repeat
+# runs counts. --phases adds one profiled run per case (assembler.profiling)
+# for the time of each phase; it lexes up front, so its memory isn't used.
+#
+# --save FILE writes the results as a JSON baseline; --baseline FILE
+# compares with one and flags a case whose throughput dropped by more than
+# --tolerance or whose peak RSS grew by more than --memory-tolerance, or
+# whose output differs from the baseline's (a digest of the .hex). Any
+# flag makes the exit status 1, for CI. Baselines only compare on the same
+# machine and the same --lines; on a busy or single-core machine the run
+# to run spread can pass the default tolerance, so raise it or --repeat.
+# Usage: python benchmarks/bench_suite.py [--lines N] [--repeat N]
+#        [--only CASE,...] [--phases] [--save FILE] [--baseline FILE]
+#        [--tolerance F] [--memory-tolerance F]
+#        (default 100000 lines, 3 repeats, tolerances 0.15 and 0.10)
+# ---------------------------
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from gen_program import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# case -> gen_program arguments
+CASES = {
+    'default': {},
+    'plain': {'pseudo': 0.0, 'comments': 0.0},
+    'pseudo_heavy': {'pseudo': 0.6},
+    'label_dense': {'labels': 0.25, 'branch': 50},
+    'far_branches': {'labels': 0.002, 'branch': 20000},
+    'commented': {'comments': 0.5},
+}
+
+# child process: assemble SRC, write OUT.hex and OUT.bin, print the stats
+# as JSON (imports and the front end are set up before the clock starts)
+CHILD = """
+import hashlib, json, sys, time
+src, out, phases = sys.argv[1], sys.argv[2], sys.argv[3] == '1'
+from assembler.iohelpers import write_output
+from assembler.pipeline import assemble, make_front_end
+from assembler.profiling import Profile, _max_rss
+lexer, parser = make_front_end()
+outputs = [out + '.hex', out + '.bin']
+profile = Profile() if phases else None
+t0 = time.perf_counter()
+with open(src) as f:
+    txt = f.read()
+machine = assemble(txt, lexer, parser, source=src, profile=profile)
+if profile is None:
+    write_output(machine, 'hexbin', outputs)
+else:
+    with profile.phase('write'):
+        write_output(machine, 'hexbin', outputs)
+seconds = time.perf_counter() - t0
+with open(outputs[0], 'rb') as f:
+    digest = hashlib.sha256(f.read()).hexdigest()[:16]
+print(json.dumps({
+    'seconds': seconds, 'words': len(machine), 'digest': digest,
+    'peak_rss': _max_rss(),  # bytes (ru_maxrss is KiB on Linux, bytes on macOS)
+    'phases': {name: ph.seconds for name, ph in profile.phases.items()} if profile else None,
+}))
+"""
+
+def run(src, out, phases=False):
+    res = subprocess.run([sys.executable, '-c', CHILD, src, out, '1' if phases else '0'],
+                         cwd=ROOT, check=True, capture_output=True, text=True)
+    return json.loads(res.stdout.splitlines()[-1])
+
+def measure(name, n_lines, repeat, phases, tmp):
+    # -> result dict for one case
+    src = os.path.join(tmp, name + '.asm')
+    with open(src, 'w') as f:
+        f.write(generate(n_lines, **CASES[name]))
+    out = os.path.join(tmp, name)
+    runs = [run(src, out) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r['seconds'])
+    result = {
+        'lines': n_lines,
+        'words': best['words'],
+        'digest': best['digest'],
+        'seconds': best['seconds'],
+        'lines_per_s': n_lines / best['seconds'],
+        'words_per_s': best['words'] / best['seconds'],
+        'peak_rss': max(r['peak_rss'] for r in runs),
+    }
+    if phases:
+        result['phases'] = run(src, out, phases=True)['phases']
+    return result
+
+def compare(result, base, tolerance, memory_tolerance):
+    # -> list of regressions of result against the baseline's entry
+    if base is None:
+        return []
+    flags = []
+    if result['digest'] != base['digest']:
+        flags.append(f"output differs from the baseline ({result['words']:,} words, "
+                     f"baseline {base['words']:,})")
+    # words/s moves with lines/s (same program, same time)
+    speed = result['lines_per_s'] / base['lines_per_s']
+    if speed < 1 - tolerance:
+        flags.append(f"{result['lines_per_s']:,.0f} lines/s < baseline "
+                     f"{base['lines_per_s']:,.0f} ({speed - 1:+.0%})")
+    if result['peak_rss'] > base['peak_rss'] * (1 + memory_tolerance):
+        flags.append(f"peak RSS {result['peak_rss'] / 2**20:.1f}MB > baseline "
+                     f"{base['peak_rss'] / 2**20:.1f}MB "
+                     f"({result['peak_rss'] / base['peak_rss'] - 1:+.0%})")
+    return flags
+
+def main():
+    ap = argparse.ArgumentParser(description="benchmark the assembler on generated programs")
+    ap.add_argument('--lines', type=int, default=100000)
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--only', default=None, help="comma-separated cases (default: all)")
+    ap.add_argument('--phases', action='store_true')
+    ap.add_argument('--save', default=None, metavar='FILE')
+    ap.add_argument('--baseline', default=None, metavar='FILE')
+    ap.add_argument('--tolerance', type=float, default=0.15)
+    ap.add_argument('--memory-tolerance', type=float, default=0.10)
+    args = ap.parse_args()
+    names = args.only.split(',') if args.only else list(CASES)
+    for name in names:
+        if name not in CASES:
+            ap.error(f"unknown case {name}; cases: {', '.join(CASES)}")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['lines'] != args.lines:
+            ap.error(f"{args.baseline} was made with --lines {baseline['lines']}")
+
+    results = {}
+    regressions = 0
+    print(f"{'case':14} {'lines/s':>10} {'words/s':>10} {'peak RSS':>10}  vs baseline")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            result = results[name] = measure(name, args.lines, args.repeat, args.phases, tmp)
+            base = baseline['results'].get(name) if baseline else None
+            flags = compare(result, base, args.tolerance, args.memory_tolerance)
+            regressions += bool(flags)
+            vs = ''
+            if base is not None:
+                vs = (f"{result['lines_per_s'] / base['lines_per_s'] - 1:+6.1%} speed, "
+                      f"{result['peak_rss'] / base['peak_rss'] - 1:+6.1%} RSS")
+            print(f"{name:14} {result['lines_per_s']:10,.0f} {result['words_per_s']:10,.0f} "
+                  f"{result['peak_rss'] / 2**20:8.1f}MB  {vs}")
+            for flag in flags:
+                print(f"  REGRESSION: {flag}")
+            if args.phases:
+                print('  ' + '  '.join(f"{phase} {s:.3f}s" for phase, s in result['phases'].items()))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'lines': args.lines, 'repeat': args.repeat,
+                       'python': platform.python_version(), 'machine': platform.machine(),
+                       'results': results}, f, indent=2)
+            f.write('\n')
+        print(f"Saved the baseline to {args.save}")
+    if regressions:
+        print(f"{regressions} case(s) regressed")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+# ---------------------------
+# Synthetic RISC-V programs for the benchmarks (bench_suite)
+# generate(n_lines, ...) -> source text of n_lines lines whose mix is set by
+#   pseudo    fraction of the instructions that are pseudo-instructions
+#             (li, la, mv, call, bgt, lw sym, ...)
+#   labels    fraction of the lines that are labels
+#   branch    how far, in lines, a branch or jump may go from its target;
+#             past ~1000 lines of straight code branches need relaxation
+#   comments  fraction of the lines carrying a comment: half of them whole
+#             comment lines, half a comment after an instruction
+# Branches and jumps only target labels (backwards or forwards, within
+# `branch` lines, else the nearest label), so every program assembles. The
+# same arguments and seed always give the same text.
+# Usage: python benchmarks/gen_program.py OUT.asm [lines] [--pseudo F]
+#        [--labels F] [--branch N] [--comments F] [--seed N]
+#        (default 10000 lines, 0.2, 0.05, 200, 0.1, seed 1)
+# ---------------------------
+
+import argparse
+import random
+from bisect import bisect_left, bisect_right
+
+# share of each kind among the plain (not pseudo) instructions
+BASE_MIX = [
+    ('alu', 30), ('alui', 25), ('load', 12), ('store', 10),
+    ('branch', 12), ('jal', 3), ('lui', 4), ('shift', 4),
+]
+ALU = ['add', 'sub', 'and', 'or', 'xor', 'slt', 'sltu', 'sll', 'srl', 'sra', 'mul', 'div', 'rem']
+ALUI = ['addi', 'andi', 'ori', 'xori', 'slti', 'sltiu']
+SHIFTS = ['slli', 'srli', 'srai']
+LOADS = ['lb', 'lh', 'lw', 'lbu', 'lhu']
+STORES = ['sb', 'sh', 'sw']
+BRANCHES = ['beq', 'bne', 'blt', 'bge', 'bltu', 'bgeu']
+PSEUDO_MIX = [
+    ('li', 25), ('mv', 15), ('la', 8), ('call', 6), ('j', 6), ('ret', 4),
+    ('nop', 3), ('not', 3), ('neg', 3), ('seqz', 2), ('snez', 2),
+    ('bzero', 10), ('bswap', 8), ('lsym', 5),
+]
+ZERO_BRANCHES = ['beqz', 'bnez', 'blez', 'bgez', 'bltz', 'bgtz']
+SWAPPED_BRANCHES = ['bgt', 'ble', 'bgtu', 'bleu']
+COMMENTS = ['loop body', 'spill', 'restore', 'TODO: unroll', 'bounds check',
+            'advance the pointer', 'x5 = counter', 'tail of the block']
+
+def _weighted(mix):
+    # -> (kinds, cumulative weights) for rng.choices
+    kinds = [k for k, _ in mix]
+    cum = []
+    total = 0
+    for _, w in mix:
+        total += w
+        cum.append(total)
+    return kinds, cum
+
+class _Gen:
+    def __init__(self, rng, labels_at, branch):
+        self.rng = rng
+        self.labels_at = labels_at  # line numbers of the labels, ascending
+        self.branch = branch
+        self.base = _weighted(BASE_MIX)
+        self.pseudo = _weighted(PSEUDO_MIX)
+
+    def reg(self):
+        return f"x{self.rng.randrange(1, 32)}"
+
+    def imm12(self):
+        return self.rng.randrange(-2048, 2048)
+
+    def target(self, line):
+        # a label within self.branch lines of line, or the nearest one
+        at = self.labels_at
+        lo = bisect_left(at, line - self.branch)
+        hi = bisect_right(at, line + self.branch)
+        if lo < hi:
+            return f"l{self.rng.randrange(lo, hi)}"
+        k = min(bisect_left(at, line), len(at) - 1)
+        if k and line - at[k - 1] < abs(at[k] - line):
+            k -= 1
+        return f"l{k}"
+
+    def instr(self, line, pseudo):
+        rng = self.rng
+        reg = self.reg
+        if pseudo:
+            kind = rng.choices(*self.pseudo)[0]
+            if kind == 'li':
+                value = self.imm12() if rng.random() < 0.6 else rng.randrange(-2**31, 2**31)
+                return f"li {reg()}, {value}"
+            if kind in ('mv', 'not', 'neg', 'seqz', 'snez'):
+                return f"{kind} {reg()}, {reg()}"
+            if kind == 'la':
+                return f"la {reg()}, {self.target(line)}"
+            if kind in ('call', 'j'):
+                return f"{kind} {self.target(line)}"
+            if kind in ('ret', 'nop'):
+                return kind
+            if kind == 'bzero':
+                return f"{rng.choice(ZERO_BRANCHES)} {reg()}, {self.target(line)}"
+            if kind == 'bswap':
+                return f"{rng.choice(SWAPPED_BRANCHES)} {reg()}, {reg()}, {self.target(line)}"
+            return f"{rng.choice(LOADS)} {reg()}, {self.target(line)}"  # lsym
+        kind = rng.choices(*self.base)[0]
+        if kind == 'alu':
+            return f"{rng.choice(ALU)} {reg()}, {reg()}, {reg()}"
+        if kind == 'alui':
+            return f"{rng.choice(ALUI)} {reg()}, {reg()}, {self.imm12()}"
+        if kind == 'shift':
+            return f"{rng.choice(SHIFTS)} {reg()}, {reg()}, {rng.randrange(32)}"
+        if kind == 'load':
+            return f"{rng.choice(LOADS)} {reg()}, {self.imm12()}({reg()})"
+        if kind == 'store':
+            return f"{rng.choice(STORES)} {reg()}, {self.imm12()}({reg()})"
+        if kind == 'branch':
+            return f"{rng.choice(BRANCHES)} {reg()}, {reg()}, {self.target(line)}"
+        if kind == 'jal':
+            return f"jal {reg()}, {self.target(line)}"
+        return f"lui {reg()}, {rng.randrange(1 << 20) << 12:#x}"  # lui
+
+def generate(n_lines, pseudo=0.2, labels=0.05, branch=200, comments=0.1, seed=1):
+    rng = random.Random(seed)
+    # line kinds first: labels must be known before anything branches to them
+    kinds = ['label']
+    for _ in range(1, n_lines):
+        r = rng.random()
+        if r < labels:
+            kinds.append('label')
+        elif r < labels + comments / 2:
+            kinds.append('comment')
+        else:
+            kinds.append('instr')
+    labels_at = [i for i, kind in enumerate(kinds) if kind == 'label']
+    gen = _Gen(rng, labels_at, branch)
+    out = []
+    label = 0
+    for i, kind in enumerate(kinds):
+        if kind == 'label':
+            out.append(f"l{label}:")
+            label += 1
+        elif kind == 'comment':
+            out.append(f"# {rng.choice(COMMENTS)}")
+        else:
+            line = "    " + gen.instr(i, rng.random() < pseudo)
+            if rng.random() < comments / 2:
+                line += f"  # {rng.choice(COMMENTS)}"
+            out.append(line)
+    out.append("    ecall")
+    return "\n".join(out) + "\n"
+
+def main():
+    ap = argparse.ArgumentParser(description="write a synthetic RISC-V program")
+    ap.add_argument('out')
+    ap.add_argument('lines', nargs='?', type=int, default=10000)
+    ap.add_argument('--pseudo', type=float, default=0.2)
+    ap.add_argument('--labels', type=float, default=0.05)
+    ap.add_argument('--branch', type=int, default=200)
+    ap.add_argument('--comments', type=float, default=0.1)
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+    txt = generate(args.lines, args.pseudo, args.labels, args.branch, args.comments, args.seed)
+    with open(args.out, 'w') as f:
+        f.write(txt)
+
+if __name__ == '__main__':
+    main()
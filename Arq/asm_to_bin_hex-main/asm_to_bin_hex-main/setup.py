@@ -2,7 +2,7 @@ from setuptools import setup, find_packages
 
 setup(
     name='asm_to_bin_hex',
-    version='0.1.0',
+    version='0.1.5',
     description='Assembler RISC-V: de .asm a .bin y .hex',
     author='Tu Nombre',
     author_email='tuemail@example.com',
@@ -11,10 +11,15 @@ setup(
     install_requires=[
         'sly',  # lexer y parser
     ],
+    extras_require={
+        'fast': ['numpy'],  # codificación vectorizada en pass2 para programas grandes
+    },
     entry_points={
         'console_scripts': [
             # esto crea un comando en consola:
             'assembler=assembler.main:main',
+            # enlazador de módulos objeto (assembler -f obj)
+            'assembler-link=assembler.link:main',
         ],
     },
     include_package_data=True,
@@ -0,0 +1,91 @@
+# ---------------------------
+# Batch mode (assembler.build): inputs from files, directories and globs,
+# the output paths each format writes (next to the source or in --outdir),
+# one failing file not stopping the others, in one process or a pool, and
+# two inputs that would write the same output refused up front
+# ---------------------------
+
+import os
+
+import pytest
+
+from assembler.build import assemble_many, expand_inputs, output_paths
+from assembler.pipeline import assemble
+
+GOOD = "main:\n li x5, {}\n ecall\n"
+BAD = "main:\n addi x5, x5, 5000\n"
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+def make_tree(root, n=5, bad=(2,)):
+    # -> the .asm paths, sorted; the ones in bad don't assemble
+    paths = []
+    for i in range(n):
+        path = os.path.join(root, 'src', f"sub{i % 2}", f"p{i}.asm")
+        write(path, BAD if i in bad else GOOD.format(i))
+        paths.append(path)
+    return sorted(paths)
+
+@pytest.mark.parametrize('fmt, exts', [
+    ('hexbin', ['.hex', '.bin']), ('raw', ['.img']), ('ihex', ['.ihex']),
+    ('vmem', ['.vmem']), ('obj', ['.o']),
+])
+def test_output_paths(fmt, exts):
+    src = os.path.join('a', 'b', 'prog.asm')
+    assert output_paths(src, fmt) == [os.path.join('a', 'b', 'prog' + e) for e in exts]
+    assert output_paths(src, fmt, 'out') == [os.path.join('out', 'prog' + e) for e in exts]
+
+def test_expand_inputs(tmp_path):
+    paths = make_tree(str(tmp_path))
+    write(str(tmp_path / 'src' / 'notes.txt'), "")
+    assert expand_inputs([str(tmp_path / 'src')]) == paths
+    assert expand_inputs([str(tmp_path / 'src' / 'sub0' / '*.asm'), paths[0]]) == \
+        [p for p in paths if 'sub0' in p]
+    with pytest.raises(Exception, match="No input matches"):
+        expand_inputs([str(tmp_path / 'missing*.asm')])
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_failing_file_does_not_stop_the_others(tmp_path, jobs):
+    paths = make_tree(str(tmp_path), bad=(1, 3))
+    lines = []
+    results = assemble_many(paths, jobs=jobs, report=lines.append)
+    assert [r[0] for r in results] == paths
+    failed = {r[0] for r in results if r[1] is not None}
+    assert failed == {p for p in paths if os.path.basename(p) in ('p1.asm', 'p3.asm')}
+    for asmfile, error, words, _, _, report in results:
+        hexfile, binfile = output_paths(asmfile, 'hexbin')
+        if error is None:
+            with open(asmfile) as f:
+                machine = assemble(f.read())
+            with open(hexfile) as f:
+                assert f.read() == ''.join(f"{w:08x}\n" for _, w in machine)
+            assert words == len(machine) and report['ok']
+        else:
+            assert "out of range" in error and not report['ok']
+            assert not os.path.exists(hexfile)
+    assert sum(line.startswith('FAIL ') for line in lines) == 2
+    assert lines[-1].startswith("Assembled 3/5 files")
+
+def test_outdir(tmp_path):
+    paths = make_tree(str(tmp_path), bad=())
+    outdir = str(tmp_path / 'out')
+    results = assemble_many(paths, 'vmem', outdir, jobs=1, report=lambda line: None)
+    assert all(r[1] is None for r in results)
+    assert sorted(os.listdir(outdir)) == [f"p{i}.vmem" for i in range(5)]
+
+@pytest.mark.parametrize('outdir', [None, 'out'])
+def test_same_output_refused(tmp_path, outdir):
+    # a.asm and a.s (or two a.asm in different directories, with outdir)
+    # would overwrite each other's output
+    a = str(tmp_path / 'a.asm')
+    other = str(tmp_path / ('a.s' if outdir is None else os.path.join('d', 'a.asm')))
+    write(a, GOOD.format(1))
+    write(other, GOOD.format(2))
+    if outdir is not None:
+        outdir = str(tmp_path / outdir)
+    with pytest.raises(Exception, match="would both write"):
+        assemble_many([a, other], outdir=outdir, jobs=1, report=lambda line: None)
+    assert not os.path.exists(str(tmp_path / 'a.hex'))
@@ -0,0 +1,79 @@
+# ---------------------------
+# Persistent assembly cache (assembler.cache): hits and misses, a changed
+# source or option missing, least recently used entries evicted first
+# (a hit counts as a use), broken entries dropped, and sources that
+# .include other files never cached
+# ---------------------------
+
+import os
+
+import pytest
+
+from assembler.cache import AsmCache, assemble_cached
+from assembler.pipeline import assemble
+
+SRC = "main:\n li x5, 100000\n la x6, main\n ecall\n"
+
+def entries(cache):
+    return sorted(name for name in os.listdir(cache.directory) if name.endswith('.words'))
+
+@pytest.fixture
+def cache(tmp_path):
+    return AsmCache(str(tmp_path / 'cache'))
+
+def test_miss_then_hit(cache):
+    machine = assemble_cached(SRC, cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert machine == assemble(SRC)
+    assert assemble_cached(SRC, cache) == machine
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert entries(cache) == [cache.key(SRC) + '.words']
+
+def test_changed_source_or_options_miss(cache):
+    assemble_cached(SRC, cache)
+    edited = SRC.replace("100000", "100001")
+    assert assemble_cached(edited, cache) == assemble(edited)
+    assert assemble_cached(SRC, cache, options=(('optimize', True),)) == assemble(SRC, optimize=True)
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert len(entries(cache)) == 3
+    assert cache.key(SRC) != cache.key(SRC, (('optimize', True),))
+
+def test_lru_eviction(tmp_path):
+    # room for two entries of 4 words (32 bytes each)
+    cache = AsmCache(str(tmp_path / 'cache'), max_bytes=70)
+    machine = [(4 * i, i) for i in range(4)]
+    k1, k2, k3 = (cache.key(f"p{i}") for i in range(3))
+    cache.put(k1, machine)
+    cache.put(k2, machine)
+    os.utime(cache._path(k1), (1000, 1000))
+    os.utime(cache._path(k2), (2000, 2000))
+    assert cache.get(k1) == machine  # now the most recently used
+    cache.put(k3, machine)
+    assert entries(cache) == sorted([k1 + '.words', k3 + '.words'])
+    assert cache.get(k2) is None
+
+def test_broken_entry_dropped(cache):
+    key = cache.key(SRC)
+    with open(cache._path(key), 'wb') as f:
+        f.write(b"12345")
+    assert cache.get(key) is None
+    assert entries(cache) == []
+    assert assemble_cached(SRC, cache) == assemble(SRC)
+
+def test_include_skips_the_cache(cache, tmp_path):
+    lib = tmp_path / "lib.asm"
+    source = str(tmp_path / "main.asm")
+    src = '.include "lib.asm"\nmain:\n addi x5, x0, K\n'
+    lib.write_text(".equ K, 1\n")
+    assert assemble_cached(src, cache, source=source) == assemble(" addi x5, x0, 1\n")
+    lib.write_text(".equ K, 22\n")
+    assert assemble_cached(src, cache, source=source) == assemble(" addi x5, x0, 22\n")
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert entries(cache) == []
+
+def test_directory_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('ASM_CACHE_DIR', str(tmp_path / 'env'))
+    cache = AsmCache()
+    assemble_cached(SRC, cache)
+    assert cache.directory == str(tmp_path / 'env')
+    assert len(entries(cache)) == 1
@@ -0,0 +1,108 @@
+# ---------------------------
+# Data section (assembler.data): the image of .word/.half/.byte tables and
+# strings against struct.pack of the same values, label fixups, the
+# alignment gap after the text, and la/lw through the tables in the
+# simulator
+# ---------------------------
+
+import random
+import struct
+
+import pytest
+
+from assembler.iohelpers import image_bytes
+from assembler.passes import pass1, pass2
+from assembler.pipeline import assemble, parse_source
+from assembler.sim import Sim
+
+PER_LINE = 16
+SUMMED = 50  # table entries the program adds up
+
+def make_tables(n, seed=1):
+    rng = random.Random(seed)
+    words = [rng.randrange(-(1 << 31), 1 << 32) for _ in range(n)]
+    halves = [rng.randrange(-(1 << 15), 1 << 16) for _ in range(n // 8)]
+    bytes_ = [rng.randrange(256) for _ in range(n // 8)]
+    return words, halves, bytes_
+
+def directive_lines(name, values):
+    return [f" {name} " + ", ".join(map(str, values[i:i + PER_LINE]))
+            for i in range(0, len(values), PER_LINE)]
+
+def make_program(words, halves, bytes_):
+    lines = [".text", "main:",
+             " la x5, table",
+             f" li x6, {SUMMED}",
+             " li x10, 0",
+             "loop:",
+             " lw x7, 0(x5)",
+             " add x10, x10, x7",
+             " addi x5, x5, 4",
+             " addi x6, x6, -1",
+             " bnez x6, loop",
+             " lw x11, last",
+             " lhu x12, halves",
+             " lbu x13, bytes",
+             " ecall",
+             ".data",
+             "msg: .asciz \"lookup tables\"",
+             ".align 2",
+             "table:"]
+    lines += directive_lines(".word", words[:-1])
+    lines += ["last:", f" .word {words[-1]}", "halves:"]
+    lines += directive_lines(".half", halves)
+    lines += ["bytes:"]
+    lines += directive_lines(".byte", bytes_)
+    return "\n".join(lines) + "\n"
+
+def expected_image(words, halves, bytes_):
+    data = b"lookup tables\0"
+    data += bytes(-len(data) % 4)
+    data += struct.pack(f"<{len(words)}I", *(w & 0xFFFFFFFF for w in words))
+    data += struct.pack(f"<{len(halves)}H", *(h & 0xFFFF for h in halves))
+    data += bytes(bytes_)
+    return data + bytes(-len(data) % 4)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_tables_match_struct_pack(seed):
+    words, halves, bytes_ = make_tables(200 + seed, seed)
+    symtab, program, data = pass1(parse_source(make_program(words, halves, bytes_)))
+    image = image_bytes(pass2(program, symtab, data))
+    assert image[data.base:] == expected_image(words, halves, bytes_)
+    sim = Sim(mem_size=len(image) + (1 << 12))
+    sim.load_image(image, data.base - data.pad)
+    assert sim.run(10_000)['halt'] == 'ecall'
+    assert [sim.reg(r) for r in (10, 11, 12, 13)] == [
+        sum(words[:SUMMED]) & 0xFFFFFFFF, words[-1] & 0xFFFFFFFF, halves[0] & 0xFFFF, bytes_[0]]
+
+def test_strings_space_and_align():
+    src = ('.data\n a: .ascii "ab"\n .byte 1\n .align 3\n b: .space 3\n'
+           ' .string "c"\n .half -1\n')
+    symtab, program, data = pass1(parse_source(src))
+    words = data.words(symtab)
+    assert data.base % 8 == 0
+    assert symtab['a'] == data.base and symtab['b'] == data.base + 8
+    assert words.tobytes() == b"ab\1" + bytes(5) + bytes(3) + b"c\0" + b"\xff\xff" + bytes(1)
+
+def test_label_values_and_gap_after_text():
+    src = ("main:\n nop\n nop\n nop\n.data\n.align 4\n"
+           "here: .word here, main\n .half here\n")
+    machine = assemble(src)
+    assert [addr for addr, _ in machine] == list(range(0, 4 * len(machine), 4))
+    image = image_bytes(machine)
+    assert image[12:16] == bytes(4)  # up to the 16-byte aligned base
+    assert struct.unpack_from("<IIH", image, 16) == (16, 0, 16)
+
+@pytest.mark.parametrize('line, message', [
+    (" .byte 256", "out of range"),
+    (" .half -32769", "out of range"),
+    (" .word x", "Undefined label"),
+    (" .byte lbl", "does not fit"),
+    (" .align 13", "Alignment too large"),
+    (" .space -1", "non-negative"),
+    (' .word "s"', "numbers or labels"),
+])
+def test_errors(line, message):
+    src = "main:\n nop\n" + "nop\n" * 64 + ".data\nlbl: .space 4\n" + line + "\n"
+    with pytest.raises(Exception, match=message):
+        assemble(src)
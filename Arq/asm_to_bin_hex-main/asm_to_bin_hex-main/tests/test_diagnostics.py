@@ -0,0 +1,109 @@
+# ---------------------------
+# Error reporting (assembler.diagnostics): errors of every phase injected
+# at known lines of a program must each be reported at their line, column
+# and phase in collect-all mode, fail-fast must stop at the first, and
+# lines from an include or a macro must be reported where they come from
+# ---------------------------
+
+import json
+import random
+
+import pytest
+
+from assembler.diagnostics import AssemblyError, Diagnostics
+from assembler.pipeline import assemble
+
+BODY = [
+    " addi x5, x5, 10",
+    " add x6, x5, x7",
+    " lw x8, 4(x6)",
+    " beq x5, x6, loop{}",
+    " sw x8, 8(x2)",
+]
+BLOCK = len(BODY) * 4  # lines under each label
+
+# phase -> a broken line in its place; the error is at column 2, or at
+# the end of the line for the parse error
+ERRORS = {
+    'lex': " $ addi x5, x5, 1",
+    'parse': " add x6, x5,",
+    'pass1': " loop{}:",
+    'pass2': [" addi x5, x5, 5000", " frob x5, x6", " beq x5, x6, nowhere"],
+}
+
+def make_program(n_lines):
+    lines = []
+    label = 0
+    while len(lines) < n_lines:
+        lines.append(f"loop{label}:")
+        lines += [BODY[k % len(BODY)].format(label) for k in range(BLOCK)]
+        label += 1
+    lines.append(" ecall")
+    return lines
+
+def inject(lines, n_errors, rng):
+    # -> (broken lines, {line number: (phase, column)})
+    broken = list(lines)
+    expected = {}
+    phases = sorted(ERRORS)
+    # never break a label line (the branches of its block would fail too)
+    spots = rng.sample([i for i, line in enumerate(lines) if line.startswith(' ')], n_errors)
+    for k, i in enumerate(sorted(spots)):
+        phase = phases[k % len(phases)]
+        line = ERRORS[phase]
+        if phase == 'pass1':
+            # the label of the block the line is in: defined above it
+            line = line.format(i // (BLOCK + 1))
+        elif phase == 'pass2':
+            line = rng.choice(line)
+        broken[i] = line
+        expected[i + 1] = (phase, len(line) + 1 if phase == 'parse' else 2)
+    return broken, expected
+
+def failing(txt, **kwargs):
+    # -> the diagnostics assembling txt raised
+    with pytest.raises(AssemblyError) as e:
+        assemble(txt, **kwargs)
+    return e.value.diagnostics
+
+@pytest.mark.parametrize('seed', range(3))
+def test_collect_all_reports_every_error(seed):
+    rng = random.Random(seed)
+    broken, expected = inject(make_program(400), 16, rng)
+    bad = "\n".join(broken) + "\n"
+    found = failing(bad, diag=Diagnostics('bad.asm', bad, collect=True))
+    assert {d.line: (d.phase, d.column) for d in found} == expected
+    assert len(found) == len(expected)
+    assert {d.file for d in found} == {'bad.asm'}
+
+    first = failing(bad, source='bad.asm')
+    first_lex = min(line for line, (phase, _) in expected.items() if phase == 'lex')
+    assert [(d.line, d.phase) for d in first] == [(first_lex, 'lex')]
+
+def test_clean_program_has_no_errors():
+    diag = Diagnostics('ok.asm', collect=True)
+    assemble("\n".join(make_program(100)) + "\n", diag=diag)
+    assert not diag
+    assert diag.report() == {'source': 'ok.asm', 'ok': True, 'error_count': 0, 'errors': []}
+
+def test_include_and_macro_lines(tmp_path):
+    (tmp_path / "lib.asm").write_text(" nop\n addi x5, x5, 9999\n")
+    src = ('.include "lib.asm"\n.macro m r\n nop\n  frob \\r\n.endm\nmain:\n m x5\n')
+    source = str(tmp_path / "main.asm")
+    found = failing(src, source=source, diag=Diagnostics(source, src, collect=True))
+    assert [(d.file, d.line, d.column, d.phase) for d in found] == [
+        (str(tmp_path / "lib.asm"), 2, 2, 'pass2'),
+        (source, 4, 3, 'pass2'),
+    ]
+    assert f"included from {source}:1" in found[0].context
+    assert 'in macro m' in found[1].context and f"{source}:7" in found[1].context
+
+def test_report_is_json():
+    bad = "main:\n addi x5, x5, 5000\n"
+    diag = Diagnostics('bad.asm', bad, collect=True)
+    with pytest.raises(AssemblyError) as e:
+        assemble(bad, diag=diag)
+    assert str(e.value).startswith("Pass2 error: bad.asm:2:2: ")
+    report = json.loads(json.dumps(diag.report()))
+    assert report['ok'] is False and report['error_count'] == 1
+    assert report['errors'][0]['line'] == 2 and report['errors'][0]['phase'] == 'pass2'
@@ -0,0 +1,116 @@
+# ---------------------------
+# NumPy batch encoding (assembler.encode_batch) against the scalar path:
+# encode_batch vs encode_r/i/s/b/u/j on random fields, and pass2_batch vs
+# encode_stream on random programs (every mnemonic, plus the pseudo-
+# instructions whose expansions use pcrel_hi/pcrel_lo operands)
+# ---------------------------
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from assembler.encode import encode_r, encode_i, encode_s, encode_b, encode_u, encode_j
+from assembler.encode_batch import encode_batch
+from assembler.instructions import INSTR_TABLE, FMT_R, FMT_I, FMT_S, FMT_B, FMT_U, FMT_J
+from assembler.passes import encode_stream, pass1, pass2_batch
+from assembler.pipeline import parse_source
+
+def random_fields(rng):
+    fmt = rng.choice((FMT_R, FMT_I, FMT_S, FMT_B, FMT_U, FMT_J))
+    opcode = rng.randrange(128)
+    funct3 = rng.randrange(8)
+    funct7 = rng.randrange(128)
+    rd, rs1, rs2 = rng.randrange(32), rng.randrange(32), rng.randrange(32)
+    if fmt == FMT_U:
+        imm = rng.randrange(1 << 32) & 0xFFFFF000
+    elif fmt == FMT_J:
+        imm = rng.randrange(-(1 << 20), 1 << 20, 2)
+    elif fmt == FMT_B:
+        imm = rng.randrange(-(1 << 12), 1 << 12, 2)
+    else:
+        imm = rng.randint(-2048, 2047)
+    return fmt, opcode, funct3, funct7, rd, rs1, rs2, imm
+
+def scalar_word(fmt, opcode, funct3, funct7, rd, rs1, rs2, imm):
+    if fmt == FMT_R:
+        return encode_r(funct7, rs2, rs1, funct3, rd, opcode)
+    if fmt == FMT_I:
+        return encode_i(imm, rs1, funct3, rd, opcode)
+    if fmt == FMT_S:
+        return encode_s(imm, rs2, rs1, funct3, opcode)
+    if fmt == FMT_B:
+        return encode_b(imm, rs2, rs1, funct3, opcode)
+    if fmt == FMT_U:
+        return encode_u(imm, rd, opcode)
+    return encode_j(imm, rd, opcode)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_encode_batch_matches_encode_functions(seed):
+    # the batch API only sees the fields each format actually has
+    rng = random.Random(seed)
+    rows = [random_fields(rng) for _ in range(5000)]
+    cols = {k: [] for k in ('fmt', 'base', 'rd', 'rs1', 'rs2', 'imm')}
+    for fmt, opcode, funct3, funct7, rd, rs1, rs2, imm in rows:
+        base = opcode
+        if fmt != FMT_U and fmt != FMT_J:
+            base |= funct3 << 12
+        if fmt == FMT_R:
+            base |= funct7 << 25
+        cols['fmt'].append(fmt)
+        cols['base'].append(base)
+        cols['rd'].append(rd if fmt in (FMT_R, FMT_I, FMT_U, FMT_J) else 0)
+        cols['rs1'].append(rs1 if fmt in (FMT_R, FMT_I, FMT_S, FMT_B) else 0)
+        cols['rs2'].append(rs2 if fmt in (FMT_R, FMT_S, FMT_B) else 0)
+        cols['imm'].append(imm)
+    assert encode_batch(**cols).tolist() == [scalar_word(*row) for row in rows]
+
+def random_line(rng, n_labels):
+    reg = lambda: f"x{rng.randrange(32)}"
+    label = lambda: f"l{rng.randrange(n_labels)}"
+    kind = rng.randrange(len(INSTR_TABLE) + 5)
+    if kind >= len(INSTR_TABLE):
+        # pseudo-instructions expanding to auipc + a pcrel_lo operand
+        return rng.choice([
+            lambda: f"{rng.choice(['lb', 'lh', 'lw', 'lbu', 'lhu'])} x5, {label()}",
+            lambda: f"{rng.choice(['sb', 'sh', 'sw'])} x5, {label()}, x7",
+            lambda: f"la {reg()}, {label()}",
+            lambda: f"call {label()}",
+            lambda: f"tail {label()}",
+        ])()
+    m, spec = list(INSTR_TABLE.items())[kind]
+    layout = spec.layout
+    if layout == 'rrr':
+        return f"{m} {reg()}, {reg()}, {reg()}"
+    if layout == 'rri':
+        return f"{m} {reg()}, {reg()}, {rng.randint(-2048, 2047)}"
+    if layout == 'shift':
+        return f"{m} {reg()}, {reg()}, {rng.randrange(32)}"
+    if layout in ('load', 'store'):
+        return f"{m} {reg()}, {rng.randint(-2048, 2047)}({reg()})"
+    if layout == 'branch':
+        return f"{m} {reg()}, {reg()}, {label()}"
+    if layout == 'upper':
+        return f"{m} {reg()}, {rng.randrange(1 << 20) << 12:#x}"
+    if layout == 'jump':
+        return f"{m} {reg()}, {label()}"
+    return m
+
+def random_program(seed, n_lines=3000, label_every=16):
+    rng = random.Random(seed)
+    n_labels = n_lines // label_every
+    lines = []
+    for i in range(n_lines):
+        if i % label_every == 0:
+            lines.append(f"l{i // label_every}:")
+        lines.append(" " + random_line(rng, n_labels))
+    return "\n".join(lines) + "\n"
+
+@pytest.mark.parametrize('seed', range(3))
+def test_pass2_batch_matches_encode_stream(seed):
+    symtab, program, _ = pass1(parse_source(random_program(seed)))
+    batch = pass2_batch(program, symtab)
+    assert batch is not None  # nothing fell back to the scalar path
+    assert batch == list(encode_stream(program, symtab))
+    assert {ins.mnemonic for _, ins in program} == set(INSTR_TABLE)
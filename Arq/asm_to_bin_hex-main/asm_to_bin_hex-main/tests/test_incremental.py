@@ -0,0 +1,52 @@
+# ---------------------------
+# Incremental re-assembly (assembler.incremental): every build, cold or
+# after an edit, must give the words of a full pipeline.assemble, also
+# when a branch or jump to another chunk is out of reach and has to be
+# relaxed, and fail with the same error when the full build does
+# ---------------------------
+
+import pytest
+
+from assembler.incremental import IncrementalAssembler, split_chunks
+from assembler.pipeline import assemble
+
+def program(n_funcs, body=3):
+    lines = ["main:"] + [f" call f{i}" for i in range(n_funcs)] + [" ecall"]
+    for i in range(n_funcs):
+        lines.append(f"f{i}:")
+        lines += [f" addi x10, x10, {i + k}" for k in range(body)]
+        lines += [f" beqz x10, f{(i + 1) % n_funcs}", " ret"]
+    return "\n".join(lines) + "\n"
+
+FAR_BRANCH = "a:\n beq x1, x2, b\n" + " nop\n" * 1100 + "b:\n ecall\n"
+FAR_BACK = "a:\n nop\n" + " nop\n" * 1100 + "b:\n bnez x5, a\n j a\n ecall\n"
+
+@pytest.mark.parametrize('src', [program(20), FAR_BRANCH, FAR_BACK],
+                         ids=['calls', 'far-branch', 'far-back'])
+def test_cold_build_equals_full(src):
+    assert IncrementalAssembler().assemble(src) == assemble(src)
+
+def test_edits_equal_full():
+    inc = IncrementalAssembler()
+    src = program(20)
+    assert inc.assemble(src) == assemble(src)
+    assert inc.stats['parsed'] == inc.stats['chunks'] == len(split_chunks(src))
+    # one function's body changes: only its chunk is parsed again
+    edited = src.replace(" addi x10, x10, 7\n", " addi x10, x10, 70\n", 1)
+    assert inc.assemble(edited) == assemble(edited)
+    assert inc.stats['parsed'] == 1
+    # a function grows past a branch's reach, then shrinks back
+    grown = edited.replace("f5:\n", "f5:\n" + " nop\n" * 1100, 1)
+    assert inc.assemble(grown) == assemble(grown)
+    assert inc.assemble(edited) == assemble(edited)
+
+@pytest.mark.parametrize('src', [
+    " beq x0, x0, nowhere\n",
+    "a:\n nop\nb:\n addi x5, x5, 5000\n",
+])
+def test_errors_equal_full(src):
+    with pytest.raises(Exception) as full:
+        assemble(src)
+    with pytest.raises(Exception) as inc:
+        IncrementalAssembler().assemble(src)
+    assert str(inc.value) == str(full.value)
@@ -0,0 +1,100 @@
+# ---------------------------
+# Object files and the linker (assembler.objfile, assembler.link): a
+# program split into modules that call each other and refer to each
+# other's .data, linked, must equal the same modules assembled as one
+# source word for word (also after re-assembling one changed module), and
+# compute the expected sum in the simulator
+# ---------------------------
+
+import random
+import re
+
+import pytest
+
+from assembler.link import image_machine, link
+from assembler.objfile import assemble_object, read_object, write_object
+from assembler.pipeline import assemble
+from assembler.sim import Sim
+
+def make_modules(n, filler, seed=1):
+    # module 0 calls f1..f{n-1}; module i adds its constant and its .data
+    # word to x10, plus the low bit of the next module's value (through a
+    # .data pointer to it)
+    rng = random.Random(seed)
+    consts = [rng.randrange(1, 1000) for _ in range(n)]
+    values = [rng.randrange(1 << 20) for _ in range(n)]
+    main = [".text", ".globl main", "main:", " li x10, 0"]
+    main += [f" call f{i}" for i in range(1, n)]
+    main += [" ecall", ".data", "v0: .word 0"]
+    modules = ["\n".join(main) + "\n"]
+    for i in range(1, n):
+        nxt = i + 1 if i + 1 < n else 1
+        lines = [".text", f".globl f{i}", f".globl v{i}", f"f{i}:",
+                 f" addi x10, x10, {consts[i]}",
+                 f" lw x11, v{i}",
+                 " add x10, x10, x11",
+                 f" lw x12, p{i}",
+                 " lw x12, 0(x12)",
+                 " andi x12, x12, 1",
+                 " add x10, x10, x12",
+                 " ret"]
+        lines += [" addi x7, x7, 1"] * filler  # never executed
+        lines += [".data", f"v{i}: .word {values[i]}", f"p{i}: .word v{nxt}"]
+        modules.append("\n".join(lines) + "\n")
+    expected = 0
+    for i in range(1, n):
+        nxt = i + 1 if i + 1 < n else 1
+        expected += consts[i] + values[i] + (values[nxt] & 1)
+    return modules, expected & 0xFFFFFFFF
+
+def monolithic(modules):
+    # .globl is only meaningful between modules; one source needs none
+    return "".join(line + "\n" for m in modules for line in m.splitlines()
+                   if not line.startswith(".globl"))
+
+def linked(objects):
+    image, _ = link(objects)
+    return image_machine(image)
+
+def run(machine):
+    sim = Sim(mem_size=4 * len(machine) + (1 << 12))
+    sim.load(machine)
+    assert sim.run(10_000)['halt'] == 'ecall'
+    return sim.reg(10)
+
+@pytest.mark.parametrize('n, filler', [(2, 0), (6, 5), (12, 40)])
+def test_linked_equals_monolithic(n, filler):
+    modules, expected = make_modules(n, filler)
+    objects = [assemble_object(m) for m in modules]
+    machine = linked(objects)
+    assert machine == assemble(monolithic(modules))
+    assert run(machine) == expected
+
+def test_relink_after_one_change():
+    modules, expected = make_modules(6, 5)
+    objects = [assemble_object(m) for m in modules]
+    modules[3] = re.sub(r"addi x10, x10, (\d+)", lambda m: f"addi x10, x10, {int(m[1]) + 1}",
+                        modules[3], count=1)
+    objects[3] = assemble_object(modules[3])
+    machine = linked(objects)
+    assert machine == assemble(monolithic(modules))
+    assert run(machine) == (expected + 1) & 0xFFFFFFFF
+
+def test_object_file_round_trip(tmp_path):
+    modules, _ = make_modules(4, 3)
+    objects = []
+    for i, m in enumerate(modules):
+        path = str(tmp_path / f"m{i}.o")
+        write_object(assemble_object(m), path)
+        objects.append(read_object(path))
+    assert linked(objects) == assemble(monolithic(modules))
+
+@pytest.mark.parametrize('sources, message', [
+    ([".globl main\nmain:\n call f\n"], "Undefined symbol f"),
+    ([".globl f\nf:\n ret\n", ".globl f\nf:\n ret\n"], "defined in both"),
+    ([".globl main\nmain:\n beq x0, x0, f\n", ".globl f\n" + " nop\n" * 1100 + "f:\n ret\n"],
+     "branch relocation to f"),
+])
+def test_errors(sources, message):
+    with pytest.raises(Exception, match=message):
+        link([assemble_object(s) for s in sources])
@@ -0,0 +1,62 @@
+# ---------------------------
+# Statement representation (assembler.nodes, assembler.lineparser): nodes
+# without a per-instance __dict__, loc packed into one int, names interned
+# and equal operand tuples shared, and the hand-written front end giving
+# the same statements as the sly one
+# ---------------------------
+
+import sys
+
+import pytest
+
+from assembler.nodes import LOC_SHIFT, Directive, Instr, Label
+from assembler.pipeline import make_front_end, parse_source
+
+SOURCE = """# comment
+main:
+ li x5, 100000
+loop: addi x5, x5, -1  # trailing comment
+ lw x6, 8(x2)
+ sw x6, 0x10(x2)
+ beq x5, x0, done
+ JAL x1, loop
+ .word 1, -2, main
+ .asciz "a\\tb"
+done:
+ ecall
+"""
+
+def dump(statements):
+    # -> comparable form of the statements
+    return [(type(s).__name__, getattr(s, 'name', None) or getattr(s, 'mnemonic', None),
+             getattr(s, 'args', None) or getattr(s, 'operands', None), s.loc)
+            for s in statements]
+
+def test_nodes_have_no_dict():
+    for node in (Label('l'), Directive('.word', [('imm', 1)]), Instr('add', [])):
+        assert not hasattr(node, '__dict__')
+        with pytest.raises(AttributeError):
+            node.extra = 1
+
+def test_loc_is_line_and_index():
+    statements = parse_source(SOURCE)
+    assert len(statements) == 12
+    for s in statements:
+        line, index = s.loc >> LOC_SHIFT, s.loc & ((1 << LOC_SHIFT) - 1)
+        assert SOURCE.count('\n', 0, index) + 1 == line
+        first = s.name + ':' if isinstance(s, Label) else getattr(s, 'mnemonic', None) or s.name
+        assert SOURCE[index:].lower().startswith(first)
+
+def test_names_interned_and_operands_shared():
+    a, b = parse_source(" addi x5, x5, 1\n ADDI x5, x5, 1\n")
+    assert a.mnemonic is b.mnemonic
+    assert a.operands[0] is b.operands[0] is a.operands[1]
+    assert a.operands[2] is b.operands[2]
+    label = parse_source("".join(["lo", "op:\n"]))[0]
+    assert label.name is sys.intern("loop")
+
+@pytest.mark.parametrize('src', [SOURCE, "\n\n", " nop\n", "l1: l2:\n .align 2\n .space 8\n"])
+def test_line_parser_matches_sly(src):
+    pytest.importorskip('sly')
+    lexer, parser = make_front_end('sly')
+    assert dump(parse_source(src)) == dump(parse_source(src, lexer, parser))
@@ -0,0 +1,55 @@
+# ---------------------------
+# -O (assembler.optimize): constants load in the fewest instructions and
+# leave the same value as plain li; optimized programs compute what the
+# plain ones do
+# ---------------------------
+
+import random
+
+import pytest
+
+from assembler.pipeline import assemble
+from assembler.sim import Sim
+
+M = 0xFFFFFFFF
+
+def run(machine):
+    sim = Sim()
+    sim.load(machine)
+    sim.run(100000)
+    return sim
+
+@pytest.mark.parametrize('value', [0, 1, -1, 2047, -2048, 0xFFFFFFFF, 0xFFFFF800, -0x800])
+def test_small_constants_are_one_addi(value):
+    machine = assemble(f" li x1, {value}\n", optimize=True)
+    assert len(machine) == 1
+    assert machine[0][1] & 0xFFFFF == 0x00093  # addi x1, x0, imm
+    assert run(machine).reg(1) == value & M
+
+@pytest.mark.parametrize('value', [0x1000, 0x12345000, -4096, 0x80000000, 0xFFFFF000])
+def test_round_constants_are_one_lui(value):
+    machine = assemble(f" li x1, {value}\n", optimize=True)
+    assert len(machine) == 1
+    assert run(machine).reg(1) == value & M
+
+def test_random_constants():
+    rng = random.Random(1)
+    values = [rng.randrange(-2**31, 2**32) for _ in range(300)]
+    values += [0x7FFFFFFF, 0x7FFFF800, -2**31, 2048, -2049]
+    src = "".join(f" li x{1 + i % 31}, {v}\n" for i, v in enumerate(values))
+    for i in range(0, len(values), 31):
+        chunk = "".join(src.splitlines(True)[i:i + 31])
+        plain = assemble(chunk)
+        opt = assemble(chunk, optimize=True)
+        assert len(opt) <= len(plain)
+        sim = run(opt)
+        for k, v in enumerate(values[i:i + 31]):
+            assert sim.reg(1 + k) == v & M
+
+def test_noops_dropped_same_result():
+    src = ("main:\n li x10, 5\n nop\n mv x11, x11\n addi x0, x10, 1\n add x12, x12, x0\n"
+           " call f\n tail done\nf:\n addi x10, x10, 7\n ret\ndone:\n ecall\n")
+    plain, opt = assemble(src), assemble(src, optimize=True)
+    assert len(opt) < len(plain)
+    assert [run(opt).reg(r) for r in range(10, 18)] == [run(plain).reg(r) for r in range(10, 18)]
+    assert run(opt).reg(10) == 12
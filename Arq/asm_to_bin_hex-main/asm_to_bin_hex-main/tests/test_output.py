@@ -0,0 +1,87 @@
+# ---------------------------
+# Output writers (assembler.iohelpers): hex/bin text, the raw image, Intel
+# HEX (record checksums, extended linear address records above 64 KiB, the
+# EOF record) and $readmemh, against known bytes, with holes between the
+# words zero-filled
+# ---------------------------
+
+import pytest
+
+from assembler.iohelpers import image_bytes, machine_image, write_output
+
+# addi x5, x0, 5 / ecall
+SMALL = [(0, 0x00500293), (4, 0x00000073)]
+SMALL_BYTES = b"\x93\x02\x50\x00\x73\x00\x00\x00"
+
+def read(path, mode='r'):
+    with open(path, mode) as f:
+        return f.read()
+
+def ihex_records(text):
+    # -> [(address, type, payload)], checking every record's length and checksum
+    records = []
+    for line in text.splitlines():
+        assert line.startswith(':') and line == line.upper()
+        rec = bytes.fromhex(line[1:])
+        assert len(rec) == rec[0] + 5
+        assert sum(rec) & 0xFF == 0, line
+        records.append(((rec[1] << 8) | rec[2], rec[3], rec[4:-1]))
+    return records
+
+def test_hexbin(tmp_path):
+    paths = [str(tmp_path / "p.hex"), str(tmp_path / "p.bin")]
+    write_output(SMALL, 'hexbin', paths)
+    assert read(paths[0]) == "00500293\n00000073\n"
+    assert read(paths[1]) == "00000000010100000000001010010011\n" \
+                             "00000000000000000000000001110011\n"
+
+def test_raw(tmp_path):
+    path = str(tmp_path / "p.raw")
+    write_output(SMALL, 'raw', [path])
+    assert read(path, 'rb') == SMALL_BYTES
+
+def test_ihex_small(tmp_path):
+    path = str(tmp_path / "p.ihex")
+    write_output(SMALL, 'ihex', [path])
+    assert read(path) == ":080000009302500073000000A0\n:00000001FF\n"
+
+def test_ihex_above_64k(tmp_path):
+    # one word at 0x10004: zeros up to it, an extended linear address
+    # record for the upper 64 KiB, then its data
+    machine = SMALL + [(0x10004, 0x12345678)]
+    path = str(tmp_path / "p.ihex")
+    write_output(machine, 'ihex', [path])
+    text = read(path)
+    assert ":020000040001F9\n" in text
+    records = ihex_records(text)
+    assert records[-1] == (0, 0x01, b'')
+    data = {}
+    upper = 0
+    for addr, rectype, payload in records[:-1]:
+        if rectype == 0x04:
+            upper = int.from_bytes(payload, 'big') << 16
+            continue
+        assert rectype == 0x00
+        data[upper + addr] = payload
+    assert sorted(data) == list(range(0, 0x10008, 16))
+    assert {len(p) for p in data.values()} == {16, 8}  # the last record is short
+    image = b''.join(data[a] for a in sorted(data))
+    assert image[:8] == SMALL_BYTES
+    assert image[8:0x10004] == bytes(0x10004 - 8)
+    assert image[0x10004:0x10008] == bytes.fromhex("78563412")
+
+def test_vmem_gap(tmp_path):
+    # $readmemh: the image starts at @00000000 and a hole is zero words
+    machine = [(0, 0x00500293), (12, 0x00000073)]
+    path = str(tmp_path / "p.vmem")
+    write_output(machine, 'vmem', [path])
+    assert read(path) == "@00000000\n00500293\n00000000\n00000000\n00000073\n"
+
+@pytest.mark.parametrize('machine, words', [
+    ([], []),
+    (SMALL, [0x00500293, 0x00000073]),
+    ([(8, 1), (0, 2)], [2, 0, 1]),
+])
+def test_machine_image(machine, words):
+    assert list(machine_image(machine)) == words
+    assert image_bytes(machine) == b''.join(w.to_bytes(4, 'little') for w in words)
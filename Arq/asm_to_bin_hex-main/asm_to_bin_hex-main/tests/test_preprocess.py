@@ -0,0 +1,108 @@
+# ---------------------------
+# Preprocessor (assembler.preprocess): a templated program (an included
+# library of .equ constants and macros, invoked with random arguments and
+# in .rept blocks) must assemble to the same words as the same program
+# written out flat, also the second time round (cached include tokens,
+# memoized expansions); plus the preprocessor's errors
+# ---------------------------
+
+import random
+
+import pytest
+
+from assembler.passes import pass1, pass2
+from assembler.pipeline import assemble, parse_source
+
+BODY_OPS = ('add', 'sub', 'xor', 'or', 'and')
+
+def make_library(n_macros, rng):
+    # -> (library text, {name: (constant, [(op, scratch register), ...])})
+    lines = []
+    macros = {}
+    for m in range(n_macros):
+        const = rng.randrange(-2048, 2048)
+        body = [(rng.choice(BODY_OPS), rng.randrange(5, 8)) for _ in range(rng.randrange(2, 6))]
+        macros[f"m{m}"] = (const, body)
+        lines.append(f".equ K{m}, {const}")
+        lines.append(f".macro m{m} rd, rs, imm")
+        lines.append(f" addi \\rd, \\rs, K{m}")
+        for op, scratch in body:
+            lines.append(f" {op} \\rd, \\rd, x{scratch}")
+        lines.append(" xori \\rd, \\rd, \\imm")
+        lines.append(".endm")
+    return "\n".join(lines) + "\n", macros
+
+def expand(name, rd, rs, imm, macros):
+    const, body = macros[name]
+    lines = [f" addi x{rd}, x{rs}, {const}"]
+    lines += [f" {op} x{rd}, x{rd}, x{scratch}" for op, scratch in body]
+    lines.append(f" xori x{rd}, x{rd}, {imm}")
+    return lines
+
+def make_program(n_calls, macros, rng):
+    # -> (templated main text, flat text)
+    names = sorted(macros)
+    main = ['.include "lib.asm"', "main:"]
+    flat = ["main:"]
+    i = 0
+    while i < n_calls:
+        name = rng.choice(names)
+        rd, rs, imm = rng.randrange(10, 16), rng.randrange(10, 16), rng.randrange(-100, 100)
+        if rng.random() < 0.2:
+            count = rng.randrange(0, 6)
+            main += [f" .rept {count}", f" {name} x{rd}, x{rs}, {imm}", " .endr"]
+            flat += expand(name, rd, rs, imm, macros) * count
+            i += count
+        else:
+            main.append(f" {name} x{rd}, x{rs}, {imm}")
+            flat += expand(name, rd, rs, imm, macros)
+            i += 1
+    main.append(" ecall")
+    flat.append(" ecall")
+    return "\n".join(main) + "\n", "\n".join(flat) + "\n"
+
+def words(statements):
+    symtab, program, data = pass1(statements)
+    return [w for _, w in pass2(program, symtab, data)]
+
+@pytest.mark.parametrize('seed', range(3))
+def test_templated_equals_flat(tmp_path, seed):
+    rng = random.Random(seed)
+    library, macros = make_library(8, rng)
+    templated, flat = make_program(300, macros, rng)
+    (tmp_path / "lib.asm").write_text(library)
+    source = str(tmp_path / "main.asm")
+    expected = words(parse_source(flat))
+    assert words(parse_source(templated, source=source)) == expected
+    assert words(parse_source(templated, source=source)) == expected  # cached tokens
+
+def test_changed_include_is_reread(tmp_path):
+    lib = tmp_path / "lib.asm"
+    source = str(tmp_path / "main.asm")
+    lib.write_text(".equ K, 1\n")
+    assert assemble('.include "lib.asm"\n addi x5, x0, K\n', source=source) == \
+        assemble(" addi x5, x0, 1\n")
+    lib.write_text(".equ K, 22\n")  # new size, so a new entry whatever the mtime
+    assert assemble('.include "lib.asm"\n addi x5, x0, K\n', source=source) == \
+        assemble(" addi x5, x0, 22\n")
+
+def test_nested_macros_and_set():
+    src = (".set N, 3\n.macro inc r\n addi \\r, \\r, N\n.endm\n"
+           ".macro twice r\n inc \\r\n inc \\r\n.endm\n"
+           "main:\n twice x5\n.set N, 5\n .rept 2\n inc x6\n .endr\n")
+    assert assemble(src) == assemble(" addi x5, x5, 3\n addi x5, x5, 3\n"
+                                     " addi x6, x6, 5\n addi x6, x6, 5\n")
+
+@pytest.mark.parametrize('src, message', [
+    ('.include "missing.asm"\n', "Can't find include file"),
+    (".macro m a\n addi \\b, x0, 1\n.endm\n m x5\n", "Unknown macro parameter"),
+    (".macro m a\n nop\n.endm\n m x5, x6\n", "Macro m takes 1"),
+    (".macro m\n m\n.endm\n m\n", "nested too deep"),
+    (".rept -1\n nop\n.endr\n", "must not be negative"),
+    (".rept 2\n nop\n", ".rept without .endr"),
+    (".macro m a, a\n.endm\n", "Repeated parameter"),
+    (".equ K\n", "expects a name and a value"),
+])
+def test_errors(src, message):
+    with pytest.raises(Exception, match=message):
+        assemble(src)
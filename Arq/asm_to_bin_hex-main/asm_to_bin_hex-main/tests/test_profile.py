@@ -0,0 +1,80 @@
+# ---------------------------
+# Phase profiling (assembler.profiling): a profiled assembly must give the
+# unprofiled words, and its phases must account for the run: every phase
+# present with its count and memory, the pass2 mnemonics adding up to the
+# words encoded
+# ---------------------------
+
+import json
+
+import pytest
+
+from assembler.pipeline import assemble
+from assembler.profiling import Profile, resource
+
+SOURCE = """main:
+ li x5, 100000
+ la x6, main
+loop:
+ addi x5, x5, -1
+ lw x7, 4(x6)
+ bnez x5, loop
+ call main
+ ecall
+"""
+
+# the far branch makes relaxation add a word (a jal behind it)
+FAR = "main:\n beq x5, x0, far\n" + " nop\n" * 1100 + "far:\n ecall\n"
+
+@pytest.mark.parametrize('memory', [False, True])
+def test_profiled_words_equal_unprofiled(memory):
+    for src in (SOURCE, FAR):
+        with Profile(memory) as profile:
+            assert assemble(src, profile=profile) == assemble(src)
+
+def test_phases_and_counts():
+    profile = Profile()
+    machine = assemble(FAR, profile=profile)
+    phases = profile.phases
+    assert list(phases) == ['lex', 'parse', 'pass1', 'pass1.pseudo', 'pass1.relax', 'pass2']
+    assert phases['parse'].count == 1104           # statements
+    assert phases['pass1.pseudo'].count == 1100    # the nops
+    assert phases['pass1.relax'].count == 1        # words added
+    assert phases['pass1'].count == phases['pass2'].count == len(machine)
+    assert sum(c for c, _ in profile.mnemonics.values()) == len(machine)
+    assert profile.mnemonics['jal'][0] == 1
+    for ph in phases.values():
+        assert ph.seconds >= 0
+        assert (ph.max_rss is None) == (resource is None)
+        assert ph.peak_alloc is None
+
+def test_memory_tracing():
+    with Profile(memory=True) as profile:
+        assemble(SOURCE, profile=profile)
+    assert all(ph.peak_alloc is not None for name, ph in profile.phases.items()
+               if name != 'pass1.pseudo')  # timed calls, not a traced block
+    assert 'peak alloc' in profile.format()
+
+def test_as_dict_and_format():
+    profile = Profile()
+    assemble(SOURCE, profile=profile)
+    d = json.loads(json.dumps(profile.as_dict()))
+    assert set(d['phases']) == set(profile.phases)
+    assert d['mnemonics']['addi']['count'] == 3  # li, addi, la's low part
+    table = profile.format(top=2).splitlines()
+    assert table[0].split()[:3] == ['phase', 'seconds', 'count']
+    assert 'peak RSS so far' in table[0]
+    assert table[-3].startswith('pass2 by mnemonic (top 2 of ')
+
+def test_nested_phases_and_timed():
+    profile = Profile()
+    twice = profile.timed('twice', lambda x: 2 * x, lambda result, x: x)
+    with profile.phase('outer') as outer:
+        outer.count += 1
+        with profile.phase('inner'):
+            twice = profile.timed('twice', lambda x: 2 * x, lambda result, x: x)
+            assert twice(3) == 6 and twice(4) == 8
+    assert list(profile.phases) == ['twice', 'outer', 'outer.inner', 'outer.inner.twice']
+    assert profile.phases['outer'].count == 1
+    assert profile.phases['outer.inner.twice'].count == 7
+    assert profile.phases['twice'].count == 0
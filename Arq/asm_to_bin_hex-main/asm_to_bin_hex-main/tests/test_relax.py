@@ -0,0 +1,119 @@
+# ---------------------------
+# Branch/jump relaxation (assembler.relax): programs whose branches are out
+# of reach compute what a Python model of them does, through the inverted
+# branch + jal and auipc+jalr forms; programs in reach are left alone
+# ---------------------------
+
+import random
+
+import pytest
+
+from assembler.passes import layout, pass1, pass2
+from assembler.pipeline import assemble, parse_source
+from assembler.relax import relax
+from assembler.sim import Sim
+
+def make_machine(n_states, seed=1):
+    # per state: (constant added to x10, next state if x10 is odd, if even)
+    rng = random.Random(seed)
+    return [(rng.randrange(1, 2000), rng.randrange(n_states), rng.randrange(n_states))
+            for _ in range(n_states)]
+
+def make_program(machine, steps):
+    lines = ["main:", " li x10, 0", f" li x5, {steps}", " jal x0, s0"]
+    for i, (c, odd, even) in enumerate(machine):
+        lines += [f"s{i}:",
+                  f" addi x10, x10, {c}",
+                  " addi x5, x5, -1",
+                  " beq x5, x0, done",
+                  " andi x12, x10, 1",
+                  f" bne x12, x0, s{odd}",
+                  f" jal x0, s{even}"]
+    lines += ["done:", " ecall"]
+    return "\n".join(lines) + "\n"
+
+def model(machine, steps):
+    x10 = 0
+    state = 0
+    while True:
+        c, odd, even = machine[state]
+        x10 = (x10 + c) & 0xFFFFFFFF
+        steps -= 1
+        if steps == 0:
+            return x10
+        state = odd if x10 & 1 else even
+
+def run(machine, steps, mem_size=1 << 20):
+    sim = Sim(mem_size=mem_size)
+    sim.load(machine)
+    stats = sim.run(steps)
+    assert stats['halt'] == 'ecall'
+    return sim
+
+@pytest.mark.parametrize('seed', range(3))
+def test_state_machine_matches_model(seed):
+    machine = make_machine(600, seed)
+    src = make_program(machine, 3000)
+    statements = parse_source(src)
+    plain = list(layout(statements, {}))
+    symtab, program, _ = pass1(statements)
+    assert len(program) > len(plain)  # some branches had to grow
+    sim = run(pass2(program, symtab), 20 * 3000)
+    assert sim.reg(10) == model(machine, 3000)
+
+NEAR = """
+main:
+ li x10, 0
+ beq x0, x0, far1
+back1:
+ bnez x10, far2
+back2:
+ jal x1, far3
+ addi x10, x10, 1000
+ ecall
+"""
+FAR = """
+far1:
+ addi x10, x10, 1
+ j back1
+far2:
+ addi x10, x10, 10
+ beqz x0, back2
+far3:
+ addi x10, x10, 100
+ ret
+"""
+
+def far_program(gap):
+    # NEAR at 0 and FAR at gap bytes: what a huge program between them
+    # would give, without assembling one
+    symtab, labels = {}, {}
+    near = list(layout(parse_source(NEAR), symtab, labels))
+    far_symtab, far_labels = {}, {}
+    far = list(layout(parse_source(FAR), far_symtab, far_labels))
+    program = near + [(pc + gap, ins) for pc, ins in far]
+    symtab.update({name: addr + gap for name, addr in far_symtab.items()})
+    labels.update({name: i + len(near) for name, i in far_labels.items()})
+    return relax(program, symtab, labels)
+
+@pytest.mark.parametrize('gap, grown', [
+    (0x10000, 3),   # the three branches: inverted branch over a jal
+    (0x200000, 8),  # out of jal reach too: auipc+jalr, behind the branches' skips
+])
+def test_far_targets(gap, grown):
+    symtab, program = far_program(gap)
+    assert len(program) == 12 + grown  # 12 words unrelaxed
+    if gap > 1 << 20:
+        assert 'auipc' in {ins.mnemonic for _, ins in program}
+    sim = run(pass2(program, symtab), 100, mem_size=gap + (1 << 16))
+    assert sim.reg(10) == 1111
+
+def test_in_reach_program_is_left_alone():
+    src = "main:\n li x5, 3\nloop:\n addi x5, x5, -1\n bnez x5, loop\n jal x1, main\n call main\n"
+    symtab, labels = {}, {}
+    program = list(layout(parse_source(src), symtab, labels))
+    assert relax(program, symtab, labels)[1] is program
+
+def test_numeric_offset_out_of_reach_is_an_error():
+    with pytest.raises(Exception, match='Pass2'):
+        assemble(" beq x0, x0, 8192\n")
@@ -0,0 +1,91 @@
+# ---------------------------
+# Warm modes (assembler.server): WarmAssembler's replies to protocol
+# requests, and the same requests through the serve loop over a local
+# socket, must carry the words pipeline.assemble gives (or fail as it
+# does), across edits of the same source
+# ---------------------------
+
+import json
+import socket
+import threading
+
+import pytest
+
+from assembler.pipeline import assemble
+from assembler.server import WarmAssembler, _Handler, _Server, send_request
+
+def program(k):
+    lines = ["main:", f" li x10, {k}"] + [f" call f{i}" for i in range(5)] + [" ecall"]
+    for i in range(5):
+        lines += [f"f{i}:", f" addi x10, x10, {i * k}", " ret"]
+    return "\n".join(lines) + "\n"
+
+FAR = "a:\n beq x1, x2, b\n" + " nop\n" * 1100 + "b:\n ecall\n"
+BAD = "main:\n addi x5, x5, 5000\n"
+
+def expected_reply(src):
+    try:
+        machine = assemble(src)
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    return {'ok': True, 'words': len(machine), 'hex': [f"{w:08x}" for _, w in machine]}
+
+def without_ms(reply):
+    assert reply.pop('ms') >= 0
+    return reply
+
+# edits of one inline source, then a far branch and an error
+SOURCES = [program(1), program(2), program(2).replace(" ret\n", " nop\n ret\n", 1), FAR, BAD,
+           program(3)]
+
+def test_warm_assembler_replies():
+    warm = WarmAssembler()
+    for src in SOURCES:
+        assert without_ms(warm.handle({'source': src})) == expected_reply(src)
+
+def test_asm_file_request(tmp_path):
+    warm = WarmAssembler()
+    asm = tmp_path / "p.asm"
+    outputs = [str(tmp_path / "p.hex"), str(tmp_path / "p.bin")]
+    for src in SOURCES[:3]:
+        asm.write_text(src)
+        reply = without_ms(warm.handle({'asm': str(asm), 'outputs': outputs}))
+        machine = assemble(src)
+        assert reply == {'ok': True, 'words': len(machine)}
+        with open(outputs[0]) as f:
+            assert f.read() == ''.join(f"{w:08x}\n" for _, w in machine)
+    reply = warm.handle({'asm': str(tmp_path / "missing.asm"), 'outputs': outputs})
+    assert not reply['ok'] and 'missing.asm' in reply['error']
+
+@pytest.fixture
+def server():
+    # the serve() loop on a free port, in a thread
+    lines = []
+    srv = _Server(('127.0.0.1', 0), _Handler)
+    srv.warm = WarmAssembler()
+    srv.report = lines.append
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv, lines
+    srv.shutdown()
+    srv.server_close()
+
+def test_serve_loop(server):
+    srv, lines = server
+    port = srv.server_address[1]
+    for src in SOURCES:
+        assert without_ms(send_request({'source': src}, port)) == expected_reply(src)
+    assert lines[-1].startswith('<inline>: ok ')
+    assert sum(' FAIL ' in f" {line} " for line in lines) == 1
+
+def test_serve_loop_several_requests_per_connection(server):
+    srv, lines = server
+    with socket.create_connection(('127.0.0.1', srv.server_address[1])) as sock:
+        requests = [json.dumps({'source': src}) for src in SOURCES[:2]] + ["not json", ""]
+        sock.sendall(("\n".join(requests) + "\n").encode())
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile('r') as f:
+            replies = [json.loads(line) for line in f]
+    assert [without_ms(r) for r in replies[:2]] == [expected_reply(s) for s in SOURCES[:2]]
+    assert len(replies) == 3  # the blank line gets no reply
+    assert not replies[2]['ok'] and replies[2]['error'].startswith('Bad request')
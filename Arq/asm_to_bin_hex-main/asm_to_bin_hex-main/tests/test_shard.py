@@ -0,0 +1,88 @@
+# ---------------------------
+# Sharded pass2 (assembler.shard): the words encoded across worker
+# processes must be the serial pass2's, in order, with forked and with
+# spawned workers; a bad instruction sends the program back to the serial
+# path, which reports it
+# ---------------------------
+
+import multiprocessing
+
+import pytest
+
+from assembler import passes, shard
+from assembler.passes import pass1, pass2
+from assembler.pipeline import parse_source
+
+LINES = [
+    " addi x5, x5, {i}",
+    " add x6, x5, x7",
+    " lw x8, 4(x6)",
+    " sw x8, -8(x2)",
+    " beq x5, x6, l{j}",
+    " jal x1, l{j}",
+    " lui x9, {i}",
+    " la x10, l{j}",
+    " call l{j}",
+    " li x11, {big}",
+    " lw x12, l{j}",
+]
+
+def make_program(n_lines):
+    lines = []
+    for i in range(n_lines):
+        if i % 20 == 0:
+            lines.append(f"l{i // 20}:")
+        lines.append(LINES[i % len(LINES)].format(i=i % 1000, j=(i // 20 + 3) % (n_lines // 20),
+                                                  big=i * 7919))
+    symtab, program, _ = pass1(parse_source("\n".join(lines) + "\n"))
+    return symtab, program
+
+def words(machine):
+    return [w for _, w in machine]
+
+@pytest.mark.parametrize('jobs', [1, 2, 3])
+def test_sharded_words_equal_serial(jobs):
+    symtab, program = make_program(2000)
+    assert list(shard.encode_sharded(program, symtab, jobs)) == words(pass2(program, symtab))
+
+@pytest.mark.skipif('spawn' not in multiprocessing.get_all_start_methods(),
+                    reason="no spawn start method")
+def test_spawned_workers(monkeypatch):
+    # the path taken where fork isn't the default start method: the symbol
+    # table goes through the pool initializer, the instructions with each task
+    monkeypatch.setattr(multiprocessing, 'get_start_method', lambda: 'spawn')
+    symtab, program = make_program(400)
+    assert list(shard.encode_sharded(program, symtab, 2)) == words(pass2(program, symtab))
+
+@pytest.mark.parametrize('n, jobs', [(1, 4), (7, 2), (100, 3), (1000, 8)])
+def test_shards_cover_the_program_in_order(n, jobs):
+    bounds = shard.shards(n, jobs)
+    assert bounds[0][0] == 0 and bounds[-1][1] == n
+    assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+    assert len(bounds) <= jobs * shard.SHARDS_PER_JOB
+
+def test_error_goes_back_to_the_serial_path(monkeypatch):
+    symtab, program = make_program(400)
+    bad = parse_source(" addi x5, x5, 5000\n")[0]
+    program[200] = (program[200][0], bad)
+    assert shard.encode_sharded(program, symtab, 2) is None
+    monkeypatch.setattr(passes, 'SHARD_THRESHOLD', 100)
+    monkeypatch.setattr(passes.os, 'cpu_count', lambda: 2)
+    with pytest.raises(Exception, match="Immediate out of range"):
+        pass2(program, symtab, jobs=2)
+
+def test_pass2_jobs(monkeypatch):
+    # pass2 shards above SHARD_THRESHOLD, with no more jobs than CPUs
+    symtab, program = make_program(400)
+    serial = pass2(program, symtab)
+    calls = []
+    encode_sharded = shard.encode_sharded
+    def counting(program, symtab, jobs):
+        calls.append(jobs)
+        return encode_sharded(program, symtab, jobs)
+    monkeypatch.setattr(shard, 'encode_sharded', counting)
+    monkeypatch.setattr(passes, 'SHARD_THRESHOLD', 100)
+    monkeypatch.setattr(passes.os, 'cpu_count', lambda: 2)
+    assert pass2(program, symtab, jobs=8) == serial
+    assert pass2(program, symtab, jobs=1) == serial
+    assert calls == [2]
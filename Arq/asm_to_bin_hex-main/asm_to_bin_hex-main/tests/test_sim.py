@@ -0,0 +1,100 @@
+# ---------------------------
+# Simulator (assembler.sim): one small program per group of instructions,
+# checked by the registers it leaves behind (every mnemonic in INSTR_TABLE
+# is covered), with per-instruction and per-block dispatch alike, plus
+# self-modifying code and max-steps cut-offs
+# ---------------------------
+
+import pytest
+
+from assembler.instructions import INSTR_TABLE, AsmContext
+from assembler.pipeline import assemble
+from assembler.sim import Sim, OPS
+
+M = 0xFFFFFFFF
+
+# (source, {register: expected unsigned value})
+CHECKS = [
+    ("li x1, 7\nli x2, -3\nadd x3, x1, x2\nsub x4, x1, x2\nxor x5, x1, x2\n"
+     "or x6, x1, x2\nand x7, x1, x2\nslt x8, x2, x1\nsltu x9, x2, x1\n",
+     {3: 4, 4: 10, 5: (7 ^ -3) & M, 6: (7 | -3) & M, 7: 7 & -3, 8: 1, 9: 0}),
+    ("li x1, -16\nli x2, 2\nsll x3, x1, x2\nsrl x4, x1, x2\nsra x5, x1, x2\n"
+     "slli x6, x1, 4\nsrli x7, x1, 28\nsrai x8, x1, 2\n",
+     {3: (-64) & M, 4: ((-16) & M) >> 2, 5: (-4) & M, 6: (-256) & M, 7: 0xF, 8: (-4) & M}),
+    ("li x1, 100\naddi x2, x1, -101\nslti x3, x2, 0\nsltiu x4, x1, -1\n"
+     "xori x5, x1, -1\nori x6, x1, 3\nandi x7, x1, 0x64\n",
+     {2: M, 3: 1, 4: 1, 5: (~100) & M, 6: 103, 7: 100}),
+    ("li x1, -7\nli x2, 2\nmul x3, x1, x2\nmulh x4, x1, x2\nmulhsu x5, x1, x2\n"
+     "mulhu x6, x1, x2\ndiv x7, x1, x2\ndivu x8, x1, x2\nrem x9, x1, x2\nremu x10, x1, x2\n"
+     "div x11, x1, x0\nrem x12, x1, x0\n",
+     {3: (-14) & M, 4: M, 5: M, 6: 1, 7: (-3) & M, 8: ((-7) & M) // 2, 9: M,
+      10: ((-7) & M) % 2, 11: M, 12: (-7) & M}),
+    ("li x10, 0x1000\nli x1, -2\nsw x1, 0(x10)\nsh x1, 4(x10)\nsb x1, 8(x10)\n"
+     "lw x2, 0(x10)\nlh x3, 4(x10)\nlhu x4, 4(x10)\nlb x5, 8(x10)\nlbu x6, 8(x10)\n"
+     "lw x7, 4(x10)\n",
+     {2: (-2) & M, 3: (-2) & M, 4: 0xFFFE, 5: (-2) & M, 6: 0xFE, 7: 0xFFFE}),
+    ("lui x1, 0x12345000\nauipc x2, 0x1000\nfence\n", {1: 0x12345000, 2: 0x1004}),
+    # taken and not-taken branches; x9 counts the taken ones
+    ("li x1, -1\nli x2, 1\n"
+     "beq x1, x1, t1\naddi x8, x8, 1\nt1: addi x9, x9, 1\n"
+     "bne x1, x2, t2\naddi x8, x8, 1\nt2: addi x9, x9, 1\n"
+     "blt x1, x2, t3\naddi x8, x8, 1\nt3: addi x9, x9, 1\n"
+     "bge x2, x1, t4\naddi x8, x8, 1\nt4: addi x9, x9, 1\n"
+     "bltu x2, x1, t5\naddi x8, x8, 1\nt5: addi x9, x9, 1\n"
+     "bgeu x1, x2, t6\naddi x8, x8, 1\nt6: addi x9, x9, 1\n"
+     "beq x1, x2, t7\naddi x7, x7, 1\nt7:\n",
+     {8: 0, 9: 6, 7: 1}),
+    ("jal x1, f\naddi x5, x0, 1\necall\nf: addi x6, x0, 2\njalr x0, x1, 0\n",
+     {1: 4, 5: 1, 6: 2}),
+    ("addi x1, x0, 1\nebreak\naddi x1, x0, 2\n", {1: 1}),
+    ("addi x0, x0, 5\nadd x0, x1, x1\n", {0: 0}),
+]
+
+# the loop patches its own first instruction (at 0xc) to addi x5, x5, 100
+# after one pass, from inside the same basic block
+PATCH = INSTR_TABLE['addi'].encode([('reg', 5), ('reg', 5), ('imm', 100)], AsmContext({}, 0))
+CHECKS.append((f"li x1, {PATCH}\nli x6, 2\nloop: addi x5, x5, 1\nsw x1, 12(x0)\n"
+               "addi x6, x6, -1\nbnez x6, loop\n", {5: 101, 6: 0}))
+
+def test_every_mnemonic_is_simulated():
+    assert set(INSTR_TABLE) <= set(OPS)
+
+@pytest.mark.parametrize('blocks', [False, True])
+@pytest.mark.parametrize('src, expected', CHECKS, ids=[f'program{i}' for i in range(len(CHECKS))])
+def test_registers(src, expected, blocks):
+    sim = Sim(blocks=blocks)
+    sim.load(assemble(src))
+    sim.run(10000)
+    assert {r: sim.reg(r) for r in expected} == expected
+
+# nested loops over an array: loads, stores, ALU ops and branches
+LOOP = """
+ li x10, 0x1000
+ li x11, {n}
+outer:
+ li x12, 16
+ mv x13, x10
+inner:
+ lw x14, 0(x13)
+ add x14, x14, x11
+ sw x14, 0(x13)
+ addi x13, x13, 4
+ addi x12, x12, -1
+ bnez x12, inner
+ addi x11, x11, -1
+ bnez x11, outer
+ ecall
+"""
+
+@pytest.mark.parametrize('limit', range(0, 60, 7))
+def test_max_steps_same_state_in_both_modes(limit):
+    # stopping after max_steps lands on the same state in both modes
+    program = assemble(LOOP.format(n=3))
+    state = []
+    for blocks in (False, True):
+        sim = Sim(blocks=blocks)
+        sim.load(program)
+        stats = sim.run(limit)
+        state.append((sim.pc, stats['steps'], list(sim.regs[:32])))
+    assert state[0] == state[1]
+    assert state[0][1] == limit
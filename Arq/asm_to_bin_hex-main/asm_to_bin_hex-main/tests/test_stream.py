@@ -0,0 +1,83 @@
+# ---------------------------
+# Streaming assembly (assembler.stream, --stream): the files written for
+# every format must be those of the in-memory build, for sources with
+# text and .data, whatever the read block and write chunk sizes; pass2
+# must not build a second .data image; and the errors it stops at
+# ---------------------------
+
+import pytest
+
+from assembler import stream
+from assembler.data import DataImage
+from assembler.iohelpers import WRITERS, write_output
+from assembler.pipeline import assemble
+
+def program(n_blocks, data=True):
+    lines = [".text", "main:", " la x5, " + ("table" if data else "main"), " lw x6, 4(x5)"]
+    for k in range(n_blocks):
+        lines += [f"loop{k}:", " addi x5, x5, 1", " li x9, 100000", " sw x9, 8(x2)",
+                  f" beq x5, x6, loop{k}"]
+    lines.append(" ecall")
+    if data:
+        lines += [".data", "msg: .asciz \"streamed\"", ".align 2", "table:",
+                  " .word " + ", ".join(str(i * 7919) for i in range(40)),
+                  " .half -1, 2", " .byte 3", "ptr: .word table, main"]
+    return "\n".join(lines) + "\n"
+
+FORMATS = ['hexbin'] + sorted(WRITERS)
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def outputs(tmp_path, fmt, tag):
+    n = 2 if fmt == 'hexbin' else 1
+    return [str(tmp_path / f"{tag}{i}.{fmt}") for i in range(n)]
+
+def check_same(tmp_path, src, fmt):
+    asm = tmp_path / "p.asm"
+    asm.write_text(src)
+    machine = assemble(src)
+    want = outputs(tmp_path, fmt, 'mem')
+    write_output(machine, fmt, want)
+    got = outputs(tmp_path, fmt, 'stream')
+    assert stream.assemble_stream(str(asm), fmt, got) == len(machine)
+    assert [read(p) for p in got] == [read(p) for p in want]
+
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('data', [True, False], ids=['text+data', 'text'])
+def test_stream_equals_in_memory(tmp_path, fmt, data):
+    check_same(tmp_path, program(200, data), fmt)
+
+def test_small_blocks_and_chunks(tmp_path, monkeypatch):
+    # statements split across many read blocks, words across many chunks
+    monkeypatch.setattr(stream.read_blocks, '__defaults__', (97,))
+    monkeypatch.setattr(stream, 'WRITE_CHUNK', 5)
+    for fmt in FORMATS:
+        check_same(tmp_path, program(50), fmt)
+
+def test_pass2_keeps_no_data_image(tmp_path, monkeypatch):
+    calls = []
+    directive = DataImage.directive
+    def counting(self, name, args):
+        calls.append(name)
+        return directive(self, name, args)
+    monkeypatch.setattr(DataImage, 'directive', counting)
+    check_same(tmp_path, program(5), 'raw')
+    # the in-memory build and stream pass1 each build the image once;
+    # stream pass2 doesn't
+    assert len(calls) == 2 * 6
+
+@pytest.mark.parametrize('src, fmt, message', [
+    ('.macro m\n nop\n.endm\n m\n', 'raw', "can't run the preprocessor"),
+    (" beq x0, x0, 8192\n", 'raw', "Branch"),
+    (" nop\n.text\n nop\n nop\n", 'raw',
+     r"contiguous addresses from 0 \(expected 0x00000004, got 0x00000000\)"),
+])
+def test_errors(tmp_path, src, fmt, message):
+    asm = tmp_path / "p.asm"
+    asm.write_text(src)
+    out = outputs(tmp_path, fmt, 'stream')
+    with pytest.raises(Exception, match=message):
+        stream.assemble_stream(str(asm), fmt, out)
+    assert not any((tmp_path / p).exists() for p in out)
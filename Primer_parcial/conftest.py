@@ -0,0 +1,3 @@
+# Makes the project directory importable from tests/ (from data import api)
+# without a tests package, whose name would clash with other test suites
+# collected from the repository root.
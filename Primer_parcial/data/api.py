@@ -1,10 +1,54 @@
 import pandas as pd
 from sodapy import Socrata
 
+DOMINIO = "www.datos.gov.co"
+DATASET = "gt2j-8ykr"
 
-def get_data(limite_registros, nombre_departamento):
-    client = Socrata("www.datos.gov.co", None)
-    results = client.get("gt2j-8ykr", limit=limite_registros, departamento_nom=nombre_departamento)
-    # Convert to pandas DataFrame
-    results_df = pd.DataFrame.from_records(results)
+# Columns ui.filter_data.filter_columns shows; only these are requested
+COLUMNAS = ('ciudad_municipio_nom', 'departamento_nom', 'edad',
+            'fuente_tipo_contagio', 'estado')
+
+
+def _texto(valor):
+    # SoQL string literal: single quotes, doubled inside
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def construir_where(nombre_departamento=None, municipio=None, estado=None,
+                    edad_min=None, edad_max=None):
+    # SoQL $where for the given predicates (None: no filter; an empty string
+    # still filters on it, as the departamento_nom= query did); ages are
+    # inclusive
+    condiciones = []
+    if nombre_departamento is not None:
+        condiciones.append(f"departamento_nom = {_texto(nombre_departamento)}")
+    if municipio is not None:
+        condiciones.append(f"ciudad_municipio_nom = {_texto(municipio)}")
+    if estado is not None:
+        condiciones.append(f"estado = {_texto(estado)}")
+    if edad_min is not None:
+        condiciones.append(f"edad >= {int(edad_min)}")
+    if edad_max is not None:
+        condiciones.append(f"edad <= {int(edad_max)}")
+    return " AND ".join(condiciones) or None
+
+
+def get_data(limite_registros, nombre_departamento=None, *, municipio=None, estado=None,
+             edad_min=None, edad_max=None, columnas=COLUMNAS, cliente=None):
+    # The projection ($select) and the filters ($where) run on the server, so
+    # only the requested columns of the matching rows are downloaded.
+    # columnas=None requests every column; cliente replaces the Socrata client
+    # (e.g. one pointed at a local server).
+    if cliente is None:
+        cliente = Socrata(DOMINIO, None)
+    parametros = {'limit': limite_registros}
+    if columnas:
+        parametros['select'] = ", ".join(columnas)
+    where = construir_where(nombre_departamento, municipio, estado, edad_min, edad_max)
+    if where:
+        parametros['where'] = where
+    results = cliente.get(DATASET, **parametros)
+    # Convert to pandas DataFrame; Socrata leaves out null fields, so the
+    # columns are named to keep them all (and an empty result shaped)
+    results_df = pd.DataFrame.from_records(results, columns=list(columnas) if columnas else None)
     return results_df
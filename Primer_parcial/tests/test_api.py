@@ -0,0 +1,115 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip('pandas')
+sodapy = pytest.importorskip('sodapy')
+requests = pytest.importorskip('requests')
+
+from data import api  # noqa: E402
+
+
+class ServidorFalso(BaseHTTPRequestHandler):
+    # Answers every GET with self.server.filas as JSON and keeps the query
+    # parameters it received in self.server.peticiones
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.peticiones.append((url.path, {k: v[0] for k, v in parse_qs(url.query).items()}))
+        cuerpo = json.dumps(self.server.filas).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    srv = HTTPServer(('127.0.0.1', 0), ServidorFalso)
+    srv.peticiones = []
+    srv.filas = []
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def cliente(servidor):
+    # A Socrata client pointed at the local server over plain http
+    c = sodapy.Socrata(f'127.0.0.1:{servidor.server_port}', None,
+                       session_adapter={'prefix': 'http://',
+                                        'adapter': requests.adapters.HTTPAdapter()})
+    yield c
+    c.close()
+
+
+def test_select_limit_sin_filtros(servidor, cliente):
+    api.get_data(25, cliente=cliente)
+    [(ruta, parametros)] = servidor.peticiones
+    assert ruta == f'/resource/{api.DATASET}.json'
+    assert parametros == {'$select': ', '.join(api.COLUMNAS), '$limit': '25'}
+
+
+def test_where(servidor, cliente):
+    api.get_data(10, 'VALLE', municipio="CARTAGENA DE INDIAS", estado='Leve',
+                 edad_min=18, edad_max=60, cliente=cliente)
+    parametros = servidor.peticiones[0][1]
+    assert parametros['$where'] == ("departamento_nom = 'VALLE' AND "
+                                    "ciudad_municipio_nom = 'CARTAGENA DE INDIAS' AND "
+                                    "estado = 'Leve' AND edad >= 18 AND edad <= 60")
+
+
+def test_where_escapa_comillas_y_edades_limite(servidor, cliente):
+    api.get_data(10, "NARI'O", edad_min=0, edad_max=0, cliente=cliente)
+    assert servidor.peticiones[0][1]['$where'] == \
+        "departamento_nom = 'NARI''O' AND edad >= 0 AND edad <= 0"
+
+
+def test_departamento_vacio_filtra(servidor, cliente):
+    # as the old departamento_nom= query: an empty name matches nothing
+    api.get_data(10, '', cliente=cliente)
+    assert servidor.peticiones[0][1]['$where'] == "departamento_nom = ''"
+
+
+def test_filtros_solo_por_nombre(cliente):
+    with pytest.raises(TypeError):
+        api.get_data(10, 'VALLE', ('edad',), cliente=cliente)
+
+
+def test_columnas_pedidas(servidor, cliente):
+    servidor.filas = [{'edad': '30', 'estado': 'Leve'}]
+    df = api.get_data(5, columnas=('edad', 'estado'), cliente=cliente)
+    assert servidor.peticiones[0][1]['$select'] == 'edad, estado'
+    assert list(df.columns) == ['edad', 'estado']
+    assert df.to_dict('records') == servidor.filas
+
+
+def test_todas_las_columnas(servidor, cliente):
+    servidor.filas = [{'edad': '30', 'sexo': 'F'}]
+    df = api.get_data(5, columnas=None, cliente=cliente)
+    assert '$select' not in servidor.peticiones[0][1]
+    assert sorted(df.columns) == ['edad', 'sexo']
+
+
+def test_resultado_vacio(servidor, cliente):
+    df = api.get_data(5, 'AMAZONAS', cliente=cliente)
+    assert df.empty
+    assert list(df.columns) == list(api.COLUMNAS)
+
+
+def test_columna_faltante(servidor, cliente):
+    # Socrata leaves out null fields: the column is kept, with NaN
+    servidor.filas = [{'ciudad_municipio_nom': 'LETICIA', 'departamento_nom': 'AMAZONAS',
+                       'edad': '40', 'fuente_tipo_contagio': 'Comunitaria'}]
+    df = api.get_data(5, cliente=cliente)
+    assert list(df.columns) == list(api.COLUMNAS)
+    assert df['estado'].isna().all()
+    assert df.loc[0, 'ciudad_municipio_nom'] == 'LETICIA'